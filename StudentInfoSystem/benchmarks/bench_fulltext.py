@@ -0,0 +1,44 @@
+# full-text query latency ("mend bsit" style) with the in-memory index and
+# with sqlite fts5, after the index is built
+import os
+import tempfile
+
+from common import make_students, sizes, timer
+from database import (PROGRAM_FIELDS, STUDENT_FIELDS, load_programs)
+from storage import CsvBackend, SqliteBackend
+
+QUERIES = ["mend bsit", "camille cast", "r information technology"]
+
+
+def run(backend, rows):
+    programs = backend.table("programs", PROGRAM_FIELDS, "code",
+                             indexes=("college",))
+    programs.replace(load_programs())
+    students = backend.table("students", STUDENT_FIELDS, "id",
+                             indexes=("program",))
+    students.replace(rows)
+    fulltext = backend.fulltext(students, programs)
+    with timer() as build:
+        fulltext.search("warm up")
+    times = []
+    for q in QUERIES:
+        with timer() as t:
+            hits = fulltext.search(q)
+        times.append((q, t.elapsed, len(hits)))
+    return build.elapsed, times
+
+
+def main():
+    for n in sizes([100_000, 1_000_000]):
+        rows = make_students(n)
+        with tempfile.TemporaryDirectory() as d:
+            for label, backend in (("memory", CsvBackend(d)),
+                                   ("sqlite", SqliteBackend(os.path.join(d, "ssis.db")))):
+                build, times = run(backend, rows)
+                print(f"{n:>9} {label:<7} first query {build * 1000:8.1f} ms")
+                for q, t, hits in times:
+                    print(f"{'':>17} {q!r:<28} {t * 1000:8.1f} ms  {hits} hits")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+# saves per second for full-table saves: one atomic write per save versus
+# group commit, which merges a burst of saves into a single durable write
+import os
+import tempfile
+import time
+
+from common import make_students, sizes, timer
+from database import STUDENT_FIELDS
+from storage import Repository
+
+BURST_SECONDS = 2.0
+
+
+def run(n, group_commit):
+    rows = make_students(n)
+    with tempfile.TemporaryDirectory() as d:
+        repo = Repository(os.path.join(d, "students.csv"), STUDENT_FIELDS,
+                          "id", group_commit=group_commit)
+        repo.replace(rows)
+        repo.flush()
+        saves = 0
+        with timer() as t:
+            deadline = time.perf_counter() + BURST_SECONDS
+            while time.perf_counter() < deadline:
+                repo.replace(rows)
+                saves += 1
+            repo.flush()
+        commits = repo._committer.commits if repo._committer else saves
+    return saves / t.elapsed, commits
+
+
+def main():
+    print(f"{'rows':>9}  {'mode':<14}{'saves/s':>10}  {'disk writes':>11}")
+    for n in sizes([10_000, 100_000, 1_000_000]):
+        for label, window in (("atomic", None), ("group 50ms", 0.05)):
+            rate, commits = run(n, window)
+            print(f"{n:>9}  {label:<14}{rate:>10.1f}  {commits:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# importing students one by one: the old list scans (is_duplicate over a
+# list, then a linear search to find the row to update) against the
+# repository's primary-key index. scans are quadratic, so above SCAN_LIMIT
+# rows their time is extrapolated from a smaller run.
+import os
+import tempfile
+
+from common import make_students, sizes, timer
+from database import STUDENT_FIELDS
+from storage import Repository
+from validator import is_duplicate
+
+SCAN_LIMIT = 20_000
+
+
+def import_with_scans(new_rows):
+    rows = []
+    with timer() as t:
+        for data in new_rows:
+            if not is_duplicate(rows, "id", data["id"]):
+                rows.append(dict(data))
+        # then edit every row once, the way the old save() loop did
+        for data in new_rows:
+            for r in rows:
+                if r["id"] == data["id"]:
+                    r.update(data)
+                    break
+    return t.elapsed
+
+
+def import_with_index(new_rows):
+    with tempfile.TemporaryDirectory() as d:
+        # group commit keeps disk writes out of the measurement
+        repo = Repository(os.path.join(d, "students.csv"), STUDENT_FIELDS,
+                          "id", group_commit=60, indexes=("program",))
+        repo.replace([])
+        with timer() as t:
+            for data in new_rows:
+                if not is_duplicate(repo, "id", data["id"]):
+                    repo.add(data)
+            for data in new_rows:
+                repo.update(data["id"], data)
+        repo.flush()
+    return t.elapsed
+
+
+def main():
+    print(f"{'rows':>9}  {'scans (s)':>12}  {'index (s)':>10}  {'speedup':>8}")
+    for n in sizes([10_000, 100_000]):
+        new_rows = make_students(n)
+        m = min(n, SCAN_LIMIT)
+        scans = import_with_scans(new_rows[:m]) * (n / m) ** 2
+        mark = "*" if m < n else " "
+        index = import_with_index(new_rows)
+        print(f"{n:>9}  {scans:>11.2f}{mark}  {index:>10.2f}  {scans / index:>7.0f}x")
+    print("* extrapolated from", SCAN_LIMIT, "rows")
+
+
+if __name__ == "__main__":
+    main()
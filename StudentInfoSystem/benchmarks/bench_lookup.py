@@ -0,0 +1,71 @@
+# one student by id, from a students.csv nobody has loaded yet: loading
+# the whole table (what get() does first) against the memory-mapped
+# byte-offset index of csvindex.py, built from scratch, reopened from its
+# .idx sidecar, and caught up after rows were appended; and a page of the
+# table in id order read through it (what TableService.page does for a
+# table nobody has loaded).
+import csv
+import os
+import tempfile
+
+from common import make_students, sizes, timer
+from csvindex import MappedCsv
+from database import STUDENT_FIELDS
+from sorting import id_key
+from storage import CsvBackend, save_csv
+
+
+def main():
+    for n in sizes([100_000, 1_000_000]):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "students.csv")
+            rows = make_students(n)
+            save_csv(path, STUDENT_FIELDS, rows)
+            wanted = rows[n // 2]
+            print(f"{n} students")
+
+            repo = CsvBackend(d).table("students", STUDENT_FIELDS, "id")
+            with timer() as t:
+                found = repo.get(wanted["id"])
+            assert dict(found) == wanted
+            print(f"  load the table     {t.elapsed * 1000:8.1f} ms")
+
+            with timer() as t:
+                found = MappedCsv(path, STUDENT_FIELDS, "id").get(wanted["id"])
+            assert found == wanted
+            print(f"  build the index    {t.elapsed * 1000:8.1f} ms")
+
+            mapped = MappedCsv(path, STUDENT_FIELDS, "id")
+            with timer() as t:
+                found = mapped.get(wanted["id"])
+            assert found == wanted
+            print(f"  reopen the index   {t.elapsed * 1000:8.1f} ms")
+
+            with timer() as t:
+                for r in rows[::n // 1000]:
+                    mapped.get(r["id"])
+            print(f"  1000 lookups       {t.elapsed * 1000:8.1f} ms")
+
+            with timer() as t:
+                keys = mapped.sorted_keys(id_key)
+            print(f"  sort the ids       {t.elapsed * 1000:8.1f} ms")
+
+            with timer() as t:
+                page = [mapped.get(k) for k in keys[n // 2:n // 2 + 500]]
+            assert page[0] == wanted
+            print(f"  a page of 500      {t.elapsed * 1000:8.1f} ms")
+
+            added = make_students(1000, seed=9)
+            for r in added:
+                r["id"] = "9" + r["id"][1:]
+            with open(path, "a", newline="") as f:
+                csv.writer(f).writerows([r[k] for k in STUDENT_FIELDS]
+                                        for r in added)
+            with timer() as t:
+                found = mapped.get(added[-1]["id"])
+            assert found == added[-1]
+            print(f"  after 1000 appends {t.elapsed * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
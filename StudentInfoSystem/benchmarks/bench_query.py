@@ -0,0 +1,71 @@
+# structured filter + sort over the students, three ways: a plain python
+# scan with a key lambda (how the tab used to do it), the pure-python query
+# engine and the numpy one (see query.py). each query is run once to warm
+# up the engine's arrays/indexes, then timed.
+import os
+import tempfile
+
+from common import make_students, sizes, timer
+from database import STUDENT_FIELDS
+from query import ArrayEngine, PythonEngine, as_filters, np
+from storage import CsvBackend, save_csv
+from sorting import SORT_KEYS, text_key
+
+QUERIES = [
+    (["program=BSIT"], "lastname"),
+    (["year>=3"], "id"),
+    (["program=BSIT", "year>=3", "gender=Female"], "lastname"),
+    (["program=BSCS", "year=4"], "lastname"),
+    (["gender=Female", "year=4"], "id"),
+    (["lastname^=men"], "firstname"),
+    (["gender!=Male", "year<3"], "year"),
+    ([], "lastname"),
+]
+
+
+def scan(repo, filters, field):
+    rows = [r for r in repo.rows() if all(f.test(r[f.field]) for f in filters)]
+    typed = SORT_KEYS.get(field, text_key)
+    rows.sort(key=lambda r: (typed(r[field]), r["id"]))
+    return [r["id"] for r in rows]
+
+
+def main():
+    for n in sizes([100_000, 1_000_000]):
+        with tempfile.TemporaryDirectory() as d:
+            save_csv(os.path.join(d, "students.csv"), STUDENT_FIELDS,
+                     make_students(n))
+            repo = CsvBackend(d).table(
+                "students", STUDENT_FIELDS, "id", indexes=("program",),
+                categorical=("program", "year", "gender"))
+            len(repo)
+            engines = {"scan": None, "python": PythonEngine(repo)}
+            if np is not None:
+                with timer() as t:
+                    engine = ArrayEngine(repo, STUDENT_FIELDS)
+                    engine.prepare()
+                engines["numpy"] = engine
+                print(f"{n} students, numpy arrays built in {t.elapsed:.2f} s")
+            else:
+                print(f"{n} students (numpy not installed)")
+            for where, field in QUERIES:
+                filters = as_filters(where)
+                line = f"  {' '.join(where) or '(all)':<40} by {field:<10}"
+                found = None
+                for name, engine in engines.items():
+                    def run():
+                        if engine is None:
+                            return scan(repo, filters, field)
+                        return engine.order(field, False,
+                                            engine.select(filters))
+                    keys = run()
+                    with timer() as t:
+                        keys = run()
+                    assert found is None or keys == found, name
+                    found = keys
+                    line += f"  {name} {t.elapsed * 1000:7.1f} ms"
+                print(line + f"  ({len(found)} rows)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# memory, load time and scan/sort time of the students as csv.DictReader
+# dicts (how they used to be held) against the compact records of
+# records.py, with program, year and gender dictionary-encoded
+import gc
+import os
+import tempfile
+import tracemalloc
+
+from common import make_students, sizes, timer
+from database import STUDENT_FIELDS
+from records import record_type
+from storage import load_csv, load_records, save_csv
+
+CATEGORICAL = ("program", "year", "gender")
+
+
+def measure(load):
+    # (rows, MB held by them, seconds to load)
+    gc.collect()
+    tracemalloc.start()
+    with timer() as t:
+        rows = load()
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return rows, held / 1e6, t.elapsed
+
+
+def scan(rows):
+    # the tabs' plain substring search over every field
+    q = "mend"
+    return sum(1 for r in rows if any(q in r[f].lower() for f in STUDENT_FIELDS))
+
+
+def main():
+    for n in sizes([100_000, 1_000_000]):
+        path = os.path.join(tempfile.mkdtemp(), "students.csv")
+        save_csv(path, STUDENT_FIELDS, make_students(n))
+        print(f"{n} students")
+        loads = {
+            "dicts": lambda: load_csv(path, STUDENT_FIELDS),
+            "records": lambda: load_records(
+                path, STUDENT_FIELDS,
+                record_type("Row", STUDENT_FIELDS, CATEGORICAL)),
+        }
+        for name, load in loads.items():
+            # timed once more without tracemalloc, which slows allocation
+            rows, mb, _ = measure(load)
+            del rows
+            gc.collect()
+            with timer() as t_load:
+                rows = load()
+            with timer() as t_scan:
+                scan(rows)
+            with timer() as t_filter:
+                sum(1 for r in rows if r["program"] == "BSIT"
+                    and r["year"] == "3")
+            with timer() as t_sort:
+                sorted(rows, key=lambda r: (r["lastname"], r["firstname"]))
+            print(f"  {name:<8} {mb:7.1f} MB  load {t_load.elapsed:6.2f} s"
+                  f"  search {t_scan.elapsed:5.2f} s"
+                  f"  filter {t_filter.elapsed:5.2f} s"
+                  f"  sort {t_sort.elapsed:5.2f} s")
+            del rows
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# operations per second through the service layer (service.py), the way a
+# headless job would use it. saves go through an IoExecutor writer like in
+# the gui, so the numbers are for the in-memory side; queries are timed
+# after a warm-up that builds the search and sort indexes.
+import os
+import tempfile
+
+from common import make_students, sizes, timer
+from database import (PROGRAM_FIELDS, STUDENT_FIELDS, load_programs)
+from executor import IoExecutor
+from service import TableService
+from storage import CsvBackend, save_csv
+from validator import validate_student
+
+OPS = 2000
+QUERIES = 50
+
+
+def rate(n, elapsed):
+    return n / elapsed if elapsed else float("inf")
+
+
+def run(n):
+    rows = make_students(n)
+    with tempfile.TemporaryDirectory() as d:
+        save_csv(os.path.join(d, "students.csv"), STUDENT_FIELDS, rows)
+        backend = CsvBackend(d)
+        programs = backend.table("programs", PROGRAM_FIELDS, "code",
+                                 indexes=("college",))
+        programs.replace(load_programs())
+        students = backend.table("students", STUDENT_FIELDS, "id",
+                                 indexes=("program",), journal=True)
+        backend.use_writer(IoExecutor())
+        fulltext = backend.fulltext(students, programs)
+        service = TableService(students, validate_student, "Student", "ID",
+                               lambda: fulltext)
+        with timer() as load:
+            len(students)
+        service.query(limit=1)
+        service.query(search="mend", sort="lastname", limit=1)
+        service.search("mend bsit", limit=1)
+
+        keys = [r["id"] for r in rows[::max(1, n // OPS)]][:OPS]
+        new = [dict(r, id=f"9{r['id'][1:]}") for r in rows[:OPS]]
+        results = {}
+        with timer() as t:
+            for k in keys:
+                service.get(k)
+        results["get"] = rate(len(keys), t.elapsed)
+        with timer() as t:
+            for r in new:
+                service.add(r)
+        results["add"] = rate(len(new), t.elapsed)
+        with timer() as t:
+            for r in new:
+                service.update(r["id"], {"year": "5"})
+        results["update"] = rate(len(new), t.elapsed)
+        with timer() as t:
+            for r in new:
+                service.delete(r["id"])
+        results["delete"] = rate(len(new), t.elapsed)
+        program = rows[0]["program"]
+        queries = {
+            "query where": lambda: service.query(where={"program": program},
+                                                 limit=50),
+            "search": lambda: service.query(search="mend", limit=50),
+            "fulltext": lambda: service.search("mend bsit", limit=50),
+            "sort": lambda: service.sort("lastname", True, limit=50),
+        }
+        for name, q in queries.items():
+            with timer() as t:
+                for _ in range(QUERIES):
+                    q()
+            results[name] = rate(QUERIES, t.elapsed)
+        students.flush()
+    return load.elapsed, results
+
+
+def main():
+    for n in sizes([100_000, 1_000_000]):
+        load, results = run(n)
+        print(f"{n} students (load {load:.2f} s)")
+        for name, ops in results.items():
+            print(f"  {name:<12} {ops:>12,.0f} ops/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+# validating a stream of student rows: one at a time through the
+# validator's __call__ (what the service does per add) against
+# validate_many, which checks the program, year and gender of each distinct
+# value once. a few rows in every hundred are made invalid.
+import random
+
+from common import make_students, sizes, timer
+from database import load_programs
+from validator import student_validator
+
+
+def spoil(rows, seed=7):
+    rnd = random.Random(seed)
+    for r in rows:
+        if rnd.random() < 0.02:
+            r[rnd.choice(["id", "program", "year", "gender", "lastname"])] = \
+                rnd.choice(["", "x", "9"])
+    return rows
+
+
+def main():
+    validator = student_validator({p["code"] for p in load_programs()})
+    for n in sizes([100_000, 1_000_000]):
+        rows = spoil(make_students(n))
+        with timer() as one:
+            singly = [validator(validator.clean(r)) for r in rows]
+        with timer() as many:
+            results = validator.validate_many(rows)
+        bad = sum(err is not None for _, err in results)
+        # the one-at-a-time loop doesn't look for repeated ids
+        assert [e for e in singly if e] == \
+            [e for _, e in results if e and e != validator.duplicate]
+        print(f"{n} students, {bad} rejected: one at a time "
+              f"{one.elapsed:5.2f} s, validate_many {many.elapsed:5.2f} s "
+              f"({n / many.elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+# shared helpers for the benchmark scripts in this folder. run them from
+# the StudentInfoSystem directory, e.g. `python benchmarks/bench_group_commit.py`
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import load_programs
+
+FIRST = ["Carlos", "Marco", "Camille", "Rico", "Ana", "Jose", "Maria",
+         "Paolo", "Liza", "Miguel", "Andrea", "Joshua", "Bea", "Kevin"]
+LAST = ["Ocampo", "Mendoza", "Castillo", "Rivera", "Santos", "Reyes",
+        "Cruz", "Bautista", "Garcia", "Torres", "Flores", "Ramos"]
+GENDERS = ["Male", "Female", "Other"]
+
+
+def make_students(n, seed=151):
+    rnd = random.Random(seed)
+    programs = [p["code"] for p in load_programs()]
+    rows = []
+    for i in range(n):
+        rows.append({"id": f"{2000 + i // 10000:04d}-{i % 10000:04d}",
+                     "firstname": rnd.choice(FIRST),
+                     "lastname": rnd.choice(LAST),
+                     "program": rnd.choice(programs),
+                     "year": str(rnd.randint(1, 5)),
+                     "gender": rnd.choice(GENDERS)})
+    return rows
+
+
+class timer:
+    # with timer() as t: ...  then t.elapsed is in seconds
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
+
+
+def sizes(default):
+    # row counts from the command line, e.g. `... 10000 100000`
+    return [int(a) for a in sys.argv[1:]] or default
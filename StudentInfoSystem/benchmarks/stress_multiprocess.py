@@ -0,0 +1,117 @@
+# many processes changing the same csv table at once, each through its own
+# Repository, the way several SSIS windows on one data directory would.
+# every worker adds, updates and deletes rows in its own range of ids and
+# bumps one shared counter row with a compare-and-set update (retried on
+# ConflictError); half of them save through a background writer like the
+# gui does. it runs once on a journaled table, compacted under them every
+# few dozen kB, and once on one rewritten on every save. at the end of each
+# run a fresh read must hold exactly the rows each worker believes it left,
+# and the counter must equal the number of bumps.
+# python benchmarks/stress_multiprocess.py [processes] [ops per process]
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+
+from common import timer
+from executor import IoExecutor
+from storage import ConflictError, Repository, save_csv
+
+FIELDS = ["id", "name", "n"]
+COUNTER = "counter"
+
+
+def open_table(path, journal):
+    return Repository(path, FIELDS, "id", journal=journal,
+                      compact_at=32 << 10, check_interval=0)
+
+
+def bump(repo):
+    # read-modify-write of the shared row; lost updates would show up as
+    # a counter below the number of bumps
+    retries = 0
+    while True:
+        repo.refresh()
+        since = repo.version
+        n = int(repo.get(COUNTER)["n"])
+        try:
+            repo.update(COUNTER, {"n": str(n + 1)}, since)
+            return retries
+        except ConflictError:
+            retries += 1
+
+
+def worker(path, journal, number, ops, background):
+    rnd = random.Random(number)
+    repo = open_table(path, journal)
+    counter = open_table(path, journal)  # no writer: bumps are synchronous
+    errors = []
+    if background:
+        executor = IoExecutor()
+        executor.on_error = errors.append
+        repo.use_writer(executor)
+    mine, bumps, retries = {}, 0, 0
+    for i in range(ops):
+        choice = rnd.random()
+        if choice < 0.5 or not mine:
+            row = {"id": f"w{number}-{i}", "name": f"row {i}", "n": "0"}
+            repo.add(row)
+            mine[row["id"]] = row
+        elif choice < 0.8:
+            key = rnd.choice(list(mine))
+            row = dict(mine[key], n=str(int(mine[key]["n"]) + 1))
+            repo.update(key, row)
+            mine[key] = row
+        else:
+            key = rnd.choice(list(mine))
+            repo.delete(key)
+            del mine[key]
+        if i % 5 == 0:
+            retries += bump(counter)
+            bumps += 1
+        if background and i % 20 == 0:
+            repo.refresh()
+    repo.flush()
+    return mine, bumps, retries, [str(e) for e in errors]
+
+
+def run(processes, ops, journal):
+    directory = tempfile.mkdtemp(prefix="ssis-stress-")
+    path = os.path.join(directory, "table.csv")
+    save_csv(path, FIELDS, [{"id": COUNTER, "name": "counter", "n": "0"}])
+    try:
+        with multiprocessing.Pool(processes) as pool, timer() as t:
+            results = pool.starmap(worker, [(path, journal, w, ops, w % 2 == 1)
+                                            for w in range(processes)])
+        final = {r["id"]: r for r in open_table(path, journal).rows()}
+        expected = {}
+        for mine, _, _, _ in results:
+            expected.update(mine)
+        bumps = sum(r[1] for r in results)
+        retries = sum(r[2] for r in results)
+        errors = [e for r in results for e in r[3]]
+        counter = int(final.pop(COUNTER)["n"])
+        lost = [k for k in expected if final.get(k) != expected[k]]
+        stray = [k for k in final if k not in expected]
+        for e in sorted(set(errors)):
+            print("error:", e)
+        ok = not lost and not stray and counter == bumps and not errors
+        print(f"{'journal' if journal else 'rewrite'}  "
+              f"{processes:>3} processes x {ops} ops: "
+              f"{processes * ops / t.elapsed:8.0f} ops/s, "
+              f"{len(final):>6} rows, counter {counter}/{bumps} "
+              f"({retries} retries), lost {len(lost)}, stray {len(stray)}, "
+              f"errors {len(errors)}  {'OK' if ok else 'FAILED'}")
+        return ok
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    processes = args[0] if args else 8
+    ops = args[1] if len(args) > 1 else 400
+    ok = [run(processes, ops, journal) for journal in (True, False)]
+    sys.exit(0 if all(ok) else 1)
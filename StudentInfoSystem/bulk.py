@@ -0,0 +1,143 @@
+import argparse
+import csv
+import os
+import sys
+
+from database import students, STUDENT_FIELDS
+from gcpause import gc_paused
+from service import student_service
+
+# bulk import and export of students. rows are streamed from the file and
+# validated in batches; bad rows go to a reject file with the reason, and
+# all good rows are committed with a single write at the end.
+BATCH_SIZE = 10000
+
+
+def read_rows(path, progress=None):
+    # yields row dicts; progress(fraction) is called as the file is read
+    total = os.path.getsize(path) or 1
+    read = 0
+
+    def lines(f):
+        nonlocal read
+        for line in f:
+            read += len(line)
+            yield line
+
+    with open(path, newline="") as f:
+        reader = csv.DictReader(lines(f))
+        for i, row in enumerate(reader, 1):
+            yield row
+            if progress and i % BATCH_SIZE == 0:
+                progress(min(read / total, 1.0))
+
+
+def batches(rows, size=BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def validate_batch(batch, seen):
+    # (good rows, [(row, error)]) for one batch; `seen` collects the ids
+    # accepted so far so duplicates inside the file are caught too
+    results = student_service.validate.validate_many(batch, students, seen)
+    good = [row for row, err in results if err is None]
+    bad = [(row, err) for row, err in results if err is not None]
+    return good, bad
+
+
+class ImportResult:
+    def __init__(self):
+        self.added = 0
+        self.rejected = 0
+        self.cancelled = False
+
+
+def import_students(path, rejects_path=None, progress=None, cancelled=None):
+    # progress(fraction, message) is called from whatever thread runs this;
+    # cancelled() is polled between batches
+    result = ImportResult()
+    seen, good = set(), []
+    rejects = writer = None
+    report = (lambda f: progress(f * 0.9, "Reading")) if progress else None
+    try:
+        with gc_paused():
+            for batch in batches(read_rows(path, report)):
+                if cancelled and cancelled():
+                    result.cancelled = True
+                    return result
+                ok, bad = validate_batch(batch, seen)
+                good.extend(ok)
+                if bad and rejects_path:
+                    if writer is None:
+                        rejects = open(rejects_path, "w", newline="")
+                        writer = csv.writer(rejects)
+                        writer.writerow(STUDENT_FIELDS + ["error"])
+                    writer.writerows([r[f] for f in STUDENT_FIELDS] + [err]
+                                     for r, err in bad)
+                result.rejected += len(bad)
+    finally:
+        if rejects:
+            rejects.close()
+    if progress:
+        progress(0.9, f"Saving {len(good)} students")
+    result.added = students.add_many(good)
+    if progress:
+        progress(1.0, "Done")
+    return result
+
+
+def export_rows(path, keys, table=students, fields=STUDENT_FIELDS,
+                progress=None, cancelled=None):
+    # streams the rows for `keys` (e.g. a tab's current view) to a csv file
+    total = len(keys) or 1
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(fields)
+        for i, key in enumerate(keys, 1):
+            row = table.get(key)
+            if row is not None:
+                writer.writerow([row[f] for f in fields])
+            if i % BATCH_SIZE == 0:
+                if cancelled and cancelled():
+                    return i
+                if progress:
+                    progress(i / total, f"Exported {i} rows")
+    if progress:
+        progress(1.0, "Done")
+    return len(keys)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk student import/export")
+    sub = parser.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser("import", help="add students from a csv file")
+    imp.add_argument("file")
+    imp.add_argument("--rejects", help="write rejected rows here")
+    exp = sub.add_parser("export", help="write students to a csv file")
+    exp.add_argument("file")
+    exp.add_argument("--search", default="")
+    exp.add_argument("--sort", default="id", choices=STUDENT_FIELDS)
+    exp.add_argument("--desc", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.command == "import":
+        rejects = args.rejects or os.path.splitext(args.file)[0] + ".rejects.csv"
+        result = import_students(args.file, rejects)
+        students.flush()
+        print(f"added {result.added}, rejected {result.rejected}"
+              + (f" (see {rejects})" if result.rejected else ""))
+    else:
+        keys = student_service.keys(args.search, args.sort, args.desc)
+        print(f"exported {export_rows(args.file, keys)} students")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
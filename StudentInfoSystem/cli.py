@@ -0,0 +1,176 @@
+import argparse
+import csv
+import json
+import sys
+
+from database import TABLES, integrity, student_stats, use_background_io
+from integrity import POLICIES
+from query import as_filters
+from service import SERVICES, ServiceError
+from stats import GROUPS
+
+# headless access to the data for scripts and scheduled jobs, e.g.
+#   python cli.py students list --where program=BSCS --sort lastname
+#   python cli.py students list --filter "year>=3" "lastname^=mend"
+#   python cli.py students count --where college=CCS year=4
+#   python cli.py students search "mend bsit" --format csv
+#   python cli.py programs add code=BSDS "name=Data Science" college=CCS
+#   python cli.py students batch changes.jsonl
+#   python cli.py programs delete BSCS --policy set-null
+#   python cli.py students orphans --all
+#   python cli.py students stats college
+# a batch file holds one json object per line:
+#   {"op": "add", "row": {...}}, {"op": "update", "key": "...", "row": {...}}
+#   or {"op": "delete", "key": "..."}; "-" reads them from stdin.
+
+
+def pairs(items):
+    # ["program=BSCS", ...] -> {"program": "BSCS", ...}
+    data = {}
+    for item in items:
+        field, sep, value = item.partition("=")
+        if not sep:
+            raise ServiceError(f"Expected field=value, got '{item}'.")
+        data[field] = value
+    return data
+
+
+def write_rows(rows, fields, fmt, out=sys.stdout):
+    if fmt == "csv":
+        writer = csv.DictWriter(out, fieldnames=fields, lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(rows)
+    else:
+        json.dump(rows, out, indent=1)
+        out.write("\n")
+
+
+def run_batch(service, lines):
+    results = []
+    for n, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            op = json.loads(line)
+            if op.get("op") == "add":
+                service.add(op.get("row", {}))
+            elif op.get("op") == "update":
+                service.update(op["key"], op.get("row", {}))
+            elif op.get("op") == "delete":
+                service.delete(op["key"])
+            else:
+                raise ServiceError(f"Unknown op '{op.get('op')}'.")
+        except (ServiceError, ValueError, KeyError, AttributeError) as e:
+            results.append({"line": n, "ok": False, "error": str(e)})
+        else:
+            results.append({"line": n, "ok": True, "error": ""})
+    return results
+
+
+def main(argv=None):
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--format", choices=("json", "csv"), default="json")
+    parser = argparse.ArgumentParser(description="Student information system")
+    parser.add_argument("table", choices=sorted(SERVICES))
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def command(name, help):
+        return sub.add_parser(name, help=help, parents=[common])
+
+    ls = command("list", "rows, filtered and sorted")
+    ls.add_argument("--search", default="")
+    ls.add_argument("--where", nargs="*", default=[], metavar="FIELD=VALUE")
+    ls.add_argument("--filter", nargs="*", default=[], metavar="FIELD<OP>VALUE",
+                    help="=, !=, ^= (starts with), <, <=, >, >=")
+    ls.add_argument("--sort")
+    ls.add_argument("--desc", action="store_true")
+    ls.add_argument("--offset", type=int, default=0)
+    ls.add_argument("--limit", type=int)
+    co = command("count", "number of rows")
+    co.add_argument("--search", default="")
+    co.add_argument("--where", nargs="*", default=[], metavar="FIELD=VALUE")
+    co.add_argument("--filter", nargs="*", default=[], metavar="FIELD<OP>VALUE")
+    se = command("search", "rows matching some text")
+    se.add_argument("text")
+    se.add_argument("--limit", type=int)
+    command("get", "one row").add_argument("key")
+    command("add", "add a row").add_argument(
+        "values", nargs="+", metavar="FIELD=VALUE")
+    up = command("update", "change fields of a row")
+    up.add_argument("key")
+    up.add_argument("values", nargs="+", metavar="FIELD=VALUE")
+    de = command("delete", "delete a row")
+    de.add_argument("key")
+    de.add_argument("--policy", choices=POLICIES,
+                    help="what to do with rows referring to it")
+    cc = command("change-code", "give a row a new code")
+    cc.add_argument("key")
+    cc.add_argument("new")
+    cc.add_argument("--policy", choices=POLICIES)
+    command("orphans", "references to rows that don't exist").add_argument(
+        "--all", action="store_true", help="in every table")
+    command("stats", "number of students per group").add_argument(
+        "group", choices=GROUPS)
+    command("batch", "apply a file of changes").add_argument("file")
+    args = parser.parse_args(argv)
+
+    service = SERVICES[args.table]
+    try:
+        if args.command in ("list", "count"):
+            where = [*as_filters(pairs(args.where)), *args.filter]
+        if args.command == "list":
+            rows = service.query(args.search, args.sort, args.desc,
+                                 where, args.offset, args.limit)
+        elif args.command == "count":
+            print(service.count(args.search, where))
+            return 0
+        elif args.command == "search":
+            rows = service.search(args.text, args.limit)
+        elif args.command == "get":
+            row = service.lookup(args.key)
+            if row is None:
+                raise ServiceError(f"{service.label} not found.")
+            rows = [row]
+        elif args.command == "add":
+            rows = [service.add(pairs(args.values))]
+        elif args.command == "update":
+            rows = [service.update(args.key, pairs(args.values))]
+        elif args.command == "delete":
+            service.delete(args.key, args.policy)
+            rows = []
+        elif args.command == "change-code":
+            service.change_code(args.key, args.new, args.policy)
+            rows = [service.get(args.new.strip())]
+        elif args.command == "stats":
+            counts = student_stats().counts(args.group)
+            found = [{args.group: k, "students": n}
+                     for k, n in sorted(counts.items())]
+            write_rows(found, [args.group, "students"], args.format)
+            return 0
+        elif args.command == "orphans":
+            found = integrity.orphans() if args.all else service.orphans()
+            write_rows(found, ["table", "key", "field", "value"], args.format)
+            return 1 if found else 0
+        else:
+            # the writer thread merges the journal appends of a whole batch
+            use_background_io()
+            if args.file == "-":
+                results = run_batch(service, sys.stdin)
+            else:
+                with open(args.file, newline="") as f:
+                    results = run_batch(service, f)
+            write_rows(results, ["line", "ok", "error"], args.format)
+            return 0 if all(r["ok"] for r in results) else 1
+    except ServiceError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        # make writes durable before exiting
+        for table in TABLES:
+            table.flush()
+    write_rows(rows, service.fields, args.format)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,275 @@
+import csv
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+from itertools import accumulate, compress
+
+from gcpause import gc_paused
+
+# a csv file read in place: memory-mapped, with the byte offset of every
+# row in an array('Q') and key -> row number, so a lookup or a page of rows
+# parses just those rows. the offsets and keys are kept in <file>.idx and
+# reused while the file is unchanged. a file that only grew (rows appended)
+# is indexed from where the index stopped; a rewritten one (new inode,
+# see file_stamp) from the start.
+MAGIC = b"SSISIDX1"
+# magic, inode, mtime, indexed size, columns in the file, rows, length of
+# the keys
+HEADER = struct.Struct("<8sQqQQQQ")
+# bytes before the indexed end that must still be there to append
+TAIL = 64
+
+
+class MappedCsv:
+    def __init__(self, filepath, fields, key):
+        self.filepath = filepath
+        self.index_file = filepath + ".idx"
+        self.fields = list(fields)
+        self.key = key
+        self._map = None
+        self._stamp = None
+        self._size = 0
+        self._tail = b""
+        self._offsets = array("Q")
+        self._rows = {}
+        self._columns = None
+        self._width = 0
+        self._sorted = None
+
+    def close(self):
+        # unmap the file (windows can't replace it while it's mapped); the
+        # index is kept, and the next read maps it again
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    # reading
+    def _open(self):
+        # (re)map the file and bring the index up to date with it
+        try:
+            st = os.stat(self.filepath)
+        except FileNotFoundError:
+            self.close()
+            self._reset()
+            return
+        stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if stamp == self._stamp and (self._map is not None or not st.st_size):
+            return
+        if self._stamp is None:
+            with gc_paused():
+                self._load_index()
+        old = self._stamp
+        # only a file that grew is assumed to start as it did
+        if old is None or old[0] != st.st_ino or st.st_size < old[2] \
+                or (st.st_size == old[2] and st.st_mtime_ns != old[1]):
+            self._reset()
+        self.close()
+        if st.st_size:
+            with open(self.filepath, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._size and self._map[self._size - len(self._tail):
+                                    self._size] != self._tail:
+            self._reset()
+        grew = self._size < st.st_size
+        if grew:
+            self._sorted = None
+            with gc_paused():
+                self._scan(self._size, st.st_size)
+        self._stamp = stamp
+        if grew:
+            self._save_index()
+
+    def _reset(self):
+        self._stamp = None
+        self._size = 0
+        self._tail = b""
+        self._offsets = array("Q")
+        self._rows = {}
+        self._columns = None
+        self._width = 0
+        self._sorted = None
+
+    def _row_end(self, start, end):
+        # the end of the row starting at `start`: its newline, unless that
+        # is inside quotes, which only csv itself can tell
+        data = self._map
+        stop = data.find(b"\n", start, end)
+        stop = end if stop < 0 else stop + 1
+        if data.find(b'"', start, stop) < 0:
+            return stop
+        ends = []
+
+        def lines(pos):
+            while pos < end:
+                nl = data.find(b"\n", pos, end)
+                ends.append(end if nl < 0 else nl + 1)
+                yield data[pos:ends[-1]].decode()
+                pos = ends[-1]
+
+        next(csv.reader(lines(start)), None)
+        return ends[-1]
+
+    def _values(self, start, stop):
+        line = self._map[start:stop]
+        if b'"' not in line:
+            return line.rstrip(b"\r\n").decode().split(",")
+        return next(csv.reader([line.decode()]), [])
+
+    def _scan(self, start, end):
+        data, offsets, rows = self._map, self._offsets, self._rows
+        pos = start
+        if pos == 0:
+            stop = self._row_end(0, end)
+            header = self._values(0, stop)
+            self._columns = [header.index(f) if f in header else None
+                             for f in self.fields]
+            self._width = len(header)
+            pos = stop
+        at = self._columns[self.fields.index(self.key)]
+        while at is not None and pos < end:
+            # the lines up to the next quote are split all at once; the row
+            # with the quote (maybe several lines) goes through csv
+            quote = data.find(b'"', pos, end)
+            plain = end if quote < 0 else data.rfind(b"\n", pos, quote) + 1
+            if plain > pos:
+                self._scan_plain(pos, plain, at)
+                pos = plain
+            if quote >= 0:
+                stop = self._row_end(pos, end)
+                values = self._values(pos, stop)
+                if values:
+                    rows[values[at] if at < len(values) else ""] = len(offsets)
+                    offsets.append(pos)
+                pos = stop
+        self._size = end
+        self._tail = data[max(0, end - TAIL):end]
+
+    def _scan_plain(self, start, stop, at):
+        # lines without quotes, split all at once; offsets from the line
+        # lengths, the key as the text before the at+1'th comma
+        lines = self._map[start:stop].split(b"\n")
+        if not lines[-1]:
+            lines.pop()
+        offsets = array("Q", accumulate(map((1).__add__, map(len, lines)),
+                                        initial=start))
+        offsets.pop()
+        if at == 0:
+            keys = [line.partition(b",")[0] for line in lines]
+        else:
+            keys = [v[at] if len(v) > at else b"" for v in
+                    [line.split(b",", at + 1) for line in lines]]
+        if at == self._width - 1:
+            keys = [k.rstrip(b"\r") for k in keys]
+        if b"" in lines or b"\r" in lines:
+            keep = [bool(line.strip()) for line in lines]
+            offsets = array("Q", compress(offsets, keep))
+            keys = list(compress(keys, keep))
+        first = len(self._offsets)
+        self._offsets.extend(offsets)
+        # a key listed twice: the later row wins, as in a load
+        self._rows.update(zip(map(bytes.decode, keys),
+                              range(first, first + len(keys))))
+
+    def _span(self, n):
+        start = self._offsets[n]
+        return start, self._row_end(start, self._size)
+
+    def _parse(self, n):
+        values = self._values(*self._span(n))
+        return {f: values[i] if i is not None and i < len(values) else ""
+                for f, i in zip(self.fields, self._columns)}
+
+    def get(self, key):
+        self._open()
+        n = self._rows.get(key)
+        return None if n is None else self._parse(n)
+
+    def sorted_keys(self, typed):
+        # the keys (each once) in (typed(key), key) order, as a table sorted
+        # by its key has them, e.g. sorting.id_key; kept until the file
+        # changes
+        self._open()
+        if self._sorted is None or self._sorted[0] is not typed:
+            # by key first: the sort by typed() keeps that order among
+            # equals, and needs no (typed, key) pair per key
+            with gc_paused():
+                self._sorted = (typed, sorted(sorted(self._rows), key=typed))
+        return self._sorted[1]
+
+    def keys(self):
+        self._open()
+        return self._rows.keys()
+
+    def __contains__(self, key):
+        self._open()
+        return key in self._rows
+
+    def __len__(self):
+        # rows in the file (a key listed twice counts twice)
+        self._open()
+        return len(self._offsets)
+
+    # the sidecar
+    def _load_index(self):
+        # a missing, foreign or damaged sidecar is ignored
+        try:
+            with open(self.index_file, "rb") as f:
+                data = f.read()
+            magic, ino, mtime, size, width, count, length = \
+                HEADER.unpack_from(data)
+            if magic != MAGIC:
+                return
+            pos = HEADER.size
+            columns = struct.unpack_from(f"<{len(self.fields)}q", data, pos)
+            pos += 8 * len(self.fields)
+            tail = data[pos + 1:pos + 1 + data[pos]]
+            pos += 1 + len(tail)
+            offsets = array("Q")
+            offsets.frombytes(data[pos:pos + 8 * count])
+            pos += 8 * count
+            keys = data[pos:pos + length].decode().split("\n") if count else []
+        except (OSError, struct.error, IndexError, ValueError):
+            return
+        if len(offsets) != count or len(keys) != count:
+            return
+        self._columns = [None if c < 0 else c for c in columns]
+        self._offsets = offsets
+        self._rows = dict(zip(keys, range(count)))
+        self._size = size
+        self._width = width
+        self._tail = tail
+        self._stamp = (ino, mtime, size)
+
+    def _save_index(self):
+        # skipped (the index is just rebuilt) if it can't be written or a
+        # key couldn't be stored one per line
+        by_row = [None] * len(self._offsets)
+        for k, n in self._rows.items():
+            by_row[n] = k
+        at = self._columns[self.fields.index(self.key)]
+        for n, k in enumerate(by_row):
+            if k is None:
+                # the first row of a key listed twice
+                values = self._values(*self._span(n))
+                by_row[n] = values[at] if at < len(values) else ""
+        if any("\n" in k for k in by_row):
+            return
+        keys = "\n".join(by_row).encode()
+        ino, mtime, size = self._stamp
+        columns = [-1 if c is None else c for c in self._columns]
+        directory = os.path.dirname(self.index_file) or "."
+        try:
+            fd, tmp = tempfile.mkstemp(dir=directory, prefix=".",
+                                       suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(HEADER.pack(MAGIC, ino, mtime, self._size, self._width,
+                                    len(self._offsets), len(keys)))
+                f.write(struct.pack(f"<{len(columns)}q", *columns))
+                f.write(bytes([len(self._tail)]) + self._tail)
+                f.write(self._offsets.tobytes())
+                f.write(keys)
+            os.replace(tmp, self.index_file)
+        except OSError:
+            pass
@@ -1,54 +1,123 @@
-import csv
-import os
-
-# file paths
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-
-COLLEGES_FILE = os.path.join(BASE_DIR, "data", "colleges.csv")
-PROGRAMS_FILE = os.path.join(BASE_DIR, "data", "programs.csv")
-STUDENTS_FILE = os.path.join(BASE_DIR, "data", "students.csv")
-
-COLLEGE_FIELDS = ["code", "name"]
-PROGRAM_FIELDS = ["code", "name", "college"]
-STUDENT_FIELDS = ["id", "firstname", "lastname", "program", "year", "gender"]
-
-def load_csv(filepath, fields):
-    if not os.path.exists(filepath):
-        return []
-    with open(filepath, newline="") as f:
-        return list(csv.DictReader(f))
-
-def save_csv(filepath, fields, rows):
-    with open(filepath, "w", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=fields)
-        writer.writeheader()
-        writer.writerows(rows)
-
-# colleges
-def load_colleges():
-    return load_csv(COLLEGES_FILE, COLLEGE_FIELDS)
-
-def save_colleges(rows):
-    save_csv(COLLEGES_FILE, COLLEGE_FIELDS, rows)
-
-def get_college_codes():
-    return [r["code"] for r in load_colleges()]
-
-# programs
-def load_programs():
-    return load_csv(PROGRAMS_FILE, PROGRAM_FIELDS)
-
-def save_programs(rows):
-    save_csv(PROGRAMS_FILE, PROGRAM_FIELDS, rows)
-
-def get_program_codes():
-    return [r["code"] for r in load_programs()]
-
-# students
-def load_students():
-    return load_csv(STUDENTS_FILE, STUDENT_FIELDS)
-
-def save_students(rows):
-
-    save_csv(STUDENTS_FILE, STUDENT_FIELDS, rows)
-
+import os
+
+from executor import IoExecutor
+from fields import COLLEGE_FIELDS, PROGRAM_FIELDS, STUDENT_FIELDS
+from integrity import CASCADE, RESTRICT, IntegrityEngine, Relation
+from references import References
+from stats import StudentStats
+from storage import CsvBackend, SqliteBackend
+
+# file paths
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+
+COLLEGES_FILE = os.path.join(DATA_DIR, "colleges.csv")
+PROGRAMS_FILE = os.path.join(DATA_DIR, "programs.csv")
+STUDENTS_FILE = os.path.join(DATA_DIR, "students.csv")
+DB_FILE = os.path.join(DATA_DIR, "ssis.db")
+
+# SSIS_BACKEND=sqlite keeps everything in data/ssis.db instead of the csv
+# files (which it is seeded from on first run)
+BACKEND = os.environ.get("SSIS_BACKEND", "csv")
+
+def open_backend(name=BACKEND):
+    if name == "sqlite":
+        return SqliteBackend(DB_FILE, DATA_DIR)
+    return CsvBackend(DATA_DIR)
+
+backend = open_backend()
+colleges = backend.table("colleges", COLLEGE_FIELDS, "code")
+programs = backend.table("programs", PROGRAM_FIELDS, "code",
+                         indexes=("college",), categorical=("college",))
+students = backend.table("students", STUDENT_FIELDS, "id",
+                         indexes=("program",), journal=True,
+                         categorical=("program", "year", "gender"))
+TABLES = (colleges, programs, students)
+
+# sorted codes, names and type-ahead for the comboboxes and validation (see
+# references.py)
+college_refs = References(colleges)
+program_refs = References(programs)
+
+# what a delete does to the rows still referring to the deleted one (see
+# integrity.py); a new code is followed by the rows referring to the old one
+integrity = IntegrityEngine([
+    Relation(programs, "college", colleges, "programs", "college",
+             on_delete=RESTRICT, on_update=CASCADE),
+    Relation(students, "program", programs, "students", "program",
+             on_delete=RESTRICT, on_update=CASCADE),
+])
+
+# disk work for the gui. after use_background_io() saves only change memory
+# and are written out on the executor's writer thread, and changes made by
+# other programs are picked up by refresh_tables() instead of on each read
+executor = IoExecutor()
+
+def use_background_io():
+    backend.use_writer(executor)
+
+def refresh_tables():
+    # a check still waiting from last time is superseded, not queued twice
+    return [executor.read(t.refresh, tag=t) for t in TABLES]
+
+# full-text search over student names and programs, built on first use
+_fulltext = None
+
+def student_fulltext():
+    global _fulltext
+    if _fulltext is None:
+        _fulltext = backend.fulltext(students, programs)
+    return _fulltext
+
+# students per program, college, year and gender (see stats.py)
+_stats = None
+
+def student_stats():
+    global _stats
+    if _stats is None:
+        _stats = StudentStats(students, programs)
+    return _stats
+
+def search_students(query, limit=None):
+    # ranked rows for e.g. "mend bsit"; works without the gui
+    return [r for r in map(students.get, student_fulltext().search(query, limit))
+            if r is not None]
+
+# reverse lookups
+def programs_in_college(code):
+    return programs.keys_where("college", code)
+
+def students_in_program(code):
+    return students.keys_where("program", code)
+
+# load_x() returns the rows as dicts of their own, free to edit in place.
+# save_x(rows) then only writes the rows that differ, and rows changed by
+# anyone else after the load raise a ConflictError instead of being
+# overwritten (see Repository.replace)
+
+# colleges
+def load_colleges():
+    return colleges.snapshot()
+
+def save_colleges(rows):
+    colleges.replace(rows, getattr(rows, "version", None))
+
+def get_college_codes():
+    return list(college_refs.codes())
+
+# programs
+def load_programs():
+    return programs.snapshot()
+
+def save_programs(rows):
+    programs.replace(rows, getattr(rows, "version", None))
+
+def get_program_codes():
+    return list(program_refs.codes())
+
+# students
+def load_students():
+    return students.snapshot()
+
+def save_students(rows):
+    students.replace(rows, getattr(rows, "version", None))
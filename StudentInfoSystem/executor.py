@@ -0,0 +1,101 @@
+import atexit
+import queue
+import threading
+import traceback
+from concurrent.futures import Future, InvalidStateError, ThreadPoolExecutor
+
+
+def _settle(set_outcome, value):
+    try:
+        set_outcome(value)
+    except InvalidStateError:
+        pass  # superseded and cancelled meanwhile
+
+
+class IoExecutor:
+    # runs disk work off the calling (Tk) thread.
+    # writes go to a single writer thread and are done in the order they
+    # were submitted. whatever queued up while the previous batch was on
+    # disk is taken together, and a run of writes with the same fn becomes
+    # one fn(items) call, e.g. many journal records with a single fsync.
+    # reads run on a small pool. a read submitted with a tag supersedes the
+    # previous read with that tag: it is cancelled if it hasn't started, or
+    # its result is dropped if it has.
+    def __init__(self, readers=2):
+        self.batches = 0
+        self._writes = queue.SimpleQueue()
+        self._writer = None
+        self._readers = ThreadPoolExecutor(readers,
+                                           thread_name_prefix="io-read")
+        self._reads = {}
+        self._lock = threading.Lock()
+        atexit.register(self.drain)
+
+    def on_error(self, error):
+        # called from the worker thread for a failed read or write; replace
+        # it to report errors somewhere else
+        traceback.print_exception(error)
+
+    def write(self, fn, item=None):
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop,
+                                                name="io-write", daemon=True)
+                self._writer.start()
+        future = Future()
+        self._writes.put((fn, item, future))
+        return future
+
+    def _write_loop(self):
+        while True:
+            pending = [self._writes.get()]
+            while True:
+                try:
+                    pending.append(self._writes.get_nowait())
+                except queue.Empty:
+                    break
+            start = 0
+            while start < len(pending):
+                fn, end = pending[start][0], start + 1
+                while end < len(pending) and pending[end][0] == fn:
+                    end += 1
+                self._run_batch(fn, pending[start:end])
+                start = end
+
+    def _run_batch(self, fn, batch):
+        try:
+            result = fn([item for _, item, _ in batch])
+        except Exception as e:
+            for _, _, future in batch:
+                future.set_exception(e)
+            self.on_error(e)
+            return
+        self.batches += 1
+        for _, _, future in batch:
+            future.set_result(result)
+
+    def drain(self):
+        # wait until every write submitted so far is on disk
+        if self._writer is not None:
+            self.write(lambda items: None).result()
+
+    def read(self, fn, *args, tag=None):
+        future = Future()
+        if tag is not None:
+            with self._lock:
+                old, self._reads[tag] = self._reads.get(tag), future
+            if old is not None:
+                old.cancel()
+        self._readers.submit(self._read, future, fn, args)
+        return future
+
+    def _read(self, future, fn, args):
+        if future.cancelled():
+            return
+        try:
+            result = fn(*args)
+        except Exception as e:
+            if not future.cancelled():
+                self.on_error(e)
+            return _settle(future.set_exception, e)
+        _settle(future.set_result, result)
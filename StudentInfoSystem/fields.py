@@ -0,0 +1,5 @@
+# the columns of each table, in file order. kept apart from database.py so
+# that modules like validator.py can use them without opening the tables
+COLLEGE_FIELDS = ["code", "name"]
+PROGRAM_FIELDS = ["code", "name", "college"]
+STUDENT_FIELDS = ["id", "firstname", "lastname", "program", "year", "gender"]
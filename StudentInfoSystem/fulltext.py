@@ -0,0 +1,251 @@
+import re
+from bisect import bisect_left, insort
+
+from gcpause import gc_paused
+
+# full-text search over student first and last names plus the code and name
+# of their program. every query term is a prefix ("mend" finds Mendoza),
+# all terms must match, and results are ranked: a term that matches a
+# whole word counts more than a partial one, last names more than first
+# names, names more than programs.
+TOKEN = re.compile(r"\w+")
+LASTNAME, FIRSTNAME, PROGRAM = 3.0, 2.0, 1.0
+
+
+def tokens(text):
+    return [t.casefold() for t in TOKEN.findall(text)]
+
+
+def is_fulltext(query):
+    # words separated by spaces use this; one word (even "2024-0001", which
+    # is several tokens) keeps the plain substring search
+    return len(query.split()) > 1
+
+
+class TermIndex:
+    # term -> {key: weight}, plus a sorted term list for prefix lookups
+    def __init__(self):
+        self.postings = {}
+        self.terms = []
+
+    def add(self, key, weighted_terms):
+        for term, weight in weighted_terms:
+            posting = self.postings.get(term)
+            if posting is None:
+                posting = self.postings[term] = {}
+                insort(self.terms, term)
+            posting[key] = max(posting.get(key, 0.0), weight)
+
+    def remove(self, key, weighted_terms):
+        for term, _ in weighted_terms:
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            posting.pop(key, None)
+            if not posting:
+                del self.postings[term]
+                del self.terms[bisect_left(self.terms, term)]
+
+    def expand(self, prefix):
+        # (posting, closeness) for every term starting with `prefix`
+        found = []
+        i = bisect_left(self.terms, prefix)
+        while i < len(self.terms) and self.terms[i].startswith(prefix):
+            term = self.terms[i]
+            found.append((self.postings[term], len(prefix) / len(term)))
+            i += 1
+        return found
+
+    def lookup(self, prefix):
+        # key -> best score among the terms starting with `prefix`
+        scores = {}
+        for posting, closeness in self.expand(prefix):
+            for key, weight in posting.items():
+                score = weight * closeness
+                if score > scores.get(key, 0.0):
+                    scores[key] = score
+        return scores
+
+
+class MemoryFullText:
+    # names are indexed per student; program codes and names per program and
+    # joined through the program -> students index at query time, so
+    # renaming a program only touches one entry
+    def __init__(self, students, programs):
+        self.students = students
+        self.programs = programs
+        self._names = None
+        self._programs = None
+        students.subscribe(self._on_student)
+        programs.subscribe(self._on_program)
+
+    @staticmethod
+    def student_terms(row):
+        return ([(t, LASTNAME) for t in tokens(row["lastname"])] +
+                [(t, FIRSTNAME) for t in tokens(row["firstname"])])
+
+    @staticmethod
+    def program_terms(row):
+        return [(t, PROGRAM) for t in tokens(row["code"] + " " + row["name"])]
+
+    def _build(self):
+        # rows() first: a lazy (re)load notifies us, which resets the index
+        students, programs = self.students.rows(), self.programs.rows()
+        if self._names is None:
+            self._names = TermIndex()
+            with gc_paused():
+                for r in students:
+                    self._names.add(r["id"], self.student_terms(r))
+        if self._programs is None:
+            self._programs = TermIndex()
+            for r in programs:
+                self._programs.add(r["code"], self.program_terms(r))
+
+    def _on_student(self, op, key, row, old):
+        if self._names is None:
+            return
+        if op == "reload":
+            self._names = None
+            return
+        if old is not None:
+            self._names.remove(key, self.student_terms(old))
+        if row is not None:
+            self._names.add(key, self.student_terms(row))
+
+    def _on_program(self, op, key, row, old):
+        if self._programs is None:
+            return
+        if op == "reload":
+            self._programs = None
+            return
+        if old is not None:
+            self._programs.remove(key, self.program_terms(old))
+        if row is not None:
+            self._programs.add(key, self.program_terms(row))
+
+    def _size(self, term):
+        # how many students a term can match, to start with the rarest
+        names = sum(len(p) for p, _ in self._names.expand(term))
+        return names + sum(self.students.count_where("program", code)
+                           for code in self._programs.lookup(term))
+
+    def scores(self, query):
+        # key -> summed score of the students matching every term. the
+        # rarest term is looked up in full; the others are only checked
+        # against what is left.
+        # changes merged on the io threads wait until this is done
+        with self.students.reading(), self.programs.reading():
+            self._build()
+            terms = sorted(set(tokens(query)), key=self._size)
+            if not terms:
+                return {k: 0.0 for k in self.students.codes()}
+            result = self._names.lookup(terms[0])
+            for code, score in self._programs.lookup(terms[0]).items():
+                for key in self.students.keys_where("program", code):
+                    if score > result.get(key, 0.0):
+                        result[key] = score
+            for term in terms[1:]:
+                best = {}
+                programs = self._programs.lookup(term)
+                if programs:
+                    for key in result:
+                        score = programs.get(self.students.get(key)["program"])
+                        if score:
+                            best[key] = score
+                for posting, closeness in self._names.expand(term):
+                    for key in result.keys() & posting.keys():
+                        score = posting[key] * closeness
+                        if score > best.get(key, 0.0):
+                            best[key] = score
+                result = {k: result[k] + score for k, score in best.items()}
+                if not result:
+                    break
+            return result
+
+    def search(self, query, limit=None):
+        # matching student ids, best first
+        scores = self.scores(query)
+        ranked = sorted(scores, key=lambda k: (-scores[k], k))
+        return ranked if limit is None else ranked[:limit]
+
+    def matches(self, key, query):
+        row = self.students.get(key)
+        if row is None:
+            return False
+        program = self.programs.get(row["program"])
+        words = [t for t, _ in self.student_terms(row)]
+        words += tokens(row["program"] + " " + (program["name"] if program else ""))
+        return all(any(w.startswith(t) for w in words) for t in tokens(query))
+
+
+class SqliteFullText:
+    # an fts5 table over the same columns, keyed by the students rowid and
+    # kept in step by triggers on students and programs (so don't VACUUM,
+    # which may renumber the rowids of a table with a text primary key)
+    def __init__(self, backend):
+        self.backend = backend
+        statements = [(sql, ()) for sql in SQLITE_FTS_SCHEMA]
+        backend.transaction(statements)
+        if not backend.execute("SELECT 1 FROM seeded WHERE name = 'students_fts'"):
+            backend.transaction([
+                ("DELETE FROM students_fts", ()),
+                ("INSERT INTO students_fts (rowid, firstname, lastname, program, "
+                 "program_name) SELECT s.rowid, s.firstname, s.lastname, "
+                 "s.program, coalesce(p.name, '') FROM students s "
+                 "LEFT JOIN programs p ON p.code = s.program", ()),
+                ("INSERT INTO seeded VALUES ('students_fts')", ()),
+            ])
+
+    @staticmethod
+    def match_expression(query):
+        return " AND ".join(f'"{t}"*' for t in tokens(query))
+
+    def where(self, query):
+        # sql condition on the students table for use in other queries
+        return ("rowid IN (SELECT rowid FROM students_fts "
+                "WHERE students_fts MATCH ?)", [self.match_expression(query)])
+
+    def search(self, query, limit=None):
+        if not tokens(query):
+            return [r[0] for r in self.backend.execute("SELECT id FROM students")]
+        rows = self.backend.execute(
+            "SELECT s.id FROM students_fts f JOIN students s "
+            "ON s.rowid = f.rowid WHERE students_fts MATCH ? "
+            "ORDER BY bm25(students_fts, 2.0, 3.0, 1.0, 1.0) LIMIT ?",
+            (self.match_expression(query), -1 if limit is None else limit))
+        return [r[0] for r in rows]
+
+    def matches(self, key, query):
+        where, params = self.where(query)
+        return bool(self.backend.execute(
+            f"SELECT 1 FROM students WHERE id = ? AND {where}", [key] + params))
+
+
+SQLITE_FTS_SCHEMA = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS students_fts USING fts5("
+    "firstname, lastname, program, program_name)",
+    "CREATE TRIGGER IF NOT EXISTS students_fts_insert AFTER INSERT ON students "
+    "BEGIN INSERT INTO students_fts (rowid, firstname, lastname, program, "
+    "program_name) VALUES (new.rowid, new.firstname, new.lastname, "
+    "new.program, coalesce((SELECT name FROM programs "
+    "WHERE code = new.program), '')); END",
+    "CREATE TRIGGER IF NOT EXISTS students_fts_delete AFTER DELETE ON students "
+    "BEGIN DELETE FROM students_fts WHERE rowid = old.rowid; END",
+    "CREATE TRIGGER IF NOT EXISTS students_fts_update AFTER UPDATE ON students "
+    "BEGIN DELETE FROM students_fts WHERE rowid = old.rowid; "
+    "INSERT INTO students_fts (rowid, firstname, lastname, program, "
+    "program_name) VALUES (new.rowid, new.firstname, new.lastname, "
+    "new.program, coalesce((SELECT name FROM programs "
+    "WHERE code = new.program), '')); END",
+    "CREATE TRIGGER IF NOT EXISTS programs_fts_upsert AFTER INSERT ON programs "
+    "BEGIN UPDATE students_fts SET program_name = new.name WHERE rowid IN "
+    "(SELECT rowid FROM students WHERE program = new.code); END",
+    "CREATE TRIGGER IF NOT EXISTS programs_fts_update AFTER UPDATE ON programs "
+    "BEGIN UPDATE students_fts SET program_name = '' WHERE rowid IN "
+    "(SELECT rowid FROM students WHERE program = old.code); "
+    "UPDATE students_fts SET program_name = new.name WHERE rowid IN "
+    "(SELECT rowid FROM students WHERE program = new.code); END",
+    "CREATE TRIGGER IF NOT EXISTS programs_fts_delete AFTER DELETE ON programs "
+    "BEGIN UPDATE students_fts SET program_name = '' WHERE rowid IN "
+    "(SELECT rowid FROM students WHERE program = old.code); END",
+]
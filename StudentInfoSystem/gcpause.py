@@ -0,0 +1,16 @@
+import gc
+from contextlib import contextmanager
+
+
+@contextmanager
+def gc_paused():
+    # building millions of small rows/tuples makes the cyclic collector run
+    # full passes over everything already loaded, over and over, without
+    # freeing anything. nothing built here is cyclic, so pause it meanwhile.
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
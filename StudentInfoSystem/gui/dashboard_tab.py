@@ -0,0 +1,95 @@
+import tkinter as tk
+import time
+import ttkbootstrap as tb
+from database import executor, student_stats
+from gui import startup
+from gui.ui_thread import UiDispatcher
+from stats import GROUPS
+
+NAV    = "#0d1b2a"
+BG     = "#f5f7fa"
+WHITE  = "#ffffff"
+GREY   = "#6c757d"
+REDRAW_MS = 250
+
+
+class DashboardTab:
+    # students per college, program, year and gender, read from the
+    # counters in stats.py; redrawn a moment after they change
+    def __init__(self, parent):
+        self.created = time.perf_counter()
+        self.parent = parent
+        self.parent.configure(bg=BG)
+        self.stats = student_stats()
+        self.first = True
+        self._job = None
+        self.build_ui()
+        self.ui = UiDispatcher(self.parent)
+        self.stats.subscribe(self.ui.wrap(self.schedule))
+        self.reload()
+
+    def build_ui(self):
+        tk.Label(self.parent, text="Dashboard",
+                 font=("Georgia", 20, "bold"),
+                 bg=BG, fg=NAV).pack(anchor="w", padx=25, pady=(20, 5))
+        self.total = tk.Label(self.parent, text="Loading…",
+                              font=("Segoe UI", 12), bg=BG, fg=GREY)
+        self.total.pack(anchor="w", padx=25, pady=(0, 10))
+
+        grid = tk.Frame(self.parent, bg=BG)
+        grid.pack(fill="both", expand=True, padx=25, pady=5)
+        self.trees = {}
+        for i, group in enumerate(("college", "program", "year", "gender")):
+            card = tk.Frame(grid, bg=WHITE)
+            card.grid(row=i // 2, column=i % 2, sticky="nsew",
+                      padx=(0 if i % 2 == 0 else 10, 0), pady=(0, 10))
+            tk.Label(card, text=f"Students per {group}",
+                     font=("Segoe UI", 11, "bold"), bg=WHITE,
+                     fg=NAV).pack(anchor="w", padx=12, pady=(10, 4))
+            tree = tb.Treeview(card, columns=("group", "students"),
+                               show="headings", height=6,
+                               style="Stats.Treeview")
+            tree.heading("group", text=group.upper())
+            tree.heading("students", text="STUDENTS")
+            tree.column("group", width=200, anchor="w")
+            tree.column("students", width=100, anchor="e")
+            tree.pack(fill="both", expand=True, padx=12, pady=(0, 12))
+            self.trees[group] = tree
+        for i in range(2):
+            grid.columnconfigure(i, weight=1)
+            grid.rowconfigure(i, weight=1)
+
+    def schedule(self):
+        # a burst of changes (an import, a cascade) becomes one redraw
+        if self._job is None:
+            self._job = self.parent.after(REDRAW_MS, self.reload)
+
+    def reload(self):
+        # the first count scans the students, so it's done off the Tk
+        # thread; after that this only copies the counters
+        self._job = None
+        self.ui.when_done(executor.read(self.snapshot, tag=self), self.show,
+                          self.failed)
+
+    def snapshot(self):
+        return {g: self.stats.counts(g) for g in GROUPS}
+
+    def failed(self, error):
+        # the next change to the students schedules another count
+        self.total.configure(text=f"Could not count the students: {error}")
+
+    def show(self, counts):
+        self.total.configure(
+            text=f"{sum(counts['gender'].values()):,} students")
+        for group, tree in self.trees.items():
+            rows = counts[group].items()
+            if group in ("college", "program"):
+                rows = sorted(rows, key=lambda kv: (-kv[1], kv[0]))
+            else:
+                rows = sorted(rows)
+            tree.delete(*tree.get_children())
+            for value, n in rows:
+                tree.insert("", "end", values=(value or "(none)", f"{n:,}"))
+        if self.first:
+            self.first = False
+            startup.mark("Dashboard first load", self.created)
@@ -0,0 +1,47 @@
+from search import run_steps
+
+
+class DebouncedSearch:
+    # runs a search once typing has paused for `delay` ms. steps() must return
+    # a search generator (see views.py); it is advanced one chunk per Tk tick,
+    # and a newer keystroke drops whatever is pending or still running, so
+    # stale results are never shown.
+    def __init__(self, widget, steps, on_result, delay=150):
+        self.widget = widget
+        self.steps = steps
+        self.on_result = on_result
+        self.delay = delay
+        self._job = None
+        self._steps = None
+
+    @property
+    def pending(self):
+        return self._job is not None
+
+    def cancel(self):
+        if self._job is not None:
+            self.widget.after_cancel(self._job)
+            self._job = None
+        self._steps = None
+
+    def schedule(self, *_):
+        self.cancel()
+        self._job = self.widget.after(self.delay, self._start)
+
+    def _start(self):
+        self._steps = self.steps()
+        self._tick()
+
+    def _tick(self):
+        try:
+            next(self._steps)
+        except StopIteration as done:
+            self._job = self._steps = None
+            self.on_result(done.value)
+            return
+        self._job = self.widget.after(1, self._tick)
+
+    def run_now(self):
+        # search synchronously, e.g. right after a save
+        self.cancel()
+        self.on_result(run_steps(self.steps()))
@@ -0,0 +1,92 @@
+import os
+import sys
+import time
+import tkinter as tk
+from tkinter import Toplevel
+import ttkbootstrap as tb
+
+NAV   = "#0d1b2a"
+WHITE = "#ffffff"
+
+# how long an Add/Edit dialog takes from the click to being on screen,
+# printed to stderr by `python main.py --dialog-times` (or with
+# SSIS_DIALOG_TIMES=1 set)
+TIMES = ("--dialog-times" in sys.argv
+         or bool(os.environ.get("SSIS_DIALOG_TIMES")))
+
+
+class FormDialog:
+    # the Add/Edit window of a tab, built once and then reused: closing or
+    # saving only hides it (withdraw), and the next open refills its
+    # fields and shows it again (deiconify). subclasses lay out the form
+    # in build(form) and implement fill(values, is_edit) and save(),
+    # which calls close() when it succeeds.
+    # open times are kept in `times` (built, seconds) and reported
+    # with --dialog-times.
+    geometry = "420x310"
+    button_pady = 4
+
+    def __init__(self):
+        self.win = None
+        self.times = []
+        self._opened = None
+
+    def warm(self):
+        # build the window hidden, so the first click doesn't pay for it
+        if self.win is None or not self.win.winfo_exists():
+            self.win = Toplevel()
+            self.win.withdraw()
+            self.win.geometry(self.geometry)
+            self.win.configure(bg=WHITE)
+            self.win.resizable(False, False)
+            self.win.protocol("WM_DELETE_WINDOW", self.close)
+            self.win.bind("<Escape>", lambda e: self.close())
+            self.win.bind("<Map>", self._mapped)
+            self.heading = tk.Label(self.win, font=("Georgia", 14, "bold"),
+                                    bg=WHITE, fg=NAV)
+            self.heading.pack(anchor="w", padx=20, pady=(18, 10))
+            form = tk.Frame(self.win, bg=WHITE)
+            form.pack(fill="x", padx=20)
+            self.build(form)
+            tb.Button(self.win, text="Save", bootstyle="dark",
+                      command=self.save, width=12).pack(pady=self.button_pady)
+            return True
+        return False
+
+    def open(self, title, values, is_edit):
+        self._opened = (time.perf_counter(), self.warm())
+        self.win.title(title)
+        self.heading.configure(text=title)
+        self.is_edit = is_edit
+        self.fill(values, is_edit)
+        self.win.deiconify()
+        self.win.lift()
+        self.win.grab_set()
+
+    def close(self):
+        self.win.grab_release()
+        self.win.withdraw()
+
+    def _mapped(self, event):
+        # the children's <Map> events come here too
+        if event.widget is self.win and self._opened:
+            self.win.after_idle(self._shown, *self._opened)
+            self._opened = None
+
+    def _shown(self, started, built):
+        # after the redraws the mapping queued, so the form is painted
+        took = time.perf_counter() - started
+        self.times.append((built, took))
+        if TIMES:
+            kind = "built" if built else "reused"
+            print(f"{self.win.title():<16} {took * 1000:8.1f} ms  ({kind})",
+                  file=sys.stderr)
+
+    def build(self, form):
+        raise NotImplementedError
+
+    def fill(self, values, is_edit):
+        raise NotImplementedError
+
+    def save(self):
+        raise NotImplementedError
@@ -0,0 +1,66 @@
+import threading
+import tkinter as tk
+from tkinter import messagebox, Toplevel
+import ttkbootstrap as tb
+from gui.ui_thread import UiDispatcher
+
+NAV   = "#0d1b2a"
+WHITE = "#ffffff"
+GREY  = "#6c757d"
+
+
+class ProgressDialog:
+    # runs work(progress, cancelled) on a background thread behind a small
+    # progress window, then calls on_done(result) on the Tk thread.
+    # work reports with progress(fraction, message) and should stop early
+    # when cancelled() returns True.
+    def __init__(self, title, work, on_done):
+        self.on_done = on_done
+        self.win = Toplevel()
+        self.win.title(title)
+        self.win.geometry("380x170")
+        self.win.configure(bg=WHITE)
+        self.win.resizable(False, False)
+        self.win.grab_set()
+        self.win.protocol("WM_DELETE_WINDOW", self.cancel)
+
+        tk.Label(self.win, text=title, font=("Georgia", 14, "bold"),
+                 bg=WHITE, fg=NAV).pack(anchor="w", padx=20, pady=(18, 8))
+        self.status = tk.Label(self.win, text="Starting…",
+                               font=("Segoe UI", 10), bg=WHITE, fg=GREY)
+        self.status.pack(anchor="w", padx=20)
+        self.bar = tb.Progressbar(self.win, maximum=1.0, bootstyle="dark")
+        self.bar.pack(fill="x", padx=20, pady=8)
+        tb.Button(self.win, text="Cancel", bootstyle="secondary",
+                  command=self.cancel, width=10).pack(pady=4)
+
+        self.ui = UiDispatcher(self.win)
+        self._cancelled = threading.Event()
+        threading.Thread(target=self._run, args=(work,), daemon=True).start()
+
+    def cancel(self):
+        self._cancelled.set()
+        self.status.configure(text="Cancelling…")
+
+    def _run(self, work):
+        try:
+            result = work(self._progress, self._cancelled.is_set)
+        except Exception as e:
+            return self.ui.call(self._failed, e)
+        self.ui.call(self._finished, result)
+
+    def _progress(self, fraction, message):
+        self.ui.call(self._show, fraction, message)
+
+    def _show(self, fraction, message):
+        self.bar.configure(value=fraction)
+        if not self._cancelled.is_set():
+            self.status.configure(text=message)
+
+    def _finished(self, result):
+        self.win.destroy()
+        self.on_done(result)
+
+    def _failed(self, error):
+        self.win.destroy()
+        messagebox.showerror("Error", str(error))
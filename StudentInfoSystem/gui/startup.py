@@ -0,0 +1,19 @@
+import os
+import sys
+import time
+
+# startup timings, printed to stderr by `python main.py --startup-times`
+# (or with SSIS_STARTUP_TIMES=1 set). main.py imports this before anything
+# else, so the first mark covers tkinter, ttkbootstrap and the tab modules.
+START = time.perf_counter()
+ENABLED = ("--startup-times" in sys.argv
+           or bool(os.environ.get("SSIS_STARTUP_TIMES")))
+
+
+def mark(label, since=START):
+    # report the time spent since `since`; returns now, to time the next step
+    now = time.perf_counter()
+    if ENABLED:
+        print(f"{label:<24} {(now - since) * 1000:8.1f} ms"
+              f"   (at {(now - START) * 1000:7.1f} ms)", file=sys.stderr)
+    return now
@@ -1,249 +1,526 @@
-import tkinter as tk
-import tkinter.font as tkfont
-from tkinter import messagebox, StringVar, Toplevel
-import ttkbootstrap as tb
-from ttkbootstrap.constants import *
-from database import load_students, save_students, get_program_codes, STUDENT_FIELDS
-from validator import validate_student, is_duplicate
-
-FIELDS = STUDENT_FIELDS
-NAV    = "#0d1b2a"
-ACCENT = "#1b4f72"
-BG     = "#f5f7fa"
-WHITE  = "#ffffff"
-TEXT   = "#1a1a2a"
-GREY   = "#6c757d"
-
-
-def styled_entry(parent, textvariable, width=24):
-    e = tk.Entry(parent, textvariable=textvariable,
-                 font=("Segoe UI", 10), width=width,
-                 relief="flat", bd=0, bg="#eef1f7",
-                 fg=TEXT, insertbackground=TEXT)
-    e.config(highlightthickness=2,
-             highlightbackground="#dde3ee",
-             highlightcolor=ACCENT)
-    return e
-
-
-class StudentTab:
-    def __init__(self, parent):
-        self.parent = parent
-        self.parent.configure(bg=BG)
-        self.build_ui()
-        self.refresh()
-
-    def build_ui(self):
-        tk.Label(self.parent, text="Students",
-                 font=("Georgia", 20, "bold"),
-                 bg=BG, fg=NAV).pack(anchor="w", padx=25, pady=(20, 5))
-
-        toolbar = tk.Frame(self.parent, bg=BG)
-        toolbar.pack(fill="x", padx=25, pady=(0, 8))
-
-        tk.Label(toolbar, text="Search",
-                 font=("Segoe UI", 10), bg=BG, fg=GREY).pack(side="left")
-        self.search_var = StringVar()
-        self.search_var.trace_add("write", lambda *a: self.refresh())
-        se = styled_entry(toolbar, self.search_var, width=26)
-        se.pack(side="left", padx=(6, 20), ipady=5)
-
-        tk.Label(toolbar, text="Sort by",
-                 font=("Segoe UI", 10), bg=BG, fg=GREY).pack(side="left")
-        self.sort_var = StringVar(value="id")
-        sort_cb = tb.Combobox(toolbar, textvariable=self.sort_var,
-                              values=[f.capitalize() for f in FIELDS],
-                              width=12, state="readonly", bootstyle="secondary")
-        sort_cb.pack(side="left", padx=6)
-        sort_cb.bind("<<ComboboxSelected>>", lambda e: self.refresh())
-
-        tk.Frame(toolbar, bg=BG).pack(side="left", expand=True)
-        tb.Button(toolbar, text="🗑  Delete",
-                  bootstyle="secondary", command=self.delete,
-                  width=10).pack(side="right", padx=(5,0))
-        tb.Button(toolbar, text="＋  Add Student",
-                  bootstyle="dark", command=self.open_add_dialog,
-                  width=14).pack(side="right")
-
-        table_frame = tk.Frame(self.parent, bg=BG)
-        table_frame.pack(fill="both", expand=True, padx=25, pady=5)
-
-       
-        cols = ("id", "firstname", "lastname", "program",
-                "year", "gender", "actions")
-        self.tree = tb.Treeview(table_frame, columns=cols,
-                                show="headings", height=12,
-                                bootstyle="primary")
-        col_widths = {"id": 100, "firstname": 120, "lastname": 120,
-                      "program": 95, "year": 55, "gender": 80,
-                      "actions": 80}
-        for c in cols:
-            label = c.upper() if c != "actions" else ""
-            self.tree.heading(c, text=label)
-            self.tree.column(c, width=col_widths.get(c, 100),
-                             anchor="w" if c != "actions" else "center")
-
-        scroll = tb.Scrollbar(table_frame, orient="vertical",
-                              command=self.tree.yview,
-                              bootstyle="secondary-round")
-        self.tree.configure(yscrollcommand=scroll.set)
-        self.tree.pack(side="left", fill="both", expand=True)
-        scroll.pack(side="right", fill="y")
-        self.tree.tag_configure("odd",  background="#f0f4fb")
-        self.tree.tag_configure("even", background=WHITE)
-        
-        # row heights for text size since it wont worrk as usual
-        big_font = tk.font.Font(family="Segoe UI", size=14)
-        self.tree.configure(style="Treeview")
-        style = tb.Style()
-        style.configure("Treeview", rowheight=44, font=big_font)
-        self.tree.bind("<ButtonRelease-1>", self.on_click)
-
-        toolbar = tk.Frame(self.parent, bg=BG)
-        toolbar.pack(fill="x", padx=25, pady=(0, 8))
-
-        tb.Button(toolbar, text="🗑  Delete Selected",
-                  bootstyle="secondary", command=self.delete,
-                  width=18).pack(side="right")
-
-    def refresh(self):
-        q = self.search_var.get().lower()
-        sort_field = self.sort_var.get().lower()
-        rows = [r for r in load_students()
-                if any(q in r[f].lower() for f in FIELDS)]
-        rows.sort(key=lambda r: r.get(sort_field, ""))
-        self.tree.delete(*self.tree.get_children())
-        for i, r in enumerate(rows):
-            tag = "even" if i % 2 == 0 else "odd"
-            self.tree.insert("", "end",
-                             values=(r["id"], r["firstname"], r["lastname"],
-                                     r["program"], r["year"], r["gender"],
-                                     "✏ Edit"),
-                             tags=(tag,))
-
-    def on_click(self, event):
-        region = self.tree.identify_region(event.x, event.y)
-        col    = self.tree.identify_column(event.x)
-        row    = self.tree.identify_row(event.y)
-        if region == "cell" and col == "#7" and row:
-            vals = self.tree.item(row)["values"]
-            self.open_edit_dialog(*vals[:6])
-
-    def open_add_dialog(self):
-        self._open_dialog("Add Student", "", "", "", "", "", "")
-
-    def open_edit_dialog(self, sid, fn, ln, prog, yr, gen):
-        self._open_dialog("Edit Student", sid, fn, ln, prog, yr, gen)
-
-    def _open_dialog(self, title, sid, fn, ln, prog, yr, gen):
-        win = Toplevel()
-        win.title(title)
-        win.geometry("420x380")
-        win.configure(bg=WHITE)
-        win.resizable(False, False)
-        win.grab_set()
-
-        tk.Label(win, text=title, font=("Georgia", 14, "bold"),
-                 bg=WHITE, fg=NAV).pack(anchor="w", padx=20, pady=(18, 10))
-
-        form = tk.Frame(win, bg=WHITE)
-        form.pack(fill="x", padx=20)
-        form.columnconfigure(0, weight=1)
-        form.columnconfigure(1, weight=1)
-
-        is_edit = bool(sid)
-        id_var   = StringVar(value=sid)
-        fn_var   = StringVar(value=fn)
-        ln_var   = StringVar(value=ln)
-        prog_var = StringVar(value=prog)
-        yr_var   = StringVar(value=yr)
-        gen_var  = StringVar(value=gen)
-
-        # ID number
-        tk.Label(form, text="Student ID  (YYYY-NNNN)",
-                 font=("Segoe UI", 10), bg=WHITE,
-                 fg=GREY).grid(row=0, column=0, columnspan=2, sticky="w", pady=(0, 2))
-        id_entry = styled_entry(form, id_var, width=36)
-        id_entry.grid(row=1, column=0, columnspan=2, pady=(0, 10), ipady=5, sticky="ew")
-        if is_edit:
-            id_entry.configure(state="disabled", bg="#e8ecf3")
-
-        # for first and last names
-        tk.Label(form, text="First Name", font=("Segoe UI", 10),
-                 bg=WHITE, fg=GREY).grid(row=2, column=0, sticky="w", pady=(0, 2))
-        tk.Label(form, text="Last Name", font=("Segoe UI", 10),
-                 bg=WHITE, fg=GREY).grid(row=2, column=1, sticky="w", padx=(10, 0), pady=(0, 2))
-        styled_entry(form, fn_var, width=17).grid(
-            row=3, column=0, pady=(0, 10), ipady=5, sticky="ew")
-        styled_entry(form, ln_var, width=17).grid(
-            row=3, column=1, pady=(0, 10), ipady=5, padx=(10, 0), sticky="ew")
-
-       # for program, year, and row
-        tk.Label(form, text="Program", font=("Segoe UI", 10),
-                 bg=WHITE, fg=GREY).grid(row=4, column=0, columnspan=2, sticky="w", pady=(0, 2))
-
-        bottom_row = tk.Frame(form, bg=WHITE)
-        bottom_row.grid(row=5, column=0, columnspan=2, sticky="ew", pady=(0, 10))
-        bottom_row.columnconfigure(0, weight=3)
-        bottom_row.columnconfigure(1, weight=1)
-        bottom_row.columnconfigure(2, weight=1)
-
-        tb.Combobox(bottom_row, textvariable=prog_var,
-                    values=get_program_codes(),
-                    state="readonly", bootstyle="secondary").grid(
-                    row=1, column=0, sticky="ew", padx=(0, 8))
-
-        tk.Label(bottom_row, text="Year", font=("Segoe UI", 10),
-                 bg=WHITE, fg=GREY).grid(row=0, column=1, sticky="w")
-        tb.Combobox(bottom_row, textvariable=yr_var,
-                    values=["1", "2", "3", "4", "5"],
-                    width=6, state="readonly",
-                    bootstyle="secondary").grid(row=1, column=1, sticky="ew", padx=(0, 8))
-
-        tk.Label(bottom_row, text="Gender", font=("Segoe UI", 10),
-                 bg=WHITE, fg=GREY).grid(row=0, column=2, sticky="w")
-        tb.Combobox(bottom_row, textvariable=gen_var,
-                    values=["Male", "Female", "Other"],
-                    width=8, state="readonly",
-                    bootstyle="secondary").grid(row=1, column=2, sticky="ew")
-
-        def save():
-            data = {"id":        id_var.get().strip(),
-                    "firstname": fn_var.get().strip(),
-                    "lastname":  ln_var.get().strip(),
-                    "program":   prog_var.get().strip(),
-                    "year":      yr_var.get().strip(),
-                    "gender":    gen_var.get().strip()}
-            err = validate_student(data)
-            if err:
-                return messagebox.showwarning("Warning", err, parent=win)
-            rows = load_students()
-            if is_edit:
-                found = False
-                for r in rows:
-                    if r["id"] == data["id"]:
-                        r.update(data)
-                        found = True
-                if not found:
-                    return messagebox.showerror("Error", "Student not found.", parent=win)
-            else:
-                if is_duplicate(rows, "id", data["id"]):
-                    return messagebox.showerror("Error", "ID already exists.", parent=win)
-                rows.append(data)
-            save_students(rows)
-            self.refresh()
-            win.destroy()
-
-        tb.Button(win, text="Save", bootstyle="dark",
-                  command=save, width=12).pack(pady=8)
-
-    def delete(self):
-        sel = self.tree.selection()
-        if not sel:
-            return messagebox.showwarning("Warning", "Select a row first.")
-        sid = self.tree.item(sel[0])["values"][0]
-        if not messagebox.askyesno("Confirm", f"Delete student '{sid}'?"):
-            return
-        rows = [r for r in load_students() if r["id"] != sid]
-        save_students(rows)
-        self.refresh()
\ No newline at end of file
+import tkinter as tk
+import time
+import os
+from tkinter import filedialog, messagebox, StringVar
+import ttkbootstrap as tb
+from ttkbootstrap.constants import *
+from database import (students, executor, college_refs, program_refs,
+                      STUDENT_FIELDS)
+from bulk import export_rows, import_students
+from gui import startup
+from gui.debounce import DebouncedSearch
+from gui.form_dialog import FormDialog
+from gui.progress_dialog import ProgressDialog
+from gui.typeahead import TypeaheadCombobox
+from gui.ui_thread import UiDispatcher
+from gui.virtual_tree import RowGone, VirtualTree
+from paging import PAGE_SIZE, Page, page_of
+from search import run_steps
+from service import student_service, ServiceError, ValidationError
+
+FIELDS = STUDENT_FIELDS
+NAV    = "#0d1b2a"
+ACCENT = "#1b4f72"
+BG     = "#f5f7fa"
+WHITE  = "#ffffff"
+TEXT   = "#1a1a2a"
+GREY   = "#6c757d"
+YEARS   = ["1", "2", "3", "4", "5"]
+GENDERS = ["Male", "Female", "Other"]
+ALL     = "All"
+# the filter bar: field -> where its choices come from (read when opened)
+FILTERS = {"program": program_refs.codes,
+           "college": college_refs.codes,
+           "year": lambda: YEARS,
+           "gender": lambda: GENDERS}
+
+
+def styled_entry(parent, textvariable, width=24):
+    e = tk.Entry(parent, textvariable=textvariable,
+                 font=("Segoe UI", 10), width=width,
+                 relief="flat", bd=0, bg="#eef1f7",
+                 fg=TEXT, insertbackground=TEXT)
+    e.config(highlightthickness=2,
+             highlightbackground="#dde3ee",
+             highlightcolor=ACCENT)
+    return e
+
+
+class StudentDialog(FormDialog):
+    geometry = "420x400"
+    button_pady = 8
+
+    def build(self, form):
+        form.columnconfigure(0, weight=1)
+        form.columnconfigure(1, weight=1)
+        self.vars = {f: StringVar() for f in FIELDS}
+
+        # ID number
+        tk.Label(form, text="Student ID  (YYYY-NNNN)",
+                 font=("Segoe UI", 10), bg=WHITE,
+                 fg=GREY).grid(row=0, column=0, columnspan=2, sticky="w", pady=(0, 2))
+        self.id_entry = styled_entry(form, self.vars["id"], width=36)
+        self.id_entry.grid(row=1, column=0, columnspan=2, pady=(0, 10), ipady=5, sticky="ew")
+
+        # for first and last names
+        tk.Label(form, text="First Name", font=("Segoe UI", 10),
+                 bg=WHITE, fg=GREY).grid(row=2, column=0, sticky="w", pady=(0, 2))
+        tk.Label(form, text="Last Name", font=("Segoe UI", 10),
+                 bg=WHITE, fg=GREY).grid(row=2, column=1, sticky="w", padx=(10, 0), pady=(0, 2))
+        self.fn_entry = styled_entry(form, self.vars["firstname"], width=17)
+        self.fn_entry.grid(row=3, column=0, pady=(0, 10), ipady=5, sticky="ew")
+        styled_entry(form, self.vars["lastname"], width=17).grid(
+            row=3, column=1, pady=(0, 10), ipady=5, padx=(10, 0), sticky="ew")
+
+       # for program, year, and row
+        tk.Label(form, text="Program", font=("Segoe UI", 10),
+                 bg=WHITE, fg=GREY).grid(row=4, column=0, columnspan=2, sticky="w", pady=(0, 2))
+
+        bottom_row = tk.Frame(form, bg=WHITE)
+        bottom_row.grid(row=5, column=0, columnspan=2, sticky="ew", pady=(0, 10))
+        bottom_row.columnconfigure(0, weight=3)
+        bottom_row.columnconfigure(1, weight=1)
+        bottom_row.columnconfigure(2, weight=1)
+
+        # type a code or part of the name; the codes come from the shared
+        # cache, so opening this doesn't read the programs at all
+        prog_var = self.vars["program"]
+        self.program_cb = TypeaheadCombobox(bottom_row, program_refs, prog_var,
+                                            bootstyle="secondary")
+        self.program_cb.grid(row=1, column=0, sticky="ew", padx=(0, 8))
+        prog_name = tk.Label(form, font=("Segoe UI", 8), bg=WHITE, fg=GREY)
+        prog_name.grid(row=6, column=0, columnspan=2, sticky="w")
+        prog_var.trace_add("write", lambda *_: prog_name.configure(
+            text=program_refs.name(prog_var.get().strip())))
+
+        tk.Label(bottom_row, text="Year", font=("Segoe UI", 10),
+                 bg=WHITE, fg=GREY).grid(row=0, column=1, sticky="w")
+        tb.Combobox(bottom_row, textvariable=self.vars["year"],
+                    values=YEARS,
+                    width=6, state="readonly",
+                    bootstyle="secondary").grid(row=1, column=1, sticky="ew", padx=(0, 8))
+
+        tk.Label(bottom_row, text="Gender", font=("Segoe UI", 10),
+                 bg=WHITE, fg=GREY).grid(row=0, column=2, sticky="w")
+        tb.Combobox(bottom_row, textvariable=self.vars["gender"],
+                    values=GENDERS,
+                    width=8, state="readonly",
+                    bootstyle="secondary").grid(row=1, column=2, sticky="ew")
+
+    def fill(self, values, is_edit):
+        for f, v in zip(FIELDS, values):
+            if f == "program":
+                self.program_cb.choose(v)
+            else:
+                self.vars[f].set(v)
+        if is_edit:
+            self.id_entry.configure(state="disabled", bg="#e8ecf3")
+        else:
+            self.id_entry.configure(state="normal", bg="#eef1f7")
+        (self.fn_entry if is_edit else self.id_entry).focus_set()
+        # saving over a change made elsewhere meanwhile is refused
+        self.since = student_service.version
+
+    def save(self):
+        data = {f: var.get().strip() for f, var in self.vars.items()}
+        try:
+            if self.is_edit:
+                student_service.update(data["id"], data, self.since)
+            else:
+                student_service.add(data)
+        except ValidationError as e:
+            return messagebox.showwarning("Warning", str(e), parent=self.win)
+        except ServiceError as e:
+            return messagebox.showerror("Error", str(e), parent=self.win)
+        self.close()
+
+
+class StudentTab:
+    def __init__(self, parent):
+        self.created = time.perf_counter()
+        self.parent = parent
+        self.parent.configure(bg=BG)
+        self.dialog = StudentDialog()
+        self.build_ui()
+        # the rows are loaded (and the arrays the queries run on and the
+        # program list built) and saved off the Tk thread, so changes may
+        # be announced from a worker thread too
+        self.ui = UiDispatcher(self.parent)
+        self.load()
+
+    def load(self):
+        self.ui.when_done(executor.read(self.prepare), self.loaded, self.failed)
+
+    def failed(self, error):
+        if messagebox.askretrycancel(
+                "Error", f"Could not load the students:\n{error}",
+                parent=self.parent):
+            self.load()
+
+    def prepare(self):
+        # runs on the reader thread, before the first search and dialog
+        self.view.prepare()
+        program_refs.codes()
+
+    def loaded(self, _):
+        self.refresh()
+        students.subscribe(self.ui.wrap(self.on_change))
+        startup.mark("Students first load", self.created)
+        self.parent.after_idle(self.dialog.warm)
+
+    def build_ui(self):
+        tk.Label(self.parent, text="Students",
+                 font=("Georgia", 20, "bold"),
+                 bg=BG, fg=NAV).pack(anchor="w", padx=25, pady=(20, 5))
+
+        toolbar = tk.Frame(self.parent, bg=BG)
+        toolbar.pack(fill="x", padx=25, pady=(0, 8))
+
+        tk.Label(toolbar, text="Search",
+                 font=("Segoe UI", 10), bg=BG, fg=GREY).pack(side="left")
+        self.search_var = StringVar()
+        self.view = student_service.view
+        # the search result is shown a page at a time (see paging.py);
+        # stale once a change was placed on the page but not in `results`
+        self.results = []
+        self.page = Page([], 0, 0)
+        self.rows = {}
+        self.searched = self.shown = None
+        self.stale = False
+        self.prefetched = None
+        self.descending = False
+        self.search = DebouncedSearch(self.parent, self.search_steps,
+                                      self.show)
+        self.search_var.trace_add("write", self.search.schedule)
+        se = styled_entry(toolbar, self.search_var, width=26)
+        se.pack(side="left", padx=(6, 20), ipady=5)
+
+        tk.Label(toolbar, text="Sort by",
+                 font=("Segoe UI", 10), bg=BG, fg=GREY).pack(side="left")
+        self.sort_var = StringVar(value="id")
+        sort_cb = tb.Combobox(toolbar, textvariable=self.sort_var,
+                              values=[f.capitalize() for f in FIELDS],
+                              width=12, state="readonly", bootstyle="secondary")
+        sort_cb.pack(side="left", padx=6)
+        sort_cb.bind("<<ComboboxSelected>>", lambda e: self.refresh())
+        self.build_filters()
+
+        tk.Frame(toolbar, bg=BG).pack(side="left", expand=True)
+        tb.Button(toolbar, text="🗑  Delete",
+                  bootstyle="secondary", command=self.delete,
+                  width=10).pack(side="right", padx=(5,0))
+        tb.Button(toolbar, text="＋  Add Student",
+                  bootstyle="dark", command=self.open_add_dialog,
+                  width=14).pack(side="right")
+        tb.Button(toolbar, text="⭱  Export",
+                  bootstyle="secondary", command=self.export,
+                  width=10).pack(side="right", padx=(0, 5))
+        tb.Button(toolbar, text="⭳  Import",
+                  bootstyle="secondary", command=self.import_csv,
+                  width=10).pack(side="right", padx=(0, 5))
+
+        table_frame = tk.Frame(self.parent, bg=BG)
+        table_frame.pack(fill="both", expand=True, padx=25, pady=5)
+
+       
+        cols = ("id", "firstname", "lastname", "program",
+                "year", "gender", "actions")
+        self.tree = tb.Treeview(table_frame, columns=cols,
+                                show="headings", height=12,
+                                bootstyle="primary")
+        col_widths = {"id": 100, "firstname": 120, "lastname": 120,
+                      "program": 95, "year": 55, "gender": 80,
+                      "actions": 80}
+        for c in cols:
+            label = c.upper() if c != "actions" else ""
+            self.tree.heading(c, text=label)
+            self.tree.column(c, width=col_widths.get(c, 100),
+                             anchor="w" if c != "actions" else "center")
+
+        for c in FIELDS:
+            self.tree.heading(c, command=lambda c=c: self.sort_by(c))
+
+        scroll = tb.Scrollbar(table_frame, orient="vertical",
+                              bootstyle="secondary-round")
+        self.table = VirtualTree(self.tree, scroll, self.row_values,
+                                 self.sort_key)
+        self.tree.pack(side="left", fill="both", expand=True)
+        scroll.pack(side="right", fill="y")
+        self.tree.tag_configure("odd",  background="#f0f4fb")
+        self.tree.tag_configure("even", background=WHITE)
+        self.tree.bind("<ButtonRelease-1>", self.on_click)
+
+        toolbar = tk.Frame(self.parent, bg=BG)
+        toolbar.pack(fill="x", padx=25, pady=(0, 8))
+
+        self.prev_btn = tb.Button(toolbar, text="◀  Prev", width=8,
+                                  bootstyle="secondary", command=self.prev_page)
+        self.prev_btn.pack(side="left")
+        self.page_label = tk.Label(toolbar, font=("Segoe UI", 10),
+                                   bg=BG, fg=GREY)
+        self.page_label.pack(side="left", padx=10)
+        self.next_btn = tb.Button(toolbar, text="Next  ▶", width=8,
+                                  bootstyle="secondary", command=self.next_page)
+        self.next_btn.pack(side="left")
+
+        tb.Button(toolbar, text="🗑  Delete Selected",
+                  bootstyle="secondary", command=self.delete,
+                  width=18).pack(side="right")
+
+    def build_filters(self):
+        # "BSCS students in year 4": one combobox per field, each served
+        # by an index of that field's values (see query.py), so picking
+        # several intersects their rows instead of scanning them all
+        bar = tk.Frame(self.parent, bg=BG)
+        bar.pack(fill="x", padx=25, pady=(0, 8))
+        self.filter_vars = {}
+        self.filters = []
+        for field, choices in FILTERS.items():
+            tk.Label(bar, text=field.capitalize(), font=("Segoe UI", 10),
+                     bg=BG, fg=GREY).pack(side="left")
+            var = StringVar(value=ALL)
+            cb = tb.Combobox(bar, textvariable=var, values=[ALL],
+                             width=10, state="readonly", bootstyle="secondary")
+            cb.configure(postcommand=lambda cb=cb, choices=choices:
+                         cb.configure(values=[ALL, *choices()]))
+            cb.pack(side="left", padx=(6, 14))
+            cb.bind("<<ComboboxSelected>>", lambda e: self.refresh())
+            self.filter_vars[field] = var
+        tb.Button(bar, text="✕  Clear filters", bootstyle="secondary-link",
+                  command=self.clear_filters).pack(side="left")
+
+    def clear_filters(self):
+        for var in self.filter_vars.values():
+            var.set(ALL)
+        self.refresh()
+
+    def where(self):
+        return {f: var.get() for f, var in self.filter_vars.items()
+                if var.get() != ALL}
+
+    def refresh(self):
+        self.search.run_now()
+
+    def search_steps(self):
+        # the college filter goes through the programs, so it's resolved
+        # here, once per search
+        self.filters = student_service.filters(self.where())
+        self.searched = (self.search_var.get(), self.sort_field(),
+                         self.descending, tuple(self.where().items()))
+        return self.view.steps(self.search_var.get(), self.sort_field(),
+                               self.descending, self.filters)
+
+    def show(self, keys):
+        # a new search starts on its first page; the same one run again
+        # (after a save, say) stays on the page it was showing
+        offset, same = 0, self.searched == self.shown
+        if same and self.page.first is not None:
+            offset = self.view.position(keys, self.sort_field(),
+                                        self.descending, self.page.first)
+        self.shown = self.searched
+        self.results = keys
+        self.stale = False
+        self.show_page(self.read_page(keys, self.order(), offset=offset),
+                       not same)
+        for c in FIELDS:
+            arrow = ""
+            if c == self.sort_field():
+                arrow = "  ▼" if self.descending else "  ▲"
+            self.tree.heading(c, text=c.upper() + arrow)
+
+    def read_page(self, keys, order, **where):
+        # a page of `keys` (offset=, after= or before= a cursor) in `order`,
+        # (field, descending), and its rows. runs on the reader thread when
+        # prefetching, so it mustn't touch the widgets
+        page = page_of(self.view, keys, *order, limit=PAGE_SIZE, **where)
+        return page, dict(zip(page, students.get_many(page)))
+
+    def show_page(self, found, top=True):
+        # `top` scrolls back to the page's first row
+        self.page, self.rows = found
+        self.table.set_keys(list(self.page), top)
+        self.update_pager()
+        self.prefetch()
+
+    def update_pager(self):
+        shown = len(self.table.keys)
+        first = self.page.offset + 1 if shown else 0
+        self.page_label.configure(
+            text=f"{first:,}–{self.page.offset + shown:,} "
+                 f"of {self.page.total:,}")
+        self.prev_btn.configure(
+            state="normal" if self.page.has_prev else "disabled")
+        self.next_btn.configure(
+            state="normal" if self.page.has_next else "disabled")
+
+    def prefetch(self):
+        # the next page is read in the background, so Next has it at once
+        self.prefetched = None
+        if self.page.has_next:
+            keys, order, last = self.results, self.order(), self.page.last
+            self.prefetched = (last, executor.read(
+                lambda: self.read_page(keys, order, after=last),
+                tag="students-next-page"))
+
+    def fresh_results(self):
+        # the result again if changes were placed on the page only
+        if self.stale:
+            self.results = run_steps(self.search_steps())
+            self.stale = False
+        return self.results
+
+    def next_page(self):
+        if self.search.pending:
+            return self.refresh()
+        if not self.page.has_next:
+            return
+        last = self.page.last
+        if self.prefetched and self.prefetched[0] == last \
+                and self.prefetched[1].done() \
+                and not self.prefetched[1].cancelled() \
+                and self.prefetched[1].exception() is None:
+            return self.show_page(self.prefetched[1].result())
+        self.show_page(self.read_page(self.fresh_results(), self.order(),
+                                       after=last))
+
+    def prev_page(self):
+        if self.search.pending:
+            return self.refresh()
+        if self.page.has_prev:
+            self.show_page(self.read_page(self.fresh_results(), self.order(),
+                                          before=self.page.first))
+
+    def on_page(self, sort_key):
+        # whether a row sorting at `sort_key` belongs between the pages
+        # before and after this one
+        page = self.page
+        if page.has_prev and page.first and \
+                sort_key < self.cursor_key(page.first):
+            return False
+        if page.has_next and page.last and \
+                self.cursor_key(page.last) < sort_key:
+            return False
+        return True
+
+    def cursor_key(self, cursor):
+        value, key = cursor
+        return self.row_sort_key({self.sort_field(): value, "id": key})
+
+    def sort_field(self):
+        return self.sort_var.get().lower()
+
+    def order(self):
+        return self.sort_field(), self.descending
+
+    def sort_by(self, field):
+        # clicking the sorted column again flips the order
+        if field == self.sort_field():
+            self.descending = not self.descending
+        else:
+            self.sort_var.set(field.capitalize())
+            self.descending = False
+        self.refresh()
+
+    def row_sort_key(self, r):
+        return self.view.row_key(self.sort_field(), r, self.descending)
+
+    def sort_key(self, key):
+        r = students.get(key)
+        if r is None:
+            raise RowGone(key)
+        return self.row_sort_key(r)
+
+    def on_change(self, op, key, row, old):
+        # apply single-row changes to the table instead of refreshing it
+        if op == "reload" or self.search.pending or not self.view.incremental:
+            return self.parent.after_idle(self.refresh)
+        try:
+            self.patch(key, row, old)
+        except RowGone:
+            # a listed row went in the same merge, its event still queued
+            self.parent.after_idle(self.refresh)
+
+    def patch(self, key, row, old):
+        # only the page is patched; the full result is redone when needed
+        self.stale = True
+        self.prefetched = None
+        self.rows.pop(key, None)
+        listed = (old is not None and
+                  self.table.locate(key, self.row_sort_key(old)) is not None)
+        keep = row is not None and self.view.matches(
+            key, self.search_var.get(), self.filters) \
+            and self.on_page(self.row_sort_key(row))
+        if listed and keep and self.row_sort_key(old) == self.row_sort_key(row):
+            return self.table.update_key(key)
+        if listed:
+            self.table.remove_key(key, self.row_sort_key(old))
+        if keep:
+            self.table.insert_key(key, self.row_sort_key(row))
+        self.update_pager()
+
+    def row_values(self, key):
+        r = self.rows.get(key) or students.get(key)
+        if r is None:
+            # gone; its queued change removes it next
+            return ("",) * 7
+        return (r["id"], r["firstname"], r["lastname"],
+                r["program"], r["year"], r["gender"], "✏ Edit")
+
+    def on_click(self, event):
+        region = self.tree.identify_region(event.x, event.y)
+        col    = self.tree.identify_column(event.x)
+        row    = self.tree.identify_row(event.y)
+        if region == "cell" and col == "#7" and row:
+            r = students.get(self.table.key_of(row))
+            if r:
+                self.open_edit_dialog(*(r[f] for f in FIELDS))
+
+    def open_add_dialog(self):
+        self.dialog.open("Add Student", ("",) * len(FIELDS), False)
+
+    def open_edit_dialog(self, sid, fn, ln, prog, yr, gen):
+        self.dialog.open("Edit Student", (sid, fn, ln, prog, yr, gen), True)
+
+    def delete(self):
+        sid = self.table.selected_key()
+        if sid is None:
+            return messagebox.showwarning("Warning", "Select a row first.")
+        if not messagebox.askyesno("Confirm", f"Delete student '{sid}'?"):
+            return
+        try:
+            student_service.delete(sid)
+        except ServiceError as e:
+            messagebox.showerror("Error", str(e))
+
+    def import_csv(self):
+        path = filedialog.askopenfilename(
+            title="Import students", filetypes=[("CSV files", "*.csv")])
+        if not path:
+            return
+        rejects = os.path.splitext(path)[0] + ".rejects.csv"
+
+        def done(result):
+            if result.cancelled:
+                return messagebox.showinfo("Import", "Import cancelled.")
+            msg = f"Added {result.added} students."
+            if result.rejected:
+                msg += f"\n{result.rejected} rows were rejected, see\n{rejects}"
+            messagebox.showinfo("Import", msg)
+
+        ProgressDialog("Importing students",
+                       lambda progress, cancelled: import_students(
+                           path, rejects, progress, cancelled), done)
+
+    def export(self):
+        path = filedialog.asksaveasfilename(
+            title="Export students", defaultextension=".csv",
+            filetypes=[("CSV files", "*.csv")])
+        if not path:
+            return
+        # the current search and sort, all pages, streamed row by row
+        keys = self.fresh_results()
+        ProgressDialog("Exporting students",
+                       lambda progress, cancelled: export_rows(
+                           path, keys, progress=progress, cancelled=cancelled),
+                       lambda n: messagebox.showinfo(
+                           "Export", f"Exported {n} students."))
@@ -0,0 +1,50 @@
+import ttkbootstrap as tb
+
+
+class TypeaheadCombobox(tb.Combobox):
+    # a combobox over a References list (see references.py) that can be
+    # typed into: the dropdown holds only the codes matching what's typed
+    # so far, by code or by a word of the name, from the list's prefix
+    # index. only a code in the list counts as chosen: when the box loses
+    # focus anything else becomes the one code it matches, or else the
+    # last good one.
+    def __init__(self, parent, refs, textvariable, limit=50, **kw):
+        super().__init__(parent, textvariable=textvariable, **kw)
+        self.refs = refs
+        self.var = textvariable
+        self.limit = limit
+        self.chosen = textvariable.get()
+        self.configure(postcommand=self.narrow)
+        self.bind("<KeyRelease>", self.on_key)
+        self.bind("<<ComboboxSelected>>", self.on_selected)
+        self.bind("<FocusOut>", self.on_focus_out)
+
+    def choose(self, code):
+        # set the box for reuse, e.g. when a dialog is filled in again
+        self.var.set(code)
+        self.chosen = code
+
+    def narrow(self):
+        text = self.var.get()
+        # a complete code shows everything near it rather than just itself
+        if text == self.chosen:
+            text = ""
+        self.configure(values=self.refs.matching(text, self.limit))
+
+    def on_key(self, event):
+        if event.keysym in ("Up", "Down", "Return", "Escape", "Tab"):
+            return
+        self.narrow()
+        if self.var.get() in self.refs:
+            self.chosen = self.var.get()
+
+    def on_selected(self, event=None):
+        self.chosen = self.var.get()
+
+    def on_focus_out(self, event=None):
+        # a unique match is taken as meant ("comp" -> BSCS)
+        text = self.var.get()
+        if text not in self.refs:
+            found = self.refs.matching(text, 2) if text.strip() else []
+            self.var.set(found[0] if len(found) == 1 else self.chosen)
+        self.chosen = self.var.get()
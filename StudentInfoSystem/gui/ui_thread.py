@@ -0,0 +1,47 @@
+import queue
+import threading
+
+
+class UiDispatcher:
+    # Tk may only be touched from the thread running mainloop. calls made
+    # from worker threads are queued and run there by an after() poll;
+    # calls already on the Tk thread run straight away.
+    def __init__(self, widget, interval=50):
+        self.widget = widget
+        self.interval = interval
+        self._queue = queue.SimpleQueue()
+        widget.after(interval, self._poll)
+
+    def call(self, fn, *args):
+        if threading.current_thread() is threading.main_thread():
+            return fn(*args)
+        self._queue.put((fn, args))
+
+    def wrap(self, fn):
+        return lambda *args: self.call(fn, *args)
+
+    def _poll(self):
+        while True:
+            try:
+                fn, args = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            fn(*args)
+        try:
+            self.widget.after(self.interval, self._poll)
+        except Exception:
+            pass  # widget destroyed
+
+    def when_done(self, future, callback, on_error=None):
+        # callback(result) on the Tk thread once future succeeds, or
+        # on_error(exception) if it failed; nothing happens if it was
+        # cancelled (superseded)
+        def done(f):
+            if f.cancelled():
+                return
+            error = f.exception()
+            if error is None:
+                self.call(callback, f.result())
+            elif on_error is not None:
+                self.call(on_error, error)
+        future.add_done_callback(done)
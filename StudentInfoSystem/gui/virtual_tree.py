@@ -0,0 +1,173 @@
+import tkinter.ttk as ttk
+from bisect import bisect_left
+
+
+class RowGone(LookupError):
+    # raised by a sort_key(key) whose row the table no longer has: the
+    # change that removed it is still queued for the Tk thread, so the
+    # keys can't be bisected until the list is rebuilt
+    pass
+
+
+class VirtualTree:
+    # keeps the whole filtered, sorted result as a list of keys in Python and
+    # only puts the rows in view (plus a small buffer) into the Treeview. the
+    # tree itself never scrolls; the scrollbar and mouse wheel move a row
+    # offset and the same few items are refilled with new values.
+    # sort_key(key) must give the position-defining value of a row, unique
+    # per key, so single-row changes can be placed with bisect (or raise
+    # RowGone, see above).
+    def __init__(self, tree, scrollbar, render, sort_key, buffer=3):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.render = render
+        self.sort_key = sort_key
+        self.buffer = buffer
+        self.keys = []
+        self.offset = 0
+        self.selected = None
+        self._slots = []
+        self._items = {}
+        scrollbar.configure(command=self._on_scroll)
+        tree.configure(yscrollcommand="")
+        tree.bind("<Configure>", lambda e: self.redraw())
+        tree.bind("<<TreeviewSelect>>", self._on_select)
+        tree.bind("<MouseWheel>", self._on_wheel)
+        tree.bind("<Button-4>", lambda e: self.scroll_by(-3))
+        tree.bind("<Button-5>", lambda e: self.scroll_by(3))
+        tree.bind("<Up>", lambda e: self._move_selection(-1))
+        tree.bind("<Down>", lambda e: self._move_selection(1))
+        tree.bind("<Prior>", lambda e: self.scroll_by(-self.visible_rows()))
+        tree.bind("<Next>", lambda e: self.scroll_by(self.visible_rows()))
+
+    def visible_rows(self):
+        style = self.tree.cget("style") or "Treeview"
+        rowheight = int(ttk.Style().lookup(style, "rowheight") or 44)
+        fits = self.tree.winfo_height() // rowheight
+        return max(fits, int(self.tree.cget("height")), 1)
+
+    def set_keys(self, keys, top=False):
+        # `top` scrolls back to the first row, e.g. for a new page
+        self.keys = keys
+        if top:
+            self.offset = 0
+        if self.selected is not None and self.selected not in keys:
+            self.selected = None
+        self.offset = min(self.offset, self._max_offset())
+        self.redraw()
+
+    def _max_offset(self):
+        return max(0, len(self.keys) - self.visible_rows())
+
+    def redraw(self, start=0):
+        # refill the items from slot `start` down; the ones above are unchanged
+        n = min(self.visible_rows() + self.buffer, len(self.keys) - self.offset)
+        while len(self._slots) < n:
+            self._slots.append(self.tree.insert("", "end"))
+        if len(self._slots) > n:
+            self.tree.delete(*self._slots[n:])
+            del self._slots[n:]
+        self._items = {}
+        for i, item in enumerate(self._slots):
+            pos = self.offset + i
+            key = self.keys[pos]
+            self._items[key] = item
+            if i >= start:
+                self.tree.item(item, values=self.render(key),
+                               tags=("even" if pos % 2 == 0 else "odd",))
+        item = self._items.get(self.selected)
+        if tuple(self.tree.selection()) != ((item,) if item else ()):
+            self.tree.selection_set((item,) if item else ())
+        self._update_scrollbar()
+
+    def _update_scrollbar(self):
+        total = len(self.keys) or 1
+        self.scrollbar.set(self.offset / total,
+                           min(1.0, (self.offset + self.visible_rows()) / total))
+
+    def scroll_to(self, offset):
+        offset = max(0, min(int(offset), self._max_offset()))
+        if offset != self.offset:
+            self.offset = offset
+            self.redraw()
+        return "break"
+
+    def scroll_by(self, rows):
+        return self.scroll_to(self.offset + rows)
+
+    def _on_scroll(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(float(amount) * len(self.keys))
+        elif unit == "pages":
+            self.scroll_by(int(amount) * self.visible_rows())
+        else:
+            self.scroll_by(int(amount))
+
+    def _on_wheel(self, event):
+        # windows reports multiples of 120 per notch, macos small deltas
+        step = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        return self.scroll_by(-3 * step)
+
+    # single-row changes: only the rows that move are refilled
+    def locate(self, key, sort_key):
+        # position of `key` given its sort key, or None if it isn't listed
+        def probe(k):
+            return sort_key if k == key else self.sort_key(k)
+        i = bisect_left(self.keys, sort_key, key=probe)
+        if i < len(self.keys) and self.keys[i] == key:
+            return i
+        return None
+
+    def update_key(self, key):
+        item = self._items.get(key)
+        if item is not None:
+            self.tree.item(item, values=self.render(key))
+
+    def insert_key(self, key, sort_key):
+        pos = bisect_left(self.keys, sort_key, key=self.sort_key)
+        self.keys.insert(pos, key)
+        self._shifted(pos)
+
+    def remove_key(self, key, sort_key):
+        pos = self.locate(key, sort_key)
+        if pos is None:
+            return
+        del self.keys[pos]
+        if key == self.selected:
+            self.selected = None
+        offset, self.offset = self.offset, min(self.offset, self._max_offset())
+        # if the view had to move up, everything in it shifted
+        self._shifted(pos if self.offset == offset else self.offset)
+
+    def _shifted(self, pos):
+        if pos >= self.offset + len(self._slots) and \
+                len(self._slots) >= self.visible_rows() + self.buffer:
+            # below the viewport: nothing visible moved
+            return self._update_scrollbar()
+        self.redraw(max(0, pos - self.offset))
+
+    def key_of(self, item):
+        if item in self._slots:
+            return self.keys[self.offset + self._slots.index(item)]
+        return None
+
+    def selected_key(self):
+        return self.selected
+
+    def _on_select(self, event):
+        sel = self.tree.selection()
+        if sel:
+            self.selected = self.key_of(sel[0])
+
+    def _move_selection(self, step):
+        if not self.keys:
+            return "break"
+        pos = self.keys.index(self.selected) if self.selected in self.keys else -1
+        pos = max(0, min(pos + step, len(self.keys) - 1))
+        self.selected = self.keys[pos]
+        if pos < self.offset:
+            self.offset = pos
+        elif pos >= self.offset + self.visible_rows():
+            self.offset = pos - self.visible_rows() + 1
+        self.redraw()
+        return "break"
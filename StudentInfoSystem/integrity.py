@@ -0,0 +1,185 @@
+# referential integrity between tables, e.g. students.program -> programs.
+# a Relation says what happens to the rows referring to a row that is
+# deleted or gets a new code: RESTRICT refuses, CASCADE deletes them (or
+# follows the new code) and SET_NULL blanks the reference. dependents are
+# found through the child tables' secondary indexes, never by scanning, and
+# all the changes of one operation are gathered first and then written
+# with one batch per table.
+RESTRICT = "restrict"
+CASCADE = "cascade"
+SET_NULL = "set-null"
+POLICIES = (RESTRICT, CASCADE, SET_NULL)
+
+
+class IntegrityError(Exception):
+    def __init__(self, message, dependents=0):
+        super().__init__(message)
+        self.dependents = dependents
+
+
+class Relation:
+    # child[field] holds a key of parent. the labels are for messages,
+    # e.g. "students" and "program"
+    def __init__(self, child, field, parent, child_label, parent_label,
+                 on_delete=RESTRICT, on_update=CASCADE):
+        self.child = child
+        self.field = field
+        self.parent = parent
+        self.child_label = child_label
+        self.parent_label = parent_label
+        self.on_delete = on_delete
+        self.on_update = on_update
+
+    def dependents(self, keys):
+        found = set()
+        for k in keys:
+            found |= self.child.keys_where(self.field, k)
+        return found
+
+
+def describe(keys):
+    keys = sorted(keys)
+    names = ", ".join(f"'{k}'" for k in keys[:3])
+    return names + (f" and {len(keys) - 3} more" if len(keys) > 3 else "")
+
+
+class Plan:
+    # the changes of one operation per table, applied only once all of
+    # them are known, so a refused step leaves nothing half done
+    def __init__(self):
+        self.tables = []
+        self.deletes = {}
+        self.updates = {}
+        self.adds = {}
+
+    def _touch(self, table):
+        if table not in self.tables:
+            self.tables.append(table)
+            self.deletes[table], self.updates[table] = set(), {}
+            self.adds[table] = []
+
+    def delete(self, table, keys):
+        self._touch(table)
+        self.deletes[table] |= keys
+        for k in keys:
+            self.updates[table].pop(k, None)
+
+    def update(self, table, keys, data):
+        self._touch(table)
+        for k in keys - self.deletes[table]:
+            self.updates[table].setdefault(k, {}).update(data)
+
+    def add(self, table, row):
+        self._touch(table)
+        self.adds[table].append(row)
+
+    def apply(self):
+        # new rows parents first, then updates and deletes dependents
+        # first: a key change adds the parent's new row, repoints the
+        # children, and only then deletes the old row. if this stops half
+        # way the worst left over is a parent nobody refers to, never a
+        # reference to nothing
+        changed = 0
+        for table in self.tables:
+            if self.adds[table]:
+                changed += table.apply(adds=self.adds[table])
+        for table in reversed(self.tables):
+            if self.deletes[table] or self.updates[table]:
+                changed += table.apply(self.deletes[table],
+                                       self.updates[table])
+        return changed
+
+
+class IntegrityEngine:
+    def __init__(self, relations):
+        self.relations = list(relations)
+
+    def children_of(self, table):
+        return [r for r in self.relations if r.parent is table]
+
+    def check(self, table, row):
+        # refuse a row whose references point nowhere; blank is allowed
+        for rel in self.relations:
+            if rel.child is table:
+                value = row.get(rel.field, "")
+                if value and rel.parent.get(value) is None:
+                    raise IntegrityError(
+                        f"{rel.parent_label.capitalize()} '{value}' "
+                        "does not exist.")
+
+    def delete(self, table, keys, policy=None):
+        # delete `keys` from `table` and deal with everything referring to
+        # them; `policy` overrides every relation's on_delete. returns the
+        # number of rows changed across all tables.
+        return self.plan_delete(table, keys, policy).apply()
+
+    def plan_delete(self, table, keys, policy=None):
+        # the Plan of delete(), not applied, e.g. to tell the user first
+        # everything a cascade takes with it
+        plan = Plan()
+        self._plan_delete(plan, table, set(keys), policy)
+        return plan
+
+    def _plan_delete(self, plan, table, keys, policy):
+        keys -= plan.deletes.get(table, set())
+        if not keys:
+            return
+        plan.delete(table, keys)
+        for rel in self.children_of(table):
+            dependents = rel.dependents(keys) - plan.deletes.get(rel.child, set())
+            if not dependents:
+                continue
+            action = policy or rel.on_delete
+            if action == CASCADE:
+                self._plan_delete(plan, rel.child, dependents, policy)
+            elif action == SET_NULL:
+                plan.update(rel.child, dependents, {rel.field: ""})
+            else:
+                raise IntegrityError(
+                    f"{len(dependents)} {rel.child_label} still refer to "
+                    f"{rel.parent_label} {describe(keys)}.", len(dependents))
+
+    def change_key(self, table, old, new, policy=None):
+        # give a row a new key; `policy` overrides the relations' on_update
+        row = table.get(old)
+        if row is None:
+            raise IntegrityError(f"'{old}' does not exist.")
+        if table.get(new) is not None:
+            raise IntegrityError(f"'{new}' already exists.")
+        plan = Plan()
+        plan.delete(table, {old})
+        plan.add(table, dict(row, **{table.key: new}))
+        for rel in self.children_of(table):
+            dependents = rel.dependents([old])
+            if not dependents:
+                continue
+            action = policy or rel.on_update
+            if action == CASCADE:
+                plan.update(rel.child, dependents, {rel.field: new})
+            elif action == SET_NULL:
+                plan.update(rel.child, dependents, {rel.field: ""})
+            else:
+                raise IntegrityError(
+                    f"{len(dependents)} {rel.child_label} still refer to "
+                    f"{rel.parent_label} '{old}'.", len(dependents))
+        return plan.apply()
+
+    def orphans(self, child=None):
+        # every reference to a row that doesn't exist: one pass over each
+        # child table (or just `child`), checked against sets of the keys
+        found = []
+        children = []
+        for rel in self.relations:
+            if rel.child not in children and child in (None, rel.child):
+                children.append(rel.child)
+        for table in children:
+            rels = [(r, set(r.parent.codes()))
+                    for r in self.relations if r.child is table]
+            for row in table.rows():
+                for rel, parents in rels:
+                    value = row[rel.field]
+                    if value and value not in parents:
+                        found.append({"table": rel.child_label,
+                                      "key": row[table.key],
+                                      "field": rel.field, "value": value})
+        return found
@@ -1,92 +1,150 @@
-import tkinter as tk
-import ttkbootstrap as tb
-from gui.college_tab import CollegeTab
-from gui.program_tab import ProgramTab
-from gui.student_tab import StudentTab
-
-NAV    = "#0d1b2a"
-ACCENT = "#1b4f72"
-BG     = "#f5f7fa"
-WHITE  = "#ffffff"
-
-
-def main():
-    app = tb.Window(themename="litera")
-    import tkinter.ttk as ttk
-    s = ttk.Style()
-    s.theme_use("clam")
-    s.configure("Treeview", font=("Segoe UI", 11), rowheight=44,
-                background="white", fieldbackground="white")
-    s.configure("Treeview.Heading", font=("Segoe UI", 10, "bold"),
-                background="#0d1b2a", foreground="white")
-    app.option_add("*TTreeview*rowHeight", 44)
-    app.title("Student Information System")
-    app.geometry("1100x700")
-    app.configure(bg=BG)
-
-    # sidebar design and tabs
-    sidebar = tk.Frame(app, bg=NAV, width=200)
-    sidebar.pack(fill="y", side="left")
-    sidebar.pack_propagate(False)
-
-    tk.Label(sidebar, text="SSIS",
-             font=("Georgia", 24, "bold"),
-             bg=NAV, fg=WHITE).pack(pady=(30, 2), padx=20, anchor="w")
-    tk.Label(sidebar, text="Student Information\nSystem",
-             font=("Segoe UI", 8),
-             bg=NAV, fg="#7a9cc0").pack(padx=20, anchor="w")
-
-    tk.Frame(sidebar, bg="#1e3a52", height=1).pack(fill="x", padx=15, pady=18)
-
-    content = tk.Frame(app, bg=BG)
-    content.pack(fill="both", expand=True, side="left")
-
-    frames = {}
-    for name in ["Colleges", "Programs", "Students"]:
-        f = tk.Frame(content, bg=BG)
-        frames[name] = f
-
-    active_btn = {"ref": None}
-
-    def show_tab(name, btn):
-        for f in frames.values():
-            f.pack_forget()
-        frames[name].pack(fill="both", expand=True)
-        if active_btn["ref"]:
-            active_btn["ref"].configure(bg=NAV, fg="#7a9cc0")
-        btn.configure(bg=ACCENT, fg=WHITE)
-        active_btn["ref"] = btn
-
-    icons = {"Colleges": "🏛  Colleges",
-             "Programs": "📚  Programs",
-             "Students": "👤  Students"}
-
-    nav_buttons = {}
-    for name in ["Colleges", "Programs", "Students"]:
-        btn = tk.Button(sidebar, text=icons[name],
-                        font=("Segoe UI", 11), bg=NAV,
-                        fg="#7a9cc0", relief="flat",
-                        anchor="w", padx=20, pady=12,
-                        activebackground=ACCENT,
-                        activeforeground=WHITE,
-                        cursor="hand2", bd=0)
-        btn.configure(command=lambda n=name, b=btn: show_tab(n, b))
-        btn.pack(fill="x", pady=2)
-        nav_buttons[name] = btn
-
-    tk.Frame(sidebar, bg=NAV).pack(expand=True)
-    tk.Label(sidebar, text="v1.0", font=("Segoe UI", 8),
-             bg=NAV, fg="#3d5a73").pack(pady=10)
-
-    CollegeTab(frames["Colleges"])
-    ProgramTab(frames["Programs"])
-    StudentTab(frames["Students"])
-
-    show_tab("Students", nav_buttons["Students"])
-    import tkinter.ttk as ttk
-    ttk.Style().configure("Treeview", rowheight=80)
-    app.mainloop()
-
-
-if __name__ == "__main__":
+from gui import startup  # first, so its clock starts before the imports
+import time
+import tkinter as tk
+import tkinter.ttk as ttk
+from tkinter import messagebox
+import ttkbootstrap as tb
+from database import executor, refresh_tables, use_background_io
+from gui.college_tab import CollegeTab
+from gui.dashboard_tab import DashboardTab
+from gui.program_tab import ProgramTab
+from gui.student_tab import StudentTab
+from gui.ui_thread import UiDispatcher
+from storage import ConflictError
+
+NAV    = "#0d1b2a"
+ACCENT = "#1b4f72"
+BG     = "#f5f7fa"
+WHITE  = "#ffffff"
+REFRESH_MS = 1000
+TABS = {"Colleges": CollegeTab,
+        "Programs": ProgramTab,
+        "Students": StudentTab,
+        "Dashboard": DashboardTab}
+
+
+def setup_styles(app):
+    # the only place the Treeview style is set; the tabs used to set it
+    # again each, and main once more after them (the 80px rows won)
+    s = ttk.Style()
+    s.theme_use("clam")
+    s.configure("Treeview", font=("Segoe UI", 14),
+                rowheight=80, background="white", fieldbackground="white")
+    s.configure("Treeview.Heading", font=("Segoe UI", 10, "bold"),
+                background="#0d1b2a", foreground="white")
+    app.option_add("*TTreeview*rowHeight", 80)
+    # the dashboard's small count tables
+    s.configure("Stats.Treeview", font=("Segoe UI", 10), rowheight=26,
+                background="white", fieldbackground="white")
+
+
+def report_error(e):
+    # a save that lost to another window's save is not a disk failure
+    if isinstance(e, ConflictError):
+        messagebox.showwarning("Changed elsewhere", str(e))
+    else:
+        messagebox.showerror("Disk error", str(e))
+
+
+def main():
+    t = startup.mark("imports")
+    app = tb.Window(themename="litera")
+    setup_styles(app)
+    t = startup.mark("theme setup", t)
+    app.title("Student Information System")
+    app.geometry("1100x700")
+    app.configure(bg=BG)
+
+    # no disk access on the Tk thread: saves go to the writer thread, and
+    # the files are checked for outside changes in the background
+    use_background_io()
+    ui = UiDispatcher(app)
+    executor.on_error = ui.wrap(report_error)
+
+    def poll_files():
+        refresh_tables()
+        app.after(REFRESH_MS, poll_files)
+
+    # sidebar design and tabs
+    sidebar = tk.Frame(app, bg=NAV, width=200)
+    sidebar.pack(fill="y", side="left")
+    sidebar.pack_propagate(False)
+
+    tk.Label(sidebar, text="SSIS",
+             font=("Georgia", 24, "bold"),
+             bg=NAV, fg=WHITE).pack(pady=(30, 2), padx=20, anchor="w")
+    tk.Label(sidebar, text="Student Information\nSystem",
+             font=("Segoe UI", 8),
+             bg=NAV, fg="#7a9cc0").pack(padx=20, anchor="w")
+
+    tk.Frame(sidebar, bg="#1e3a52", height=1).pack(fill="x", padx=15, pady=18)
+
+    content = tk.Frame(app, bg=BG)
+    content.pack(fill="both", expand=True, side="left")
+
+    frames = {}
+    for name in TABS:
+        f = tk.Frame(content, bg=BG)
+        frames[name] = f
+
+    active_btn = {"ref": None}
+    tabs = {}
+
+    def show_tab(name, btn):
+        # tabs are built the first time they are shown, and start loading
+        # their rows then
+        if name not in tabs:
+            built = time.perf_counter()
+            tabs[name] = TABS[name](frames[name])
+            startup.mark(f"{name} tab built", built)
+        for f in frames.values():
+            f.pack_forget()
+        frames[name].pack(fill="both", expand=True)
+        if active_btn["ref"]:
+            active_btn["ref"].configure(bg=NAV, fg="#7a9cc0")
+        btn.configure(bg=ACCENT, fg=WHITE)
+        active_btn["ref"] = btn
+
+    icons = {"Colleges": "🏛  Colleges",
+             "Programs": "📚  Programs",
+             "Students": "👤  Students",
+             "Dashboard": "📊  Dashboard"}
+
+    nav_buttons = {}
+    for name in TABS:
+        btn = tk.Button(sidebar, text=icons[name],
+                        font=("Segoe UI", 11), bg=NAV,
+                        fg="#7a9cc0", relief="flat",
+                        anchor="w", padx=20, pady=12,
+                        activebackground=ACCENT,
+                        activeforeground=WHITE,
+                        cursor="hand2", bd=0)
+        btn.configure(command=lambda n=name, b=btn: show_tab(n, b))
+        btn.pack(fill="x", pady=2)
+        nav_buttons[name] = btn
+
+    tk.Frame(sidebar, bg=NAV).pack(expand=True)
+    tk.Label(sidebar, text="v1.0", font=("Segoe UI", 8),
+             bg=NAV, fg="#3d5a73").pack(pady=10)
+
+    startup.mark("window built", t)
+
+    # let the window paint before the first tab is built, so no data is
+    # loaded until something is on screen
+    painted = {"done": False}
+
+    def first_paint(event=None):
+        if painted["done"]:
+            return
+        painted["done"] = True
+        startup.mark("first paint")
+        show_tab("Students", nav_buttons["Students"])
+        app.after(REFRESH_MS, poll_files)
+
+    sidebar.bind("<Expose>", first_paint)
+    app.after(500, first_paint)  # in case no Expose arrives (minimised)
+    app.mainloop()
+
+
+if __name__ == "__main__":
     main()
\ No newline at end of file
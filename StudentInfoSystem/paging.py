@@ -0,0 +1,69 @@
+# one page of a sorted search result at a time. a page is found by offset,
+# or by a cursor: the (sort value, key) of a row, so "the page after this
+# one" still starts at the right row after rows were added or deleted
+# before it. the result itself comes from a view's steps() (a key list in
+# memory, a lazy PagedKeys in sqlite); this only reads the keys of the page,
+# and the view places cursors in it with position().
+from bisect import bisect_left, bisect_right
+
+from sorting import Descending
+
+PAGE_SIZE = 500
+
+
+class Page(list):
+    # the keys (or rows, see TableService.page) of one page, remembering
+    # where it is: `offset` of its first row, `total` rows in the result,
+    # and the cursors of its first and last rows (None when empty)
+    def __init__(self, items, offset, total, first=None, last=None):
+        super().__init__(items)
+        self.offset = offset
+        self.total = total
+        self.first = first
+        self.last = last
+
+    @property
+    def has_next(self):
+        return self.offset + len(self) < self.total
+
+    @property
+    def has_prev(self):
+        return self.offset > 0
+
+
+def page_of(view, keys, field, descending=False, offset=0, limit=PAGE_SIZE,
+            after=None, before=None):
+    # the page of `keys` starting at `offset`, right after the cursor
+    # `after`, or ending right before the cursor `before`
+    total = len(keys)
+    if after is not None:
+        offset = view.position(keys, field, descending, after, True)
+    end = total if limit is None else offset + limit
+    if before is not None and after is None:
+        end = view.position(keys, field, descending, before)
+        offset = 0 if limit is None else end - limit
+    offset = max(0, min(offset, total))
+    end = max(offset, min(end, total))
+    part = [keys[i] for i in range(offset, end)]
+    if not part:
+        return Page(part, offset, total)
+    return Page(part, offset, total, view.cursor(field, part[0]),
+                view.cursor(field, part[-1]))
+
+
+class KeyOrder:
+    # stands in for a view in page_of() when the result is a table's keys
+    # sorted by the key itself, (typed(key), key), with no rows loaded
+    # (see TableService.page): a cursor is then (key, key)
+    def __init__(self, typed):
+        self.typed = typed
+
+    def cursor(self, field, key):
+        return (key, key)
+
+    def position(self, keys, field, descending, cursor, after=False):
+        entry = lambda k: (self.typed(k), k)
+        if descending:
+            entry = lambda k, e=entry: Descending(e(k))
+        find = bisect_right if after else bisect_left
+        return find(keys, entry(cursor[1]), key=entry)
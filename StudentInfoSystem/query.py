@@ -0,0 +1,410 @@
+import re
+from bisect import bisect_left
+from itertools import compress
+from operator import attrgetter, itemgetter, ne
+
+from gcpause import gc_paused
+from records import Record
+from sorting import SORT_KEYS, Sorter, text_key
+
+try:
+    import numpy as np
+except ImportError:  # optional: without it queries run in plain python
+    np = None
+
+# structured filters such as program=BSIT, year>=3 or lastname^=mend, and
+# two engines that run them. with numpy every column is held as an array of
+# dictionary codes (one small int per row, the distinct values kept once),
+# filters become vectorized masks over those arrays and results are sorted
+# with lexsort. without it the same filters are tested row by row and
+# sorted with the presorted indexes of sorting.py. both give the same keys
+# in the same order.
+#
+#   =   equals, exactly (like `where`)       !=  doesn't equal
+#   ^=  starts with, ignoring case
+#   <  <=  >  >=  compare the way the column sorts: years and ids
+#                 numerically, text ignoring case
+#   in  is one of a set of values (made in code, e.g. for the students of
+#       a college: program in its programs)
+FILTER = re.compile(r"^\s*(\w+)\s*(!=|\^=|>=|<=|=|>|<)\s*(.*?)\s*$")
+
+
+OPS = ("=", "!=", "^=", "<", "<=", ">", ">=", "in")
+
+
+class Filter:
+    __slots__ = ("field", "op", "value", "test")
+
+    def __init__(self, field, op, value):
+        if op not in OPS:
+            raise ValueError(f"Unknown filter operator '{op}'.")
+        self.field = field
+        self.op = op
+        self.value = frozenset(value) if op == "in" else value
+        # test(value): whether a row whose field holds `value` passes
+        self.test = self._tester()
+
+    def _tester(self):
+        if self.op == "=":
+            return self.value.__eq__
+        if self.op == "!=":
+            return self.value.__ne__
+        if self.op == "in":
+            return self.value.__contains__
+        if self.op == "^=":
+            prefix = self.value.casefold()
+            return lambda v: v.casefold().startswith(prefix)
+        typed = SORT_KEYS.get(self.field, text_key)
+        bound = typed(self.value)
+        compare = {"<": bound.__gt__, "<=": bound.__ge__,
+                   ">": bound.__lt__, ">=": bound.__le__}[self.op]
+        return lambda v: compare(typed(v))
+
+    def __eq__(self, other):
+        return isinstance(other, Filter) and \
+            (self.field, self.op, self.value) == \
+            (other.field, other.op, other.value)
+
+    def __hash__(self):
+        return hash((self.field, self.op, self.value))
+
+    def __repr__(self):
+        if self.op == "in":
+            return f"Filter({self.field} in {sorted(self.value)})"
+        return f"Filter({self.field}{self.op}{self.value})"
+
+    @property
+    def indexed(self):
+        # answered from an inverted index rather than by testing rows
+        return self.op in ("=", "in")
+
+
+def parse_filter(text):
+    # "year>=3" -> Filter("year", ">=", "3")
+    m = FILTER.match(text)
+    if m is None:
+        raise ValueError(f"Expected a filter like year>=3, got '{text}'.")
+    return Filter(*m.groups())
+
+
+def as_filters(where):
+    # a `where` dict ({field: value}, all must be equal), or a list of
+    # Filters and/or filter strings, as a list of Filters
+    if not where:
+        return []
+    if isinstance(where, dict):
+        return [Filter(f, "=", v) for f, v in where.items()]
+    return [w if isinstance(w, Filter) else parse_filter(w) for w in where]
+
+
+def split_query(text, fields):
+    # the words of a search box that are filters on one of `fields`
+    # ("mend year>=3") and the rest, which is searched for as before
+    filters, rest = [], []
+    for word in text.split():
+        m = FILTER.match(word)
+        if m is not None and m.group(1) in fields and m.group(3):
+            filters.append(Filter(*m.groups()))
+        else:
+            rest.append(word)
+    return filters, " ".join(rest)
+
+
+class Postings:
+    # value -> set of keys for one field: an inverted index for a column
+    # the repository doesn't index itself, built on first use and kept up
+    # to date from its change events
+    def __init__(self, repo, field):
+        self.repo = repo
+        self.field = field
+        self._sets = None
+        repo.subscribe(self._on_change)
+
+    def sets(self):
+        rows = self.repo.rows()
+        if self._sets is None:
+            sets = {}
+            with gc_paused():
+                for r in rows:
+                    sets.setdefault(r[self.field], set()).add(r[self.repo.key])
+            self._sets = sets
+        return self._sets
+
+    def keys(self, value):
+        # the set itself, not a copy; don't change it
+        return self.sets().get(value, frozenset())
+
+    def _on_change(self, op, key, row, old):
+        if self._sets is None:
+            return
+        if op == "reload":
+            self._sets = None
+            return
+        if old is not None:
+            keys = self._sets.get(old[self.field])
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._sets[old[self.field]]
+        if row is not None:
+            self._sets.setdefault(row[self.field], set()).add(row[self.repo.key])
+
+
+class PythonEngine:
+    # the fallback: equality filters from inverted indexes (the
+    # repository's, or a Postings made for the field) with the smallest
+    # posting set intersected first, the rest tested row by row, and the
+    # presorted sort indexes for the order
+    def __init__(self, repo):
+        self.repo = repo
+        self.sorter = Sorter(repo)
+        self._postings = {}
+
+    def keys_where(self, field, value):
+        if self.repo.has_index(field):
+            return self.repo.keys_where(field, value)
+        if field not in self._postings:
+            self._postings[field] = Postings(self.repo, field)
+        return self._postings[field].keys(value)
+
+    def _found(self, f):
+        if f.op == "=":
+            return self.keys_where(f.field, f.value)
+        sets = [self.keys_where(f.field, v) for v in f.value]
+        return sets[0].union(*sets[1:]) if sets else frozenset()
+
+    def select(self, filters, within=None):
+        # the keys passing every filter, or None for all of them. `within`
+        # limits it to those keys (a search result)
+        indexed = [f for f in filters if f.indexed]
+        others = [f for f in filters if not f.indexed]
+        keys = within
+        if indexed:
+            found = list(map(self._found, indexed))
+            if within is not None:
+                found.append(within)
+            found.sort(key=len)
+            keys = set(found[0]).intersection(*found[1:])
+        if others:
+            if keys is None:
+                keys = self.repo.codes()
+            rows = self.repo.get_many(keys)
+            keys = [k for k, r in zip(keys, rows) if r is not None
+                    and all(f.test(r[f.field]) for f in others)]
+        return keys
+
+    def order(self, field, descending=False, selection=None):
+        return self.sorter.order(field, descending, selection)
+
+    def prepare(self):
+        # builds what the first query needs, so it can be done off the Tk
+        # thread
+        self.sorter.index(self.repo.key).entries()
+
+
+class Ranks:
+    # the place of each of a column's codes in one sort order; values that
+    # sort alike (case aside) share a place. patched rather than redone
+    # when a few values come along later (every new student brings a new
+    # id).
+    REBUILD = 1000
+
+    def __init__(self, typed):
+        self.typed = typed
+        self._sorted = None
+        self._ranks = None
+
+    def of(self, values):
+        done = 0 if self._ranks is None else len(self._ranks)
+        new = values[done:]
+        if self._ranks is None or len(new) > self.REBUILD:
+            # sorting the codes rather than a set of the values keeps the
+            # table's own order, which is mostly sorted already (by id)
+            typed = list(map(self.typed, values))
+            order = sorted(range(len(typed)), key=typed.__getitem__)
+            ordered = list(map(typed.__getitem__, order))
+            starts = np.fromiter(map(ne, ordered, [None] + ordered), bool,
+                                 len(ordered))
+            self._ranks = np.empty(len(typed), np.int64)
+            self._ranks[np.array(order, np.int64)] = np.cumsum(starts) - 1
+            self._sorted = list(compress(ordered, starts))
+        elif new:
+            added = []
+            for value in new:
+                t = self.typed(value)
+                i = bisect_left(self._sorted, t)
+                if i == len(self._sorted) or self._sorted[i] != t:
+                    self._sorted.insert(i, t)
+                    self._ranks[self._ranks >= i] += 1
+                    added = [r + (r >= i) for r in added]
+                added.append(i)
+            self._ranks = np.concatenate(
+                [self._ranks, np.array(added, np.int64)])
+        return self._ranks
+
+
+class Column:
+    # one field, dictionary-encoded: each distinct value gets the next code
+    # the first time it's seen
+    def __init__(self, field):
+        self.typed = SORT_KEYS.get(field, text_key)
+        self.values = []
+        self.code_of = {}
+        self._ranks = {}
+
+    def code(self, value):
+        c = self.code_of.get(value)
+        if c is None:
+            c = self.code_of[value] = len(self.values)
+            self.values.append(value)
+        return c
+
+    def encode(self, values):
+        # codes for a whole column at once; dict.fromkeys finds the distinct
+        # values in C, in the order they first appear
+        self.code_of = {v: i for i, v in enumerate(dict.fromkeys(values))}
+        self.values = list(self.code_of)
+        return np.fromiter(map(self.code_of.__getitem__, values), np.int32,
+                           len(values))
+
+    def ranks(self, typed=None):
+        # rank of every code when sorted the column's way, or by `typed`
+        typed = typed or self.typed
+        if typed not in self._ranks:
+            self._ranks[typed] = Ranks(typed)
+        return self._ranks[typed].of(self.values)
+
+    def hits(self, f):
+        # which codes pass the filter; one test per distinct value
+        return np.fromiter(map(f.test, self.values), bool, len(self.values))
+
+
+class ArrayEngine:
+    # rows as positions in a set of code arrays, one per field. built on
+    # the first query and kept up to date from the repository's change
+    # events: an add appends, an update overwrites the codes in place and a
+    # delete clears the row's `alive` flag. a reload (or too many dead
+    # rows) means building again.
+    def __init__(self, repo, fields):
+        self.repo = repo
+        self.fields = list(fields)
+        self.sorter = Sorter(repo)
+        self._built = False
+        repo.subscribe(self._on_change)
+
+    def _build(self):
+        rows = self.repo.rows()
+        n = len(rows)
+        self.columns = {f: Column(f) for f in self.fields}
+        self.codes = {}
+        with gc_paused():
+            # one tuple of values per field, read with C getters; records
+            # are read by attribute, which skips their __getitem__
+            plain = n == 0 or not isinstance(next(iter(rows)), Record)
+            get = (itemgetter if plain else attrgetter)(*self.fields)
+            values = zip(*map(get, rows)) if n else [()] * len(self.fields)
+            for (f, column), column_values in zip(self.columns.items(),
+                                                  values):
+                self.codes[f] = column.encode(column_values)
+            key = self.columns[self.repo.key]
+            self.keys = np.array(key.values, object)[self.codes[self.repo.key]]
+        self.pos = {k: i for i, k in enumerate(self.keys.tolist())}
+        self.alive = np.ones(n, bool)
+        self.size, self.dead = n, 0
+        self._built = True
+
+    def _grow(self):
+        # room for more rows, doubling like a list does
+        room = max(16, 2 * len(self.alive))
+        for f, codes in self.codes.items():
+            self.codes[f] = np.resize(codes, room)
+        self.keys = np.resize(self.keys, room)
+        self.alive = np.resize(self.alive, room)
+        self.alive[self.size:] = False
+
+    def _on_change(self, op, key, row, old):
+        if not self._built:
+            return
+        if op == "reload":
+            self._built = False
+            return
+        if old is not None:
+            i = self.pos.pop(key, None)
+            if i is not None and row is not None \
+                    and row[self.repo.key] == key:
+                # an update in place: same position, new codes
+                self.pos[key] = i
+                for f, column in self.columns.items():
+                    self.codes[f][i] = column.code(row[f])
+                return
+            if i is not None:
+                self.alive[i] = False
+                self.keys[i] = None
+                self.dead += 1
+        if row is not None:
+            if self.size == len(self.alive):
+                self._grow()
+            i = self.size
+            for f, column in self.columns.items():
+                self.codes[f][i] = column.code(row[f])
+            self.keys[i] = row[self.repo.key]
+            self.alive[i] = True
+            self.pos[self.keys[i]] = i
+            self.size += 1
+        if self.dead > self.size // 2:
+            self._built = False
+
+    def _table(self):
+        self.repo.rows()  # picks up changes made elsewhere first
+        if not self._built:
+            self._build()
+
+    def prepare(self):
+        self._table()
+        self.columns[self.repo.key].ranks()
+        self.columns[self.repo.key].ranks(str)
+
+    def select(self, filters, within=None):
+        # positions of the rows passing every filter; `within` limits it
+        # to those keys (a search result)
+        self._table()
+        mask = self.alive[:self.size].copy()
+        if within is not None:
+            picked = np.zeros(self.size, bool)
+            pos = self.pos
+            picked[np.fromiter((pos[k] for k in within if k in pos),
+                               np.int64)] = True
+            mask &= picked
+        for f in filters:
+            codes = self.codes[f.field][:self.size]
+            column = self.columns[f.field]
+            if f.op == "=":
+                c = column.code_of.get(f.value)
+                if c is None:
+                    mask[:] = False
+                else:
+                    mask &= codes == c
+            else:
+                mask &= column.hits(f)[codes]
+        return np.flatnonzero(mask)
+
+    def order(self, field, descending=False, selection=None):
+        # keys of the selected rows, sorted by (field, key) like Sorter
+        # does. the two ranks are combined into one int64 per row, which
+        # argsort orders several times faster than lexsort does the pair
+        if selection is None:
+            selection = self.select(())
+        key = self.columns[self.repo.key]
+        codes = self.codes[self.repo.key][selection]
+        tie = key.ranks(str)[codes]
+        ranks = self.columns[field].ranks()[self.codes[field][selection]]
+        order = np.argsort(ranks * len(key.values) + tie)
+        if descending:
+            order = order[::-1]
+        return self.keys[selection[order]].tolist()
+
+
+def make_engine(repo):
+    if np is not None:
+        return ArrayEngine(repo, repo.fields)
+    return PythonEngine(repo)
@@ -0,0 +1,96 @@
+from collections.abc import Mapping
+from operator import attrgetter
+
+# compact rows for the in-memory tables. record_type(fields) makes a class
+# with one __slots__ attribute per field, so a row costs a small fixed-size
+# object instead of a dict (80 bytes for the six student fields against
+# 272), and a table of them loads about as fast. records read like
+# dicts: r["program"], r.get(), keys(), items(), dict(r), {**r}, and ==
+# against a dict. they are never changed in place; replace() makes a changed copy.
+#
+# the fields named in `categorical` (a student's program, year and gender)
+# are dictionary-encoded: every distinct value is kept once in the class's
+# `values_of` dict and each row points at that one string, so a million
+# "BSIT"s cost a pointer each.
+
+
+class Record(Mapping):
+    __slots__ = ()
+    fields = ()
+    field_set = frozenset()
+    values_of = {}
+
+    def __getitem__(self, field):
+        if field in self.field_set:
+            return getattr(self, field)
+        raise KeyError(field)
+
+    def get(self, field, default=None):
+        if field in self.field_set:
+            return getattr(self, field)
+        return default
+
+    def keys(self):
+        # the field names; a tuple rather than a view, which is what makes
+        # dict(r) fast
+        return self.fields
+
+    def __iter__(self):
+        return iter(self.fields)
+
+    def __len__(self):
+        return len(self.fields)
+
+    def __contains__(self, field):
+        return field in self.field_set
+
+    def __eq__(self, other):
+        if type(other) is type(self):
+            return self.astuple() == other.astuple()
+        if isinstance(other, Mapping):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
+
+    __hash__ = None
+
+    def astuple(self):
+        # the values in field order (an attrgetter per class, see record_type)
+        return tuple(getattr(self, f) for f in self.fields)
+
+    def replace(self, **changes):
+        return type(self)(*[changes[f] if f in changes else getattr(self, f)
+                            for f in self.fields])
+
+    def __repr__(self):
+        return f"{type(self).__name__}({dict(self.items())!r})"
+
+
+def record_type(name, fields, categorical=()):
+    # a Record subclass for rows with `fields`, built with
+    # cls(value, value, ...) in field order (see Record)
+    for f in fields:
+        if not f.isidentifier() or hasattr(Record, f):
+            raise ValueError(f"{f!r} can't be a record field")
+    values_of = {f: {} for f in categorical}
+    # (field, its values_of dict or None) in order, and the attrgetter that
+    # reads them all back as a tuple
+    plan = [(f, values_of.get(f)) for f in fields]
+    get = attrgetter(*fields)
+
+    def __init__(self, *values):
+        if len(values) != len(plan):
+            raise TypeError(f"{name} takes {len(plan)} values, "
+                            f"got {len(values)}")
+        for (f, seen), value in zip(plan, values):
+            setattr(self, f, value if seen is None
+                    else seen.setdefault(value, value))
+
+    def astuple(self):
+        return get(self) if len(plan) > 1 else (get(self),)
+
+    return type(name, (Record,), {"__slots__": tuple(fields),
+                                  "fields": tuple(fields),
+                                  "field_set": frozenset(fields),
+                                  "values_of": values_of,
+                                  "__init__": __init__,
+                                  "astuple": astuple})
@@ -0,0 +1,81 @@
+import threading
+from bisect import bisect_left
+
+# the colleges and programs as the dialogs and validation need them: the
+# codes sorted, code -> name, and prefix indexes for type-ahead. built on
+# first use and dropped whenever the table reports a change (a save from
+# any tab, or a reload after another program changed the file), so opening
+# a dialog costs the same however big the table is.
+
+
+class References:
+    def __init__(self, table, label="name"):
+        self.table = table
+        self.label = label
+        self._lock = threading.Lock()
+        self._data = None
+        self._changes = 0
+        table.subscribe(self._on_change)
+
+    def _on_change(self, op, key, row, old):
+        if op == "update" and row[self.table.key] == key \
+                and row[self.label] == old[self.label]:
+            return
+        self._changes += 1
+        self._data = None
+
+    def _build(self):
+        names = {r[self.table.key]: r[self.label] for r in self.table.rows()}
+        codes = sorted(names, key=str.casefold)
+        # two prefix indexes: the codes themselves ("bs" finds BSCS), and
+        # (word, code) for every word of the names ("comp" finds BSCS by
+        # Computer Science)
+        folded = [c.casefold() for c in codes]
+        words = sorted((word, code) for code in codes
+                       for word in set(names[code].casefold().split()))
+        return codes, frozenset(codes), names, folded, words
+
+    def _get(self):
+        data = self._data
+        if data is None:
+            with self._lock:
+                # not kept if the table changed while it was being built
+                changes = self._changes
+                data = self._build()
+                if changes == self._changes:
+                    self._data = data
+        return data
+
+    def codes(self):
+        # sorted, ignoring case; don't change the list
+        return self._get()[0]
+
+    def __contains__(self, code):
+        return code in self._get()[1]
+
+    def name(self, code):
+        return self._get()[2].get(code, "")
+
+    def matching(self, text, limit=50):
+        # codes starting with `text`, then those with a name word that does,
+        # at most `limit`; each index is only read as far as needed. no
+        # text gives the first `limit` codes
+        codes, _, _, folded, words = self._get()
+        text = text.strip().casefold()
+        if not text:
+            return codes[:limit]
+        i = bisect_left(folded, text)
+        found = []
+        while i < len(folded) and len(found) < limit \
+                and folded[i].startswith(text):
+            found.append(codes[i])
+            i += 1
+        seen = set(found)
+        i = bisect_left(words, (text,))
+        while i < len(words) and len(found) < limit \
+                and words[i][0].startswith(text):
+            if words[i][1] not in seen:
+                seen.add(words[i][1])
+                found.append(words[i][1])
+            i += 1
+        return found
@@ -0,0 +1,89 @@
+from gcpause import gc_paused
+
+# lowercase search text for every row, built once and kept up to date from
+# repository change events, so a search never lowercases a row again
+SEP = "\x1f"
+
+
+class SearchIndex:
+    def __init__(self, repo, fields):
+        self.repo = repo
+        self.fields = fields
+        self.version = 0
+        self._text = None
+        repo.subscribe(self._on_change)
+
+    def _row_text(self, row):
+        # fields are joined with a separator so a query can't match
+        # across two of them
+        return SEP.join(row[f] for f in self.fields).lower()
+
+    def texts(self):
+        rows = self.repo.rows()
+        if self._text is None:
+            with gc_paused():
+                self._text = {r[self.repo.key]: self._row_text(r)
+                              for r in rows}
+        return self._text
+
+    def _on_change(self, op, key, row, old):
+        self.version += 1
+        if self._text is None:
+            return
+        if op == "reload":
+            self._text = None
+        elif op == "delete":
+            self._text.pop(key, None)
+        else:
+            self._text[key] = self._row_text(row)
+
+    def matches(self, key, query):
+        text = self.texts().get(key)
+        return text is not None and query.lower() in text
+
+
+class Searcher:
+    # runs queries against a SearchIndex. a query that extends the previous
+    # one only re-checks the previous matches, as long as nothing changed.
+    def __init__(self, index, chunk=20000):
+        self.index = index
+        self.chunk = chunk
+        self._last_query = None
+        self._last = None
+        self._last_version = None
+
+    def steps(self, query):
+        # generator that yields after every chunk of rows so the caller can
+        # spread the work out or abandon it; its return value is the list
+        # of matching keys
+        query = query.lower()
+        if not query:
+            # everything matches; don't build the texts just for that
+            return self.index.repo.codes()
+        texts = self.index.texts()
+        version = self.index.version
+        if (self._last is not None and version == self._last_version
+                and self._last_query in query):
+            candidates = self._last
+        else:
+            candidates = list(texts)
+        result = []
+        for start in range(0, len(candidates), self.chunk):
+            part = candidates[start:start + self.chunk]
+            result.extend(k for k in part if query in texts.get(k, ""))
+            yield
+        self._last_query, self._last = query, result
+        self._last_version = version
+        return result
+
+    def search(self, query):
+        return run_steps(self.steps(query))
+
+
+def run_steps(steps):
+    # drive a search generator to the end and return its result
+    while True:
+        try:
+            next(steps)
+        except StopIteration as done:
+            return done.value
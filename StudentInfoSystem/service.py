@@ -0,0 +1,251 @@
+import database
+from fulltext import is_fulltext
+from integrity import CASCADE, IntegrityError
+from paging import PAGE_SIZE, KeyOrder, Page, page_of
+from query import Filter, as_filters
+from search import run_steps
+from sorting import SORT_KEYS, text_key
+from storage import ConflictError
+from validator import (college_validator, is_duplicate, program_validator,
+                       student_validator)
+
+# the operations behind the tabs, without any gui: scripts, the cli and the
+# tabs all go through these, so they can't disagree about what's allowed.
+# nothing here (or in what it imports) touches tkinter.
+
+
+class ServiceError(Exception):
+    # an operation was refused; the message is meant for the user
+    pass
+
+
+class ValidationError(ServiceError):
+    pass
+
+
+class InUseError(ServiceError):
+    # a delete or code change refused because other rows refer to the row
+    def __init__(self, message, dependents):
+        super().__init__(message)
+        self.dependents = dependents
+
+
+class TableService:
+    def __init__(self, table, validate, label, key_label, fulltext=None,
+                 integrity=database.integrity, joins=None):
+        self.table = table
+        self.integrity = integrity
+        self.fields = table.fields
+        self.key = table.key
+        self.validate = validate
+        self.label = label
+        self.key_label = key_label
+        # pages in key order straight from the file, see page()
+        self.key_order = KeyOrder(SORT_KEYS.get(self.key, text_key))
+        # called on first use, so a plain add never builds a search index
+        self._fulltext = fulltext
+        self._view = None
+        # fields of another table that can be filtered on through one of
+        # ours: {field: (our field, other table, its field)}, e.g. a
+        # student's college through their program
+        self.joins = joins or {}
+
+    @property
+    def fulltext(self):
+        return self._fulltext() if self._fulltext else None
+
+    @property
+    def view(self):
+        if self._view is None:
+            self._view = self.table.view(self.fields, self.fulltext)
+        return self._view
+
+    def _clean(self, data):
+        return self.validate.clean(data)
+
+    def _check(self, row):
+        err = self.validate(row)
+        if err:
+            raise ValidationError(err)
+        try:
+            self.integrity.check(self.table, row)
+        except IntegrityError as e:
+            raise ValidationError(str(e))
+
+    def _check_field(self, field):
+        # field names end up in sql for the sqlite backend
+        if field not in self.fields:
+            raise ServiceError(f"Unknown field '{field}'.")
+
+    def get(self, key):
+        r = self.table.get(key)
+        return dict(r) if r is not None else None
+
+    def lookup(self, key):
+        # get() for a one-off read, e.g. from the cli: the csv backend
+        # reads just that row instead of loading the table
+        return self.table.lookup(key)
+
+    def add(self, data):
+        row = self._clean(data)
+        self._check(row)
+        if is_duplicate(self.table, self.key, row[self.key]) \
+                or not self.table.add(row):
+            raise ServiceError(f"{self.key_label} already exists.")
+        return row
+
+    @property
+    def version(self):
+        # read it when an edit starts and pass it to update() as `since`
+        return self.table.version
+
+    def update(self, key, data, since=None):
+        # with `since`, a row someone else changed after it is refused
+        # rather than overwritten
+        old = self.table.get(key)
+        if old is None:
+            raise ServiceError(f"{self.label} not found.")
+        row = self._clean({**old, **data, self.key: key})
+        self._check(row)
+        try:
+            updated = self.table.update(key, row, since)
+        except ConflictError:
+            raise ServiceError(f"{self.label} was changed elsewhere "
+                               "meanwhile; reopen it to see the changes.")
+        if not updated:
+            raise ServiceError(f"{self.label} not found.")
+        return row
+
+    def delete(self, key, policy=None):
+        # rows referring to this one are handled by the integrity engine;
+        # `policy` (restrict, cascade or set-null) overrides its settings
+        if self.table.get(key) is None:
+            raise ServiceError(f"{self.label} not found.")
+        try:
+            return self.integrity.delete(self.table, [key], policy)
+        except IntegrityError as e:
+            raise InUseError(str(e), e.dependents)
+
+    def cascade_counts(self, key):
+        # what delete(key, CASCADE) would delete from the other tables, as
+        # (label, rows) pairs, without deleting anything
+        plan = self.integrity.plan_delete(self.table, [key], CASCADE)
+        labels = {r.child: r.child_label for r in self.integrity.relations}
+        return [(labels[t], len(plan.deletes[t])) for t in plan.tables
+                if t is not self.table and plan.deletes[t]]
+
+    def change_code(self, old, new, policy=None):
+        new = new.strip()
+        if not new:
+            raise ValidationError(f"{self.key_label} can't be blank.")
+        if self.table.get(old) is None:
+            raise ServiceError(f"{self.label} not found.")
+        if self.table.get(new) is not None:
+            raise ServiceError(f"{self.key_label} already exists.")
+        self._check({**self.table.get(old), self.key: new})
+        try:
+            return self.integrity.change_key(self.table, old, new, policy)
+        except IntegrityError as e:
+            raise InUseError(str(e), e.dependents)
+
+    def orphans(self):
+        # rows of this table whose references point nowhere
+        return self.integrity.orphans(self.table)
+
+    def filters(self, where):
+        # `where` as a list of Filters on this table's own fields: {field:
+        # value} pairs that must be equal, or filters like "year>=3" (see
+        # query.py). a filter on a joined field becomes "in" the matching
+        # values of ours
+        try:
+            filters = as_filters(where)
+        except ValueError as e:
+            raise ServiceError(str(e))
+        for i, f in enumerate(filters):
+            if f.field not in self.joins:
+                self._check_field(f.field)
+                continue
+            field, other, other_field = self.joins[f.field]
+            if f.op == "=":
+                found = other.keys_where(other_field, f.value)
+            else:
+                found = [r[other.key] for r in other.rows()
+                         if f.test(r[other_field])]
+            filters[i] = Filter(field, "in", found)
+        return filters
+
+    def keys(self, search="", sort=None, descending=False, where=None):
+        # sorted keys of the rows containing `search` that pass `where`
+        # (see filters())
+        sort = sort or self.key
+        self._check_field(sort)
+        filters = self.filters(where)
+        return run_steps(self.view.steps(search, sort, descending, filters))
+
+    def query(self, search="", sort=None, descending=False, where=None,
+              offset=0, limit=None):
+        return list(self.page(search, sort, descending, where, offset, limit))
+
+    def page(self, search="", sort=None, descending=False, where=None,
+             offset=0, limit=PAGE_SIZE, after=None, before=None):
+        # one page of the sorted rows that keys() finds, as a Page (see
+        # paging.py): the rows, their offset and the total, and the
+        # cursors to pass as `after` or `before` for the next or previous
+        # page. only the page's keys and rows are read
+        sort = sort or self.key
+        if not search and not where and sort == self.key \
+                and limit is not None:
+            # a page of a whole table in key order: a csv nobody has
+            # loaded is read in place through its byte-offset index
+            with self.table.in_place() as mapped:
+                if mapped is not None:
+                    keys = mapped.sorted_keys(self.key_order.typed)
+                    found = page_of(self.key_order,
+                                    keys[::-1] if descending else keys,
+                                    sort, descending, offset, limit,
+                                    after, before)
+                    return Page([mapped.get(k) for k in found], found.offset,
+                                found.total, found.first, found.last)
+        keys = self.keys(search, sort, descending, where)
+        found = page_of(self.view, keys, sort, descending, offset, limit,
+                        after, before)
+        rows = self.table.get_many(found)
+        return Page([dict(r) for r in rows if r is not None], found.offset,
+                    found.total, found.first, found.last)
+
+    def count(self, search="", where=None):
+        return len(self.keys(search, where=where))
+
+    def search(self, text, limit=None):
+        # several words on a table with a full-text index come back ranked
+        # by relevance; anything else, or words the full-text index doesn't
+        # find, is a substring search sorted by key
+        fulltext = self.fulltext
+        keys = []
+        if fulltext is not None and is_fulltext(text):
+            keys = fulltext.search(text, limit)
+        if not keys:
+            return self.query(search=text, limit=limit)
+        rows = self.table.get_many(keys)
+        return [dict(r) for r in rows if r is not None]
+
+    def sort(self, field, descending=False, limit=None):
+        return self.query(sort=field, descending=descending, limit=limit)
+
+
+# programs and students are checked against the cached codes of the table
+# they refer to
+college_service = TableService(database.colleges, college_validator(),
+                               "College", "Code")
+program_service = TableService(
+    database.programs, program_validator(database.college_refs),
+    "Program", "Code")
+student_service = TableService(
+    database.students, student_validator(database.program_refs),
+    "Student", "ID",
+    database.student_fulltext,
+    joins={"college": ("program", database.programs, "college")})
+
+SERVICES = {"colleges": college_service,
+            "programs": program_service,
+            "students": student_service}
@@ -0,0 +1,129 @@
+import re
+from bisect import bisect_left, insort
+
+from gcpause import gc_paused
+
+# typed sort keys: ids by (year, serial), numbers numerically, text without
+# regard to case. malformed values sort after the well-formed ones.
+ID_PATTERN = re.compile(r"^(\d{4})-(\d{4})$")
+
+
+def id_key(value):
+    if len(value) == 9 and ID_PATTERN.match(value):
+        return (0, int(value[:4]), int(value[5:]), "")
+    return (1, 0, 0, value)
+
+
+def number_key(value):
+    if value.isdigit():
+        return (0, int(value), "")
+    return (1, 0, value)
+
+
+def text_key(value):
+    return value.casefold()
+
+
+SORT_KEYS = {"id": id_key, "year": number_key}
+
+# Sorter.order sorts a result on its own when it has fewer than 1/SMALL of
+# the rows; past that one pass over the presorted index is cheaper
+SMALL = 16
+
+
+class Descending:
+    # flips the comparison of the wrapped value, for bisecting lists that
+    # are sorted in descending order
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+class SortIndex:
+    # one column kept sorted as (typed value, key) pairs. built on first use,
+    # then updated with bisect on every change instead of re-sorting.
+    def __init__(self, repo, field):
+        self.repo = repo
+        self.field = field
+        self.typed = SORT_KEYS.get(field, text_key)
+        self._entries = None
+        repo.subscribe(self._on_change)
+
+    def entry(self, row):
+        return (self.typed(row[self.field]), row[self.repo.key])
+
+    def entries(self):
+        rows = self.repo.rows()
+        if self._entries is None:
+            with gc_paused():
+                self._entries = sorted(map(self.entry, rows))
+        return self._entries
+
+    def _remove(self, row):
+        entry = self.entry(row)
+        i = bisect_left(self._entries, entry)
+        if i < len(self._entries) and self._entries[i] == entry:
+            del self._entries[i]
+
+    def _on_change(self, op, key, row, old):
+        if self._entries is None:
+            return
+        if op == "reload":
+            self._entries = None
+            return
+        if row is not None and old is not None and \
+                row[self.field] == old[self.field]:
+            return
+        if old is not None:
+            self._remove(old)
+        if row is not None:
+            insort(self._entries, self.entry(row))
+
+    def keys(self, descending=False, within=None):
+        # keys in sorted order, optionally only those in the set `within`
+        entries = self.entries()
+        if descending:
+            entries = reversed(entries)
+        if within is None:
+            return [k for _, k in entries]
+        return [k for _, k in entries if k in within]
+
+
+class Sorter:
+    # the sort indexes of one repository, one per column, made on demand
+    def __init__(self, repo):
+        self.repo = repo
+        self._indexes = {}
+
+    def index(self, field):
+        if field not in self._indexes:
+            self._indexes[field] = SortIndex(self.repo, field)
+        return self._indexes[field]
+
+    def order(self, field, descending=False, within=None):
+        # `within` is a search result; a full one needs no filtering, and a
+        # small one is quicker to sort on its own than to pick out of the
+        # whole index
+        index = self.index(field)
+        if within is not None and len(within) >= len(self.repo):
+            within = None
+        elif within is not None and len(within) * SMALL < len(self.repo):
+            entries = sorted(map(index.entry, self.repo.get_many(within)))
+            if descending:
+                entries.reverse()
+            return [k for _, k in entries]
+        elif within is not None:
+            within = set(within)
+        return index.keys(descending, within)
+
+    def row_key(self, field, row, descending=False):
+        # sort key of a single row, consistent with order()
+        entry = self.index(field).entry(row)
+        return Descending(entry) if descending else entry
@@ -0,0 +1,112 @@
+import threading
+from collections import Counter
+
+from gcpause import gc_paused
+
+# students per program, college, year and gender. the counters are built
+# with one pass on first use and then kept up to date from change events,
+# one increment per changed row, so reading them never scans the students.
+# a student's college comes from its program; students of a program that
+# doesn't exist are counted under college "".
+GROUPS = ("program", "college", "year", "gender")
+
+
+class StudentStats:
+    def __init__(self, students, programs):
+        self.students = students
+        self.programs = programs
+        self._counts = None
+        self._college_of = {}
+        self._changes = 0
+        self._listeners = []
+        self._lock = threading.Lock()
+        students.subscribe(self._on_student)
+        programs.subscribe(self._on_program)
+
+    def subscribe(self, listener):
+        # listener() after the counts changed, on the changing thread
+        self._listeners.append(listener)
+
+    def _notify(self):
+        for listener in self._listeners:
+            listener()
+
+    def _build(self):
+        # counted without holding our lock (the tables take theirs while
+        # loading, and announce changes under it); if anything changed
+        # meanwhile, count again
+        while True:
+            with self._lock:
+                seen = self._changes
+            programs, students = self.programs.rows(), self.students.rows()
+            try:
+                with gc_paused():
+                    college_of = {p["code"]: p["college"] for p in programs}
+                    counts = {g: Counter() for g in GROUPS}
+                    for r in students:
+                        counts["program"][r["program"]] += 1
+                        counts["year"][r["year"]] += 1
+                        counts["gender"][r["gender"]] += 1
+            except RuntimeError:
+                continue  # a table changed size under us
+            for program, n in counts["program"].items():
+                counts["college"][college_of.get(program, "")] += n
+            with self._lock:
+                if self._changes == seen:
+                    self._counts, self._college_of = counts, college_of
+                    return counts
+
+    def _bump(self, group, value, n):
+        counter = self._counts[group]
+        counter[value] += n
+        if counter[value] == 0:
+            del counter[value]
+
+    def _count(self, row, n):
+        self._bump("program", row["program"], n)
+        self._bump("college", self._college_of.get(row["program"], ""), n)
+        self._bump("year", row["year"], n)
+        self._bump("gender", row["gender"], n)
+
+    def _on_student(self, op, key, row, old):
+        with self._lock:
+            self._changes += 1
+            if op == "reload":
+                self._counts = None
+            elif self._counts is not None:
+                if old is not None:
+                    self._count(old, -1)
+                if row is not None:
+                    self._count(row, 1)
+        self._notify()
+
+    def _on_program(self, op, key, row, old):
+        # a program changing college takes its students' count with it
+        with self._lock:
+            self._changes += 1
+            if op == "reload":
+                self._counts = None
+            elif self._counts is not None:
+                before = old["college"] if old is not None else ""
+                after = row["college"] if row is not None else ""
+                if row is not None:
+                    self._college_of[key] = after
+                else:
+                    self._college_of.pop(key, None)
+                n = self._counts["program"].get(key, 0)
+                if n and before != after:
+                    self._bump("college", before, -n)
+                    self._bump("college", after, n)
+        self._notify()
+
+    def counts(self, group):
+        # {value: number of students}, e.g. counts("year") -> {"1": 120, ...}
+        with self._lock:
+            counts = self._counts
+        if counts is None:
+            counts = self._build()
+        with self._lock:
+            return dict(counts[group])
+
+    def total(self):
+        return sum(self.counts("gender").values())
@@ -0,0 +1,1397 @@
+import atexit
+import csv
+import io
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import weakref
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+
+try:
+    import fcntl
+except ImportError:  # windows: no advisory locks, one process at a time
+    fcntl = None
+
+from csvindex import MappedCsv
+from fulltext import MemoryFullText, SqliteFullText, is_fulltext
+from gcpause import gc_paused
+from query import as_filters, split_query
+from records import Record, record_type
+from views import MemoryView
+
+# storage backends. CsvBackend keeps each table in memory as a Repository
+# over a csv file; SqliteBackend keeps them in one database and leaves
+# searching, sorting and paging to sql. both hand out table objects with
+# the same interface: rows, get, get_many, codes, keys_where, add, update,
+# delete, apply, snapshot, replace, subscribe, view, flush.
+
+# a batch changing more rows than this is announced as one "reload"
+BULK_EVENTS = 1000
+
+def load_csv(filepath, fields):
+    if not os.path.exists(filepath):
+        return []
+    with open(filepath, newline="") as f:
+        return list(csv.DictReader(f))
+
+def load_records(filepath, fields, make):
+    # like load_csv, but each row is built with make(*values) in `fields`
+    # order, without a dict per row in between
+    if not os.path.exists(filepath):
+        return []
+    with open(filepath, newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return []
+        n = len(fields)
+        if header != list(fields):
+            pos = [header.index(f) if f in header else None for f in fields]
+            reader = ([row[i] if i is not None and i < len(row) else ""
+                       for i in pos] for row in reader if row)
+        rows = []
+        for row in reader:
+            if len(row) != n:
+                if not row:
+                    continue
+                row = (row + [""] * n)[:n]
+            rows.append(make(*row))
+        return rows
+
+def fsync_dir(directory):
+    # makes a rename durable; directories can't be opened on windows
+    if os.name != "posix":
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def row_values(rows, fields):
+    # each row as its values in `fields` order; a record of those fields
+    # has them as a tuple already
+    fields = tuple(fields)
+    for r in rows:
+        if isinstance(r, Record) and r.fields == fields:
+            yield r.astuple()
+        else:
+            yield [r.get(f, "") for f in fields]
+
+def write_csv_temp(filepath, fields, rows):
+    # full contents go to a synced temp file in the same directory, so the
+    # rename in commit_csv_temp() can never cross filesystems
+    directory = os.path.dirname(filepath) or "."
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(fields)
+            writer.writerows(row_values(rows, fields))
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(filepath):
+            shutil.copymode(filepath, tmp)
+    except BaseException:
+        os.remove(tmp)
+        raise
+    return tmp
+
+def commit_csv_temp(tmp, filepath):
+    os.replace(tmp, filepath)
+    fsync_dir(os.path.dirname(filepath) or ".")
+
+def save_csv(filepath, fields, rows):
+    # atomic: a crash leaves either the old file or the new one, never half
+    commit_csv_temp(write_csv_temp(filepath, fields, rows), filepath)
+
+def file_stamp(filepath):
+    # (inode, mtime, size) notices edits made outside this process: a file
+    # replaced by a rewrite gets a new inode, an appended one a new size
+    try:
+        st = os.stat(filepath)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+class FileLock:
+    # exclusive advisory lock on `path` (flock), so processes sharing the
+    # data directory take turns reading and writing its files. reentrant,
+    # and it also excludes the other threads of this process. the file is
+    # opened on each acquire, so a forked child never shares our lock.
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    def __enter__(self):
+        self._lock.acquire()
+        if self._depth == 0 and fcntl is not None:
+            try:
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            except BaseException:
+                if self._fd is not None:
+                    os.close(self._fd)
+                    self._fd = None
+                self._lock.release()
+                raise
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc):
+        self._depth -= 1
+        if self._depth == 0 and self._fd is not None:
+            os.close(self._fd)  # releases the flock
+            self._fd = None
+        self._lock.release()
+
+class ConflictError(Exception):
+    # changes dropped because another process changed the same rows first;
+    # the table holds their version of those rows instead
+    def __init__(self, keys):
+        self.keys = sorted(keys)
+        names = ", ".join(f"'{k}'" for k in self.keys[:3])
+        if len(self.keys) > 3:
+            names += f" and {len(self.keys) - 3} more"
+        super().__init__(f"{names} changed in another window meanwhile; "
+                         "that version was kept.")
+
+class Snapshot(list):
+    # rows from Repository.snapshot(), remembering the version they were
+    # read at
+    def __init__(self, rows, version):
+        super().__init__(rows)
+        self.version = version
+
+# journal records are csv rows: op ("A", "U" or "D") followed by the fields
+OPS = {"add": "A", "update": "U", "delete": "D"}
+
+def read_journal(filepath, offset=0):
+    # the records from byte `offset` on
+    try:
+        with open(filepath, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+    except FileNotFoundError:
+        return []
+    if data and not data.endswith(b"\n"):
+        # a crash mid-append leaves a torn last record; drop it for good
+        data = data[:data.rfind(b"\n") + 1]
+        os.truncate(filepath, offset + len(data))
+    return list(csv.reader(io.TextIOWrapper(io.BytesIO(data), newline="")))
+
+def append_journal(filepath, records):
+    with open(filepath, "a", newline="") as f:
+        csv.writer(f).writerows(records)
+        f.flush()
+        os.fsync(f.fileno())
+
+# committers still alive, flushed once at exit (weakly held, so exit
+# doesn't keep every repository that ever had one)
+_committers = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_committers():
+    for committer in list(_committers):
+        committer.flush()
+
+
+class GroupCommitter:
+    # merges a burst of saves into one durable write: the first save opens a
+    # window, and whatever state exists when it closes is written once.
+    # `flush` is held through a weak reference when it is a bound method
+    def __init__(self, flush, window=0.05):
+        self._flush = (weakref.WeakMethod(flush) if hasattr(flush, "__self__")
+                       else lambda: flush)
+        self.window = window
+        self.commits = 0
+        self._lock = threading.Lock()
+        self._timer = None
+        self._timer_lock = threading.Lock()
+        _committers.add(self)
+
+    def request(self):
+        with self._timer_lock:
+            if self._timer is None:
+                self._timer = threading.Timer(self.window, self._fire)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _fire(self):
+        with self._timer_lock:
+            self._timer = None
+        self._run()
+
+    def _run(self):
+        flush = self._flush()
+        with self._lock:
+            if flush is not None and flush():
+                self.commits += 1
+
+    def flush(self):
+        # write now instead of waiting for the window to close
+        with self._timer_lock:
+            timer, self._timer = self._timer, None
+        if timer is not None:
+            timer.cancel()
+        self._run()
+
+_DROP = object()
+
+def replay_journal(by_key, fields, key, records, make=None, deleted=_DROP):
+    # upsert/delete by key, so replaying a record twice is harmless. rows
+    # are built with make(*values) (dicts by default); a deleted key is
+    # removed, or set to `deleted` if one is given
+    at = fields.index(key)
+    for rec in records:
+        op, values = rec[0], rec[1:]
+        if op == "D":
+            if deleted is _DROP:
+                by_key.pop(values[0], None)
+            else:
+                by_key[values[0]] = deleted
+        elif op in ("A", "U") and len(values) == len(fields):
+            by_key[values[at]] = (make(*values) if make
+                                  else dict(zip(fields, values)))
+
+
+def journal_changes(fields, key, records, make=None):
+    # key -> the row the records leave behind (None if deleted)
+    changes = {}
+    replay_journal(changes, fields, key, records, make, deleted=None)
+    return changes
+
+
+class Repository:
+    # one table kept in memory; reads never touch the disk unless the file
+    # was changed by someone else, and every change is written straight back.
+    # with journal=True single-row changes are appended to <file>.log instead
+    # of rewriting the csv, and the log is folded back in the background once
+    # it grows past compact_at bytes. with group_commit set (in seconds) full
+    # rewrites are batched by a GroupCommitter instead of done on each save.
+    # with a writer (an IoExecutor, see use_writer) the files are written on
+    # its thread instead, and the caller only ever touches memory.
+    # rows are held in a dict keyed by the primary key, as compact read-only
+    # records (see records.py) whose `categorical` fields are dictionary-
+    # encoded, and every field in `indexes` gets a value -> set of keys
+    # index (e.g. program -> students).
+    #
+    # several processes may share the files. they are only read or written
+    # under <file>.lock (see FileLock), and every write first merges in
+    # what the others wrote since, row by row (_catch_up). a row changed
+    # here and by another process before our write landed is a conflict:
+    # their version is kept and ours dropped with a ConflictError.
+    def __init__(self, filepath, fields, key, journal=False,
+                 compact_at=1 << 20, group_commit=None, indexes=(),
+                 check_interval=0.5, categorical=()):
+        self.filepath = filepath
+        self.fields = fields
+        self.key = key
+        self.record = record_type("Row", fields, categorical)
+        self.journal = journal
+        self.journal_file = filepath + ".log"
+        self.compacting_file = filepath + ".log.old"
+        self.compact_at = compact_at
+        self._rows = None
+        # for lookup() before the rows are loaded
+        self.mapped = MappedCsv(filepath, fields, key)
+        self._indexes = {f: {} for f in indexes}
+        self._listeners = []
+        self._stamp = None
+        # the files are stat'ed at most once per check_interval seconds,
+        # so a loop of get() calls doesn't turn into a loop of stats
+        self.check_interval = check_interval
+        self._checked = 0.0
+        self._lock = threading.RLock()
+        self._file_lock = FileLock(filepath + ".lock")
+        self._compactor = None
+        self._generation = 0
+        self._dirty = False
+        self._committer = None
+        self.writer = None
+        self._queued = 0
+        self._version = 0
+        # per-row versions: the _version a row last changed at, for rows
+        # changed since the last full load (older ones count as _loaded_at)
+        self._changed_at = {}
+        self._loaded_at = 0
+        # rows changed here but not on disk yet: the disk version each
+        # started from (None if it didn't exist), how many of its changes
+        # are waiting, and how many of those to drop after a conflict
+        self._base = {}
+        self._pending = Counter()
+        self._dropped = Counter()
+        self.conflicts = 0
+        if group_commit:
+            self._committer = GroupCommitter(self._flush, group_commit)
+
+    def _file_stamps(self):
+        if not self.journal:
+            return file_stamp(self.filepath)
+        return (file_stamp(self.filepath), file_stamp(self.compacting_file),
+                file_stamp(self.journal_file))
+
+    def _read(self):
+        # with the file lock held, so the stamp matches what is read
+        stamp = self._file_stamps()
+        with gc_paused():
+            by_key = {r[self.key]: r for r in load_records(
+                self.filepath, self.fields, self.record)}
+            if self.journal:
+                replay_journal(by_key, self.fields, self.key,
+                               read_journal(self.compacting_file), self.record)
+                replay_journal(by_key, self.fields, self.key,
+                               read_journal(self.journal_file), self.record)
+        return stamp, by_key
+
+    def _load(self):
+        with self._file_lock:
+            stamp, by_key = self._read()
+            with self._lock:
+                self._stamp = stamp
+                self._set_rows(by_key)
+
+    def _set_rows(self, by_key):
+        self._rows = by_key
+        self._version += 1
+        self._changed_at.clear()
+        self._loaded_at = self._version
+        for field, index in self._indexes.items():
+            index.clear()
+            for k, r in by_key.items():
+                index.setdefault(r[field], set()).add(k)
+        self._notify("reload", None, None, None)
+
+    def subscribe(self, listener):
+        # listener(op, key, row, old) with op "add", "update", "delete" or
+        # "reload" (everything may have changed; the rest are None). row is
+        # the new row (None on delete), old the previous one (None on add).
+        self._listeners.append(listener)
+
+    def _notify(self, op, key, row, old):
+        for listener in self._listeners:
+            listener(op, key, row, old)
+
+    def _notify_many(self, events):
+        # past BULK_EVENTS rows one "reload" is cheaper for the listeners
+        # than patching their indexes row by row
+        if len(events) > BULK_EVENTS:
+            return self._notify("reload", None, None, None)
+        for event in events:
+            self._notify(*event)
+
+    def _row(self, data):
+        # a record from any mapping; missing fields are blank
+        if type(data) is self.record:
+            return data
+        return self.record(*[data.get(f, "") for f in self.fields])
+
+    def _changed(self, old, data):
+        # a copy of `old` with the fields in `data` changed
+        return self.record(*[data[f] if f in data else old[f]
+                             for f in self.fields])
+
+    def _index_add(self, row):
+        for field, index in self._indexes.items():
+            index.setdefault(row[field], set()).add(row[self.key])
+
+    def _index_remove(self, row):
+        for field, index in self._indexes.items():
+            keys = index.get(row[field])
+            if keys is not None:
+                keys.discard(row[self.key])
+                if not keys:
+                    del index[row[field]]
+
+    def use_writer(self, writer):
+        # hand file writes to `writer` and stop stat'ing the files on reads;
+        # whoever sets this should call refresh() now and then instead
+        self.writer = writer
+        self.check_interval = None
+
+    def _unsaved(self):
+        return self._dirty or self._queued > 0
+
+    def _queue(self, fn, item=None):
+        self._queued += 1
+        self.writer.write(fn, item).add_done_callback(self._written)
+
+    def _written(self, future):
+        with self._lock:
+            self._queued -= 1
+
+    # other processes. lock order: the file lock, then self._lock
+    def _sync(self):
+        # load the table, or catch up with what others wrote
+        with self._file_lock:
+            if self._rows is None:
+                self._load()
+            else:
+                self._catch_up()
+
+    def _catch_up(self):
+        # with the file lock held. records appended to the journal since we
+        # last looked are read from where we stopped; any other change
+        # means reading everything and comparing
+        stamp = self._file_stamps()
+        if stamp == self._stamp:
+            return
+        old = self._stamp
+        if (self.journal and old is not None and stamp[:2] == old[:2]
+                and stamp[2] is not None
+                and (old[2] is None or (stamp[2][0] == old[2][0]
+                                        and stamp[2][2] >= old[2][2]))):
+            records = read_journal(self.journal_file,
+                                   old[2][2] if old[2] else 0)
+            self._merge(stamp, journal_changes(self.fields, self.key, records,
+                                               self.record), False)
+        else:
+            stamp, by_key = self._read()
+            self._merge(stamp, by_key, True)
+
+    def _merge(self, stamp, theirs, complete):
+        # theirs maps keys to their row on disk (None: deleted); complete
+        # means it is the whole table, so rows missing from it are gone
+        with self._lock:
+            self._stamp = stamp
+            table = self._rows
+            changes = list(theirs.items())
+            if complete:
+                changes += [(k, None) for k in table if k not in theirs]
+            events = []
+            for k, row in changes:
+                if k in self._base:
+                    if row == self._base[k]:
+                        continue  # not theirs to change; ours stands
+                    # changed on both sides: theirs wins, and our changes
+                    # still waiting to be written are dropped (_append)
+                    self._base[k] = row
+                    self._dropped[k] = self._pending[k]
+                mine = table.get(k)
+                if mine == row:
+                    continue
+                if mine is not None:
+                    self._index_remove(mine)
+                if row is None:
+                    del table[k]
+                    events.append(("delete", k, None, mine))
+                else:
+                    table[k] = row
+                    self._index_add(row)
+                    events.append(("update" if mine is not None else "add",
+                                   k, row, mine))
+            if events:
+                self._version += 1
+                for _, k, _, _ in events:
+                    self._changed_at[k] = self._version
+                self._notify_many(events)
+
+    def _take_conflicts(self, entries):
+        # with self._lock held: split the (key, row, record) entries about to
+        # be written into the ones to write and the keys dropped after a
+        # conflict
+        kept, dropped = [], set()
+        for entry in entries:
+            k = entry[0]
+            if self._dropped[k]:
+                self._dropped[k] -= 1
+                dropped.add(k)
+            else:
+                kept.append(entry)
+        return kept, dropped
+
+    def _settle(self, counts, written):
+        # these many changes per key are on disk (or were dropped), leaving
+        # the rows in `written` there. a row with more changes to come now
+        # starts from that one
+        for k, n in counts.items():
+            self._pending[k] -= n
+            if self._pending[k] <= 0:
+                del self._pending[k]
+                self._base.pop(k, None)
+                self._dropped.pop(k, None)
+            elif k in written:
+                self._base[k] = written[k]
+
+    def _conflicted(self, keys):
+        if keys:
+            self.conflicts += len(keys)
+            raise ConflictError(keys)
+
+    def _write(self):
+        # full rewrite of the base file, now or when the commit window closes
+        self._generation += 1
+        self._dirty = True
+        if self.writer is not None:
+            self._queue(self._flush_queued)
+        elif self._committer is None:
+            self._flush()
+        else:
+            self._committer.request()
+
+    def _flush_queued(self, items):
+        self._flush()
+
+    def _flush(self):
+        # nothing pending: don't touch the files (at exit they may be gone)
+        with self._lock:
+            if not self._dirty:
+                return False
+        with self._file_lock:
+            self._catch_up()
+            with self._lock:
+                if not self._dirty:
+                    return False
+                snapshot, generation = list(self._rows.values()), self._generation
+                # rows that lost a conflict already hold the other version
+                covered, dropped = Counter(self._pending), set(self._dropped)
+                written = {k: self._rows.get(k) for k in covered}
+            tmp = write_csv_temp(self.filepath, self.fields, snapshot)
+            commit_csv_temp(tmp, self.filepath)
+            if self.journal:
+                # logs only hold changes from before the write was requested
+                for path in (self.compacting_file, self.journal_file):
+                    if os.path.exists(path):
+                        os.remove(path)
+            stamp = self._file_stamps()
+            with self._lock:
+                if generation == self._generation:
+                    self._dirty = False
+                self._stamp = stamp
+                self._settle(covered, written)
+        self._conflicted(dropped)
+        return True
+
+    def flush(self):
+        # make pending group commits durable; don't call with the lock held
+        if self._committer is not None:
+            self._committer.flush()
+        if self.writer is not None:
+            self.writer.drain()
+
+    def _record(self, op, row):
+        return [op] + ([row[self.key]] if op == "D"
+                       else [row[f] for f in self.fields])
+
+    def _log_many(self, events, rewrite=False):
+        # the (op, key, row, old) events of a change go out as one journal
+        # append, or one rewrite
+        self._version += 1
+        for _, k, _, old in events:
+            self._changed_at[k] = self._version
+            self._base.setdefault(k, old)
+            self._pending[k] += 1
+        if rewrite or not self.journal or self._dirty:
+            # while a full write is pending it will pick this change up too
+            return self._write()
+        entries = [(k, row, self._record(OPS[op], old if row is None else row))
+                   for op, k, row, old in events]
+        if self.writer is not None:
+            return self._queue(self._append_batches, entries)
+        self._append(entries)
+
+    def _append_batches(self, batches):
+        self._append([e for entries in batches for e in entries])
+
+    def _append(self, entries):
+        # with a writer this runs on its thread, the only one appending
+        with self._file_lock:
+            self._catch_up()
+            with self._lock:
+                kept, dropped = self._take_conflicts(entries)
+            if kept:
+                append_journal(self.journal_file, [rec for _, _, rec in kept])
+            stamp = self._file_stamps()
+            with self._lock:
+                self._stamp = stamp
+                self._settle(Counter(k for k, _, _ in entries),
+                             {k: row for k, row, _ in kept})
+                if stamp[2] is not None and stamp[2][2] >= self.compact_at \
+                        and not self._compacting():
+                    self._start_compaction()
+        self._conflicted(dropped)
+
+    # compaction: rotate the log, write a snapshot as the new base file,
+    # then drop the rotated log. new changes keep going to a fresh log.
+    def _compacting(self):
+        return self._compactor is not None and self._compactor.is_alive()
+
+    def _start_compaction(self):
+        # with both locks held and the rows caught up
+        if os.path.exists(self.compacting_file):
+            # a previous compaction never finished; its records are still
+            # needed until a snapshot covering them is on disk
+            with open(self.compacting_file, "a", newline="") as dst, \
+                 open(self.journal_file, newline="") as src:
+                dst.write(src.read())
+            os.remove(self.journal_file)
+        else:
+            os.replace(self.journal_file, self.compacting_file)
+        # rows are never mutated in place, so a shallow copy is a snapshot.
+        # rows not written yet go in as they are on disk
+        snapshot = self._rows
+        if self._base:
+            snapshot = dict(snapshot)
+            for k, row in self._base.items():
+                if row is None:
+                    snapshot.pop(k, None)
+                else:
+                    snapshot[k] = row
+        self._stamp = self._file_stamps()
+        self._compactor = threading.Thread(
+            target=self._compact, args=(list(snapshot.values()), self._stamp),
+            daemon=True)
+        self._compactor.start()
+
+    def _compact(self, snapshot, rotated):
+        tmp = write_csv_temp(self.filepath, self.fields, snapshot)
+        with self._file_lock, self._lock:
+            stamp = self._file_stamps()
+            if stamp[:2] != rotated[:2]:
+                # the base file was rewritten meanwhile (here or elsewhere),
+                # and that already covers this
+                os.remove(tmp)
+                return
+            commit_csv_temp(tmp, self.filepath)
+            os.remove(self.compacting_file)
+            if self._stamp[:2] == rotated[:2]:
+                # the journal may have grown elsewhere since; keep reading
+                # it from where we were
+                self._stamp = (file_stamp(self.filepath), None, self._stamp[2])
+
+    def compact(self):
+        # fold the log into the csv now and wait for it
+        if self.writer is not None:
+            self.writer.drain()
+        self._table()
+        with self._file_lock:
+            self._catch_up()
+            with self._lock:
+                if self.journal and os.path.exists(self.journal_file) \
+                        and not self._compacting():
+                    self._start_compaction()
+                compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+
+    def is_stale(self):
+        if self._rows is None:
+            return True
+        if self.check_interval is None:
+            return False
+        now = time.monotonic()
+        if now - self._checked < self.check_interval:
+            return False
+        self._checked = now
+        return self._file_stamps() != self._stamp
+
+    def reload(self):
+        self._load()
+
+    def refresh(self):
+        # pick up what other processes wrote, as row-by-row changes (see
+        # _catch_up); unsaved changes here are kept unless they conflict.
+        # a table nobody has loaded yet is left alone.
+        if self._rows is None or self._file_stamps() == self._stamp:
+            return False
+        with self._file_lock:
+            self._catch_up()
+        return True
+
+    def _table(self):
+        if self.is_stale():
+            self._sync()
+        return self._rows
+
+    @contextmanager
+    def _changing(self):
+        # the locks for a change. without a writer the change is written
+        # before this returns, so the file lock is taken first and the rows
+        # brought up to date under it: nothing can be missed in between
+        if self.writer is not None:
+            self._table()
+            with self._lock:
+                yield self._rows
+        else:
+            with self._file_lock:
+                self._sync()
+                with self._lock:
+                    yield self._rows
+
+    def rows(self):
+        # a live view of the cached rows; treat them as read-only
+        return self._table().values()
+
+    @contextmanager
+    def reading(self):
+        # hold the rows, and the indexes listeners keep over them, still
+        # while reading both: changes merged from other processes on the io
+        # threads wait until this returns. the table is loaded first, so
+        # only self._lock is taken here (see the lock order above)
+        self._table()
+        with self._lock:
+            yield
+
+    @property
+    def version(self):
+        # goes up with every change, made here or merged from elsewhere
+        return self._version
+
+    def snapshot(self):
+        # the rows as dicts, tagged with the version they were read at, for
+        # a read-modify-write with replace(). the records stay in here
+        table = self._table()
+        with self._lock:
+            rows, version = list(table.values()), self._version
+        with gc_paused():
+            return Snapshot(map(dict, rows), version)
+
+    def get(self, value):
+        return self._table().get(value)
+
+    def lookup(self, value):
+        # one row without loading the table for it: until the rows are
+        # loaded anyway, it is read from the csv in place through its
+        # byte-offset index (see csvindex.py), unless the journal changed
+        # it since. a dict, or None
+        if self._rows is not None:
+            row = self.get(value)
+            return None if row is None else dict(row)
+        with self._file_lock:
+            if self.journal:
+                changes = journal_changes(
+                    self.fields, self.key,
+                    read_journal(self.compacting_file)
+                    + read_journal(self.journal_file))
+                if value in changes:
+                    return changes[value]
+            try:
+                return self.mapped.get(value)
+            finally:
+                self.mapped.close()
+
+    @contextmanager
+    def in_place(self):
+        # the csv read in place (a MappedCsv, see csvindex.py), for reading
+        # pages of it in key order without loading the table; only while
+        # nobody has loaded it and the journal is empty, so that the file is
+        # the whole table. None otherwise
+        with self._file_lock:
+            if self._rows is not None or (self.journal and any(
+                    os.path.exists(path) and os.path.getsize(path)
+                    for path in (self.compacting_file, self.journal_file))):
+                yield None
+                return
+            try:
+                yield self.mapped
+            finally:
+                self.mapped.close()
+
+    def get_many(self, values):
+        # rows for several keys (None where missing) with one freshness check
+        table = self._table()
+        return [table.get(v) for v in values]
+
+    def codes(self):
+        return list(self._table())
+
+    def keys_where(self, field, value):
+        # keys of every row whose `field` equals `value`, from its index
+        # when there is one
+        table = self._table()
+        index = self._indexes.get(field)
+        if index is None:
+            return frozenset(k for k, r in table.items() if r[field] == value)
+        return frozenset(index.get(value, ()))
+
+    def has_index(self, field):
+        return field in self._indexes
+
+    def count_where(self, field, value):
+        if field not in self._indexes:
+            return len(self.keys_where(field, value))
+        self._table()
+        return len(self._indexes[field].get(value, ()))
+
+    def add(self, row):
+        with self._changing() as table:
+            row = self._row(row)
+            if row[self.key] in table:
+                return False
+            table[row[self.key]] = row
+            self._index_add(row)
+            event = ("add", row[self.key], row, None)
+            self._log_many([event])
+            self._notify(*event)
+            return True
+
+    def add_many(self, rows):
+        # one write for a whole batch; rows whose key exists are skipped.
+        # listeners get a single "reload" instead of one event per row.
+        with self._changing() as table, gc_paused():
+            events = []
+            for row in rows:
+                row = self._row(row)
+                if row[self.key] in table:
+                    continue
+                table[row[self.key]] = row
+                self._index_add(row)
+                events.append(("add", row[self.key], row, None))
+            if events:
+                self._log_many(events, rewrite=True)
+                self._notify("reload", None, None, None)
+            return len(events)
+
+    def update(self, value, data, since=None):
+        # with `since` (a version read before the edit started) a row
+        # changed after it is refused with a ConflictError
+        with self._changing() as table:
+            old = table.get(value)
+            if old is None:
+                return False
+            if since is not None and \
+                    self._changed_at.get(value, self._loaded_at) > since:
+                raise ConflictError([value])
+            r = self._changed(old, data)
+            self._index_remove(old)
+            table[value] = r
+            self._index_add(r)
+            event = ("update", value, r, old)
+            self._log_many([event])
+            self._notify(*event)
+            return True
+
+    def delete(self, value):
+        with self._changing() as table:
+            old = table.pop(value, None)
+            if old is None:
+                return False
+            self._index_remove(old)
+            event = ("delete", value, None, old)
+            self._log_many([event])
+            self._notify(*event)
+            return True
+
+    def apply(self, deletes=(), updates=None, adds=()):
+        # a batch of changes with a single write. updates maps keys to the
+        # fields to change; missing keys (and existing ones in adds) are
+        # skipped. returns the number of rows changed.
+        with self._changing() as table:
+            events = []
+            for k in deletes:
+                old = table.pop(k, None)
+                if old is not None:
+                    self._index_remove(old)
+                    events.append(("delete", k, None, old))
+            for k, data in (updates or {}).items():
+                old = table.get(k)
+                if old is not None:
+                    r = self._changed(old, data)
+                    self._index_remove(old)
+                    table[k] = r
+                    self._index_add(r)
+                    events.append(("update", k, r, old))
+            for row in adds:
+                row = self._row(row)
+                if row[self.key] not in table:
+                    table[row[self.key]] = row
+                    self._index_add(row)
+                    events.append(("add", row[self.key], row, None))
+            if events:
+                self._log_many(events)
+                self._notify_many(events)
+            return len(events)
+
+    def replace(self, rows, since=None):
+        # make the table hold exactly `rows`. with `since` (the version of
+        # the snapshot() they were edited from) only the differences are
+        # written, and rows someone else changed after that keep the other
+        # version: they are left out and reported with a ConflictError
+        rows = {r[self.key]: self._row(r) for r in rows}
+        if since is None:
+            with self._changing():
+                self._set_rows(rows)
+                self._write()
+            return
+        with self._changing() as table:
+            skipped = set()
+            deletes, updates, adds = [], {}, []
+            for k in [k for k in table if k not in rows] + list(rows):
+                if table.get(k) == rows.get(k):
+                    continue
+                if self._changed_at.get(k, self._loaded_at) > since:
+                    skipped.add(k)
+                elif k not in rows:
+                    deletes.append(k)
+                elif k in table:
+                    updates[k] = rows[k]
+                else:
+                    adds.append(rows[k])
+            self.apply(deletes, updates, adds)
+        self._conflicted(skipped)
+
+    def __contains__(self, value):
+        return value in self._table()
+
+    def __len__(self):
+        return len(self._table())
+
+    def view(self, fields, fulltext=None):
+        return MemoryView(self, fields, fulltext)
+
+
+class CsvBackend:
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        self.tables = []
+
+    def table(self, name, fields, key, indexes=(), journal=False,
+              categorical=()):
+        repo = Repository(os.path.join(self.data_dir, name + ".csv"),
+                          fields, key, journal=journal, indexes=indexes,
+                          categorical=categorical)
+        self.tables.append(repo)
+        return repo
+
+    def fulltext(self, students, programs):
+        return MemoryFullText(students, programs)
+
+    def use_writer(self, writer):
+        for repo in self.tables:
+            repo.use_writer(writer)
+
+
+# sqlite
+NAME_FIELDS = ("name", "firstname", "lastname")
+
+
+def like_pattern(query):
+    escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return "%" + escaped + "%"
+
+
+class SqliteBackend:
+    # one database file in WAL mode. on first use each table is seeded from
+    # its csv file in seed_dir, if there is one.
+    def __init__(self, path, seed_dir=None):
+        self.path = path
+        self.seed_dir = seed_dir
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(path, check_same_thread=False,
+                                    isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS seeded (name TEXT PRIMARY KEY)")
+
+    def execute(self, sql, params=()):
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def transaction(self, statements):
+        # statements: (sql, params) pairs, or (sql, [params, ...]) for many
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                for sql, params in statements:
+                    if isinstance(params, list):
+                        self.conn.executemany(sql, params)
+                    else:
+                        self.conn.execute(sql, params)
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+
+    def table(self, name, fields, key, indexes=(), journal=False,
+              categorical=()):
+        columns = ", ".join(f"{f} TEXT NOT NULL" + (" PRIMARY KEY" if f == key else "")
+                            for f in fields)
+        statements = [(f"CREATE TABLE IF NOT EXISTS {name} ({columns})", ())]
+        for f in list(indexes) + [f for f in NAME_FIELDS if f in fields]:
+            statements.append(
+                (f"CREATE INDEX IF NOT EXISTS idx_{name}_{f} ON {name} ({f})", ()))
+        self.transaction(statements)
+        table = SqliteTable(self, name, fields, key, indexes)
+        seed = self.seed_dir and os.path.join(self.seed_dir, name + ".csv")
+        if seed and not self.execute("SELECT 1 FROM seeded WHERE name = ?", (name,)):
+            if len(table) == 0 and os.path.exists(seed):
+                table.replace(load_csv(seed, fields))
+            self.execute("INSERT INTO seeded VALUES (?)", (name,))
+        return table
+
+    def fulltext(self, students, programs):
+        return SqliteFullText(self)
+
+    def use_writer(self, writer):
+        # commits stay on the calling thread: they are short WAL appends,
+        # and reads would otherwise not see a save until the writer got to it
+        pass
+
+
+class SqliteTable:
+    def __init__(self, backend, name, fields, key, indexes=()):
+        self.backend = backend
+        self.name = name
+        self.fields = fields
+        self.key = key
+        # the fields indexed for lookups by value, as asked of table()
+        self._indexes = frozenset(indexes)
+        self._listeners = []
+        self._columns = ", ".join(fields)
+
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+
+    def _notify(self, op, key, row, old):
+        for listener in self._listeners:
+            listener(op, key, row, old)
+
+    def _notify_many(self, events):
+        # past BULK_EVENTS rows one "reload" is cheaper for the listeners
+        # than patching their indexes row by row
+        if len(events) > BULK_EVENTS:
+            return self._notify("reload", None, None, None)
+        for event in events:
+            self._notify(*event)
+
+    # sqlite serializes writers across processes itself, and no row
+    # versions are kept: update() and replace() write what they are given
+    version = None
+
+    def rows(self):
+        return [dict(r) for r in self.backend.execute(
+            f"SELECT {self._columns} FROM {self.name} ORDER BY rowid")]
+
+    def get(self, value):
+        found = self.backend.execute(
+            f"SELECT {self._columns} FROM {self.name} WHERE {self.key} = ?",
+            (value,))
+        return dict(found[0]) if found else None
+
+    def get_many(self, values):
+        values = list(values)
+        found = {}
+        for start in range(0, len(values), 500):
+            part = values[start:start + 500]
+            marks = ", ".join("?" for _ in part)
+            for r in self.backend.execute(
+                    f"SELECT {self._columns} FROM {self.name} "
+                    f"WHERE {self.key} IN ({marks})", part):
+                found[r[self.key]] = dict(r)
+        return [found.get(v) for v in values]
+
+    def lookup(self, value):
+        # Repository.lookup; here every read is one already
+        return self.get(value)
+
+    def in_place(self):
+        # Repository.in_place; pages come from sql here (see SqliteView)
+        return nullcontext()
+
+    def codes(self):
+        return [r[0] for r in self.backend.execute(
+            f"SELECT {self.key} FROM {self.name} ORDER BY rowid")]
+
+    def keys_where(self, field, value):
+        return frozenset(r[0] for r in self.backend.execute(
+            f"SELECT {self.key} FROM {self.name} WHERE {field} = ?", (value,)))
+
+    def has_index(self, field):
+        return field in self._indexes
+
+    def count_where(self, field, value):
+        return self.backend.execute(
+            f"SELECT COUNT(*) FROM {self.name} WHERE {field} = ?", (value,))[0][0]
+
+    def add(self, row):
+        row = {f: row.get(f, "") for f in self.fields}
+        marks = ", ".join("?" for _ in self.fields)
+        with self.backend.lock:
+            cur = self.backend.conn.execute(
+                f"INSERT OR IGNORE INTO {self.name} ({self._columns}) "
+                f"VALUES ({marks})", [row[f] for f in self.fields])
+        if cur.rowcount == 0:
+            return False
+        self._notify("add", row[self.key], row, None)
+        return True
+
+    def add_many(self, rows):
+        marks = ", ".join("?" for _ in self.fields)
+        with self.backend.lock:
+            before = self.backend.conn.total_changes
+            self.backend.transaction([
+                (f"INSERT OR IGNORE INTO {self.name} ({self._columns}) "
+                 f"VALUES ({marks})",
+                 [[r.get(f, "") for f in self.fields] for r in rows]),
+            ])
+            added = self.backend.conn.total_changes - before
+        if added:
+            self._notify("reload", None, None, None)
+        return added
+
+    def update(self, value, data, since=None):
+        # no per-row versions here (see version), so `since` is ignored
+        with self.backend.lock:
+            old = self.get(value)
+            if old is None:
+                return False
+            row = dict(old)
+            row.update({f: data[f] for f in self.fields if f in data})
+            sets = ", ".join(f"{f} = ?" for f in self.fields)
+            self.backend.conn.execute(
+                f"UPDATE {self.name} SET {sets} WHERE {self.key} = ?",
+                [row[f] for f in self.fields] + [value])
+        self._notify("update", value, row, old)
+        return True
+
+    def delete(self, value):
+        with self.backend.lock:
+            old = self.get(value)
+            if old is None:
+                return False
+            self.backend.conn.execute(
+                f"DELETE FROM {self.name} WHERE {self.key} = ?", (value,))
+        self._notify("delete", value, None, old)
+        return True
+
+    def apply(self, deletes=(), updates=None, adds=()):
+        # same as Repository.apply, in one transaction
+        updates = updates or {}
+        marks = ", ".join("?" for _ in self.fields)
+        sets = ", ".join(f"{f} = ?" for f in self.fields)
+        events = []
+        with self.backend.lock:
+            deletes = list(deletes)
+            gone = [(k, old) for k, old in zip(deletes, self.get_many(deletes))
+                    if old is not None]
+            changed = []
+            for k, old in zip(updates, self.get_many(updates)):
+                if old is not None:
+                    r = dict(old)
+                    r.update({f: v for f, v in updates[k].items()
+                              if f in self.fields})
+                    changed.append((k, r, old))
+            adds = [{f: r.get(f, "") for f in self.fields} for r in adds]
+            existing = self.get_many(r[self.key] for r in adds)
+            adds = [r for r, old in zip(adds, existing) if old is None]
+            self.backend.transaction([
+                (f"DELETE FROM {self.name} WHERE {self.key} = ?",
+                 [[k] for k, _ in gone]),
+                (f"UPDATE {self.name} SET {sets} WHERE {self.key} = ?",
+                 [[r[f] for f in self.fields] + [k] for k, r, _ in changed]),
+                (f"INSERT OR IGNORE INTO {self.name} ({self._columns}) "
+                 f"VALUES ({marks})",
+                 [[r[f] for f in self.fields] for r in adds]),
+            ])
+        events += [("delete", k, None, old) for k, old in gone]
+        events += [("update", k, r, old) for k, r, old in changed]
+        events += [("add", r[self.key], r, None) for r in adds]
+        if len(events) > BULK_EVENTS:
+            self._notify("reload", None, None, None)
+        else:
+            for event in events:
+                self._notify(*event)
+        return len(events)
+
+    def snapshot(self):
+        return Snapshot((dict(r) for r in self.rows()), None)
+
+    def replace(self, rows, since=None):
+        marks = ", ".join("?" for _ in self.fields)
+        self.backend.transaction([
+            (f"DELETE FROM {self.name}", ()),
+            (f"INSERT INTO {self.name} ({self._columns}) VALUES ({marks})",
+             [[r.get(f, "") for f in self.fields] for r in rows]),
+        ])
+        self._notify("reload", None, None, None)
+
+    def flush(self):
+        pass
+
+    def reload(self):
+        self._notify("reload", None, None, None)
+
+    def refresh(self):
+        # every read already goes to the database
+        return False
+
+    def __contains__(self, value):
+        return bool(self.backend.execute(
+            f"SELECT 1 FROM {self.name} WHERE {self.key} = ?", (value,)))
+
+    def __len__(self):
+        return self.backend.execute(f"SELECT COUNT(*) FROM {self.name}")[0][0]
+
+    def view(self, fields, fulltext=None):
+        return SqliteView(self, fields, fulltext)
+
+    # search, sort and page in sql
+    def sort_expr(self, field):
+        if field == "year":
+            return "CAST(year AS INTEGER)"
+        if field == self.key:
+            return field
+        return f"{field} COLLATE NOCASE"
+
+    def order_by(self, field, descending=False):
+        expr = self.sort_expr(field)
+        direction = " DESC" if descending else ""
+        return f"{expr}{direction}, {self.key}{direction}"
+
+    def condition(self, f):
+        # a filter (see query.py) as sql; comparisons follow the sort order
+        if f.op == "=":
+            return f"{f.field} = ?", [f.value]
+        if f.op == "!=":
+            return f"{f.field} != ?", [f.value]
+        if f.op == "in":
+            marks = ", ".join("?" * len(f.value))
+            return f"{f.field} IN ({marks})", sorted(f.value)
+        if f.op == "^=":
+            # like_pattern without its leading %
+            return (f"{f.field} LIKE ? ESCAPE '\\'",
+                    [like_pattern(f.value)[1:]])
+        expr = self.sort_expr(f.field)
+        value = "CAST(? AS INTEGER)" if f.field == "year" else "?"
+        return f"{expr} {f.op} {value}", [f.value]
+
+    def beyond(self, field, op, cursor):
+        # rows sorting before (op "<") or after (">") the cursor (value,
+        # key), in the order of order_by
+        value = "CAST(? AS INTEGER)" if field == "year" else "?"
+        return (f"({self.sort_expr(field)}, {self.key}) {op} ({value}, ?)",
+                list(cursor))
+
+    def where(self, query, fields):
+        if not query:
+            return "1", []
+        cond = " OR ".join(f"{f} LIKE ? ESCAPE '\\'" for f in fields)
+        return f"({cond})", [like_pattern(query)] * len(fields)
+
+
+class SqliteView:
+    # search + sort pushed down to sql; the result is a lazy PagedKeys and
+    # only the pages the table scrolls to are ever read
+    incremental = False
+
+    def __init__(self, table, fields, fulltext=None):
+        self.table = table
+        self.fields = fields
+        self.fulltext = fulltext
+
+    def prepare(self):
+        pass
+
+    def where(self, query):
+        # when the full-text search finds nothing, every word is searched
+        # as a substring
+        if self.fulltext is not None and is_fulltext(query):
+            if self.fulltext.search(query, 1):
+                return self.fulltext.where(query)
+            parts = [self.table.where(w, self.fields) for w in query.split()]
+            return (" AND ".join(sql for sql, _ in parts),
+                    [v for _, values in parts for v in values])
+        return self.table.where(query, self.fields)
+
+    def steps(self, query, field, descending=False, where=None):
+        # nothing to spread out over Tk ticks: each page is one query.
+        # `where` maps fields to the values they must equal, or is a list
+        # of filters; filter words in the query ("year>=3") count too
+        yield from ()
+        filters, query = split_query(query, self.fields)
+        cond, params = self.where(query)
+        for f in as_filters(where) + filters:
+            sql, values = self.table.condition(f)
+            cond += f" AND {sql}"
+            params = params + values
+        return PagedKeys(self.table, cond, params,
+                         self.table.order_by(field, descending))
+
+    def cursor(self, field, key):
+        return (self.table.get(key)[field], key)
+
+    def position(self, keys, field, descending, cursor, after=False):
+        # how many of the PagedKeys `keys` come before the cursor (value,
+        # key), or with `after` before or at it (see paging.py)
+        op = ">" if descending else "<"
+        if after:
+            op += "="
+        return keys.count(*self.table.beyond(field, op, cursor))
+
+    def matches(self, key, query, where=None):
+        filters, query = split_query(query, self.fields)
+        cond, params = self.where(query)
+        for f in as_filters(where) + filters:
+            sql, values = self.table.condition(f)
+            cond += f" AND {sql}"
+            params = params + values
+        return bool(self.table.backend.execute(
+            f"SELECT 1 FROM {self.table.name} WHERE {self.table.key} = ? "
+            f"AND {cond}", [key] + params))
+
+
+class PagedKeys:
+    # the keys of one query as a read-only sequence, fetched a page at a time
+    page_size = 200
+
+    def __init__(self, table, where, params, order):
+        self.table = table
+        self.where = where
+        self.params = params
+        self.order = order
+        self._len = None
+        self._pages = {}
+
+    def __len__(self):
+        if self._len is None:
+            self._len = self.table.backend.execute(
+                f"SELECT COUNT(*) FROM {self.table.name} WHERE {self.where}",
+                self.params)[0][0]
+        return self._len
+
+    def count(self, cond, params):
+        # how many of the keys also meet `cond`
+        return self.table.backend.execute(
+            f"SELECT COUNT(*) FROM {self.table.name} "
+            f"WHERE {self.where} AND {cond}", self.params + params)[0][0]
+
+    def page(self, n):
+        if n not in self._pages:
+            self._pages[n] = [r[0] for r in self.table.backend.execute(
+                f"SELECT {self.table.key} FROM {self.table.name} "
+                f"WHERE {self.where} ORDER BY {self.order} LIMIT ? OFFSET ?",
+                self.params + [self.page_size, n * self.page_size])]
+        return self._pages[n]
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self.page(i // self.page_size)[i % self.page_size]
+
+    def __iter__(self):
+        for n in range((len(self) + self.page_size - 1) // self.page_size):
+            yield from self.page(n)
+
+    def __contains__(self, key):
+        return bool(self.table.backend.execute(
+            f"SELECT 1 FROM {self.table.name} WHERE {self.table.key} = ? "
+            f"AND {self.where}", [key] + self.params))
+
+    def index(self, key):
+        for n, keys in self._pages.items():
+            if key in keys:
+                return n * self.page_size + keys.index(key)
+        for i, k in enumerate(self):
+            if k == key:
+                return i
+        raise ValueError(key)
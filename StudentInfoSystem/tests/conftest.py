@@ -0,0 +1,5 @@
+# the modules are flat in StudentInfoSystem; run `python -m pytest` there
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
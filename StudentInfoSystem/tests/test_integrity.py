@@ -0,0 +1,114 @@
+# restrict, cascade and set-null between colleges, programs and students,
+# on delete and on a change of code
+import os
+
+import pytest
+
+from fields import COLLEGE_FIELDS, PROGRAM_FIELDS, STUDENT_FIELDS
+from integrity import (CASCADE, RESTRICT, SET_NULL, IntegrityEngine,
+                       IntegrityError, Relation)
+from storage import Repository, save_csv
+
+
+@pytest.fixture
+def tables(tmp_path):
+    def table(name, fields, key, rows, **options):
+        path = os.path.join(tmp_path, name + ".csv")
+        save_csv(path, fields, rows)
+        return Repository(path, fields, key, **options)
+
+    colleges = table("colleges", COLLEGE_FIELDS, "code",
+                     [{"code": "CCS", "name": "Computing"},
+                      {"code": "COE", "name": "Engineering"}])
+    programs = table("programs", PROGRAM_FIELDS, "code",
+                     [{"code": "BSCS", "name": "CS", "college": "CCS"},
+                      {"code": "BSIT", "name": "IT", "college": "CCS"},
+                      {"code": "BSCE", "name": "CE", "college": "COE"}],
+                     indexes=("college",))
+    students = table("students", STUDENT_FIELDS, "id",
+                     [{"id": f"2024-000{i}", "firstname": "Ana",
+                       "lastname": "Cruz", "program": program, "year": "1",
+                       "gender": "Female"}
+                      for i, program in enumerate(
+                          ["BSCS", "BSCS", "BSIT", "BSCE"], 1)],
+                     journal=True, indexes=("program",))
+    engine = IntegrityEngine([
+        Relation(programs, "college", colleges, "programs", "college",
+                 on_delete=RESTRICT, on_update=CASCADE),
+        Relation(students, "program", programs, "students", "program",
+                 on_delete=RESTRICT, on_update=CASCADE),
+    ])
+    return engine, colleges, programs, students
+
+
+def column(table, field):
+    return {r[table.key]: r[field] for r in table.rows()}
+
+
+def test_delete_restrict_changes_nothing(tables):
+    engine, colleges, programs, students = tables
+    with pytest.raises(IntegrityError) as e:
+        engine.delete(colleges, ["CCS"])
+    assert e.value.dependents == 2
+    assert colleges.get("CCS") is not None
+    assert len(programs.codes()) == 3
+
+
+def test_delete_cascade_reaches_grandchildren(tables):
+    engine, colleges, programs, students = tables
+    plan = engine.plan_delete(colleges, ["CCS"], CASCADE)
+    assert plan.deletes[programs] == {"BSCS", "BSIT"}
+    assert plan.deletes[students] == {"2024-0001", "2024-0002", "2024-0003"}
+    assert colleges.get("CCS") is not None  # only planned
+
+    assert engine.delete(colleges, ["CCS"], CASCADE) == 1 + 2 + 3
+    assert colleges.codes() == ["COE"]
+    assert programs.codes() == ["BSCE"]
+    assert students.codes() == ["2024-0004"]
+
+
+def test_delete_set_null_blanks_references(tables):
+    engine, colleges, programs, students = tables
+    engine.delete(programs, ["BSCS"], SET_NULL)
+    assert column(students, "program") == {
+        "2024-0001": "", "2024-0002": "", "2024-0003": "BSIT",
+        "2024-0004": "BSCE"}
+    assert engine.orphans() == []
+
+
+def test_change_key_cascade_follows(tables):
+    engine, colleges, programs, students = tables
+    engine.change_key(programs, "BSCS", "BSCOMP")
+    assert programs.get("BSCS") is None
+    assert programs.get("BSCOMP")["college"] == "CCS"
+    assert students.keys_where("program", "BSCOMP") == {"2024-0001",
+                                                        "2024-0002"}
+    assert engine.orphans() == []
+
+
+def test_change_key_restrict_and_set_null(tables):
+    engine, colleges, programs, students = tables
+    with pytest.raises(IntegrityError):
+        engine.change_key(colleges, "CCS", "CICS", RESTRICT)
+    assert colleges.get("CCS") is not None
+
+    engine.change_key(colleges, "CCS", "CICS", SET_NULL)
+    assert colleges.get("CICS") is not None
+    assert column(programs, "college") == {"BSCS": "", "BSIT": "",
+                                           "BSCE": "COE"}
+
+
+def test_change_key_adds_the_parent_before_the_children(tables, monkeypatch):
+    # were it to stop after the students, they must point at a program
+    # that exists
+    engine, colleges, programs, students = tables
+    seen = []
+    apply = students.apply
+
+    def checked(*args, **kwargs):
+        seen.append(programs.get("BSCOMP") is not None)
+        return apply(*args, **kwargs)
+
+    monkeypatch.setattr(students, "apply", checked)
+    engine.change_key(programs, "BSCS", "BSCOMP")
+    assert seen == [True]
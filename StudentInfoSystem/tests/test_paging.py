@@ -0,0 +1,97 @@
+# pages of a table in key order: read in place through the csv's byte-offset
+# index (csvindex.py) while nobody has loaded the table, and from the
+# loaded view otherwise. both must give the same rows, offsets, totals and
+# cursors
+import csv
+import os
+import random
+
+import pytest
+
+from csvindex import MappedCsv
+from fields import STUDENT_FIELDS
+from service import TableService
+from storage import Repository, save_csv
+
+
+def students(n, seed=1):
+    rnd = random.Random(seed)
+    rows = [{"id": f"{2020 + i // 1000}-{i % 1000:04d}",
+             "firstname": rnd.choice(["Ana", "Jose", "Maria"]),
+             "lastname": rnd.choice(["Cruz", "Reyes", "Santos, Jr."]),
+             "program": rnd.choice(["BSCS", "BSIT"]),
+             "year": str(rnd.randint(1, 5)), "gender": "Female"}
+            for i in range(n)]
+    rows.append({**rows[0], "id": "odd-one"})  # sorts after the real ids
+    rnd.shuffle(rows)
+    return rows
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = str(tmp_path / "students.csv")
+    save_csv(path, STUDENT_FIELDS, students(2500))
+    return path
+
+
+def service(path):
+    repo = Repository(path, STUDENT_FIELDS, "id", journal=True,
+                      check_interval=0)
+    return TableService(repo, None, "Student", "ID")
+
+
+def same(a, b):
+    assert list(a) == list(b)
+    assert (a.offset, a.total, a.first, a.last) == \
+        (b.offset, b.total, b.first, b.last)
+
+
+@pytest.mark.parametrize("descending", [False, True])
+def test_in_place_pages_match_loaded_ones(path, descending):
+    mapped, loaded = service(path), service(path)
+    loaded.table.codes()
+    for offset in (0, 1, 499, 2400, 2501, 5000):
+        same(mapped.page(descending=descending, offset=offset, limit=100),
+             loaded.page(descending=descending, offset=offset, limit=100))
+    assert mapped.table._rows is None
+
+    page = loaded.page(descending=descending, offset=1000, limit=100)
+    for where in ({"after": page.last}, {"before": page.first},
+                  {"before": loaded.page(descending=descending,
+                                         limit=10).last}):
+        same(mapped.page(descending=descending, limit=100, **where),
+             loaded.page(descending=descending, limit=100, **where))
+    assert mapped.table._rows is None
+
+
+def test_journal_changes_page_through_the_table(path):
+    mapped = service(path)
+    writer = Repository(path, STUDENT_FIELDS, "id", journal=True)
+    first = mapped.page(limit=1)[0]
+    writer.delete(first["id"])
+    page = mapped.page(limit=1)
+    assert page[0]["id"] != first["id"]
+    assert page.total == 2500
+
+
+def test_index_sidecar_is_reused_and_caught_up(path):
+    rows = {r["id"]: r for r in csv.DictReader(open(path, newline=""))}
+    built = MappedCsv(path, STUDENT_FIELDS, "id")
+    assert built.get("2021-0007") == rows["2021-0007"]
+    assert built.get("Santos, Jr.") is None
+    assert os.path.exists(path + ".idx")
+
+    reopened = MappedCsv(path, STUDENT_FIELDS, "id")
+    reopened._load_index()
+    assert len(reopened._offsets) == len(rows)
+
+    added = {**rows["2021-0007"], "id": "2030-0001", "lastname": 'A "b"\nc'}
+    with open(path, "a", newline="") as f:
+        csv.writer(f).writerow([added[k] for k in STUDENT_FIELDS])
+    assert reopened.get("2030-0001") == added
+    assert reopened.get("2021-0007") == rows["2021-0007"]
+    assert len(reopened) == len(rows) + 1
+
+    save_csv(path, STUDENT_FIELDS, [added])  # rewritten: indexed again
+    assert reopened.get("2021-0007") is None
+    assert reopened.get("2030-0001") == added
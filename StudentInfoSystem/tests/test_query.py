@@ -0,0 +1,78 @@
+# the numpy ArrayEngine and the plain PythonEngine must select and order
+# the same keys, before and after the table changes under them
+import random
+
+import pytest
+
+from fields import STUDENT_FIELDS
+from query import ArrayEngine, PythonEngine, as_filters
+from storage import Repository, save_csv
+
+pytest.importorskip("numpy")
+
+WHERE = [
+    [],
+    {"program": "BSIT"},
+    ["year>=3"],
+    ["year<2", "gender!=Male"],
+    ["lastname^=re", {"program": "BSCS"}],
+    ["id>2021-0100", "id<=2022-0050"],
+    ["program=NONE"],
+]
+
+
+def rows(n, seed=3):
+    rnd = random.Random(seed)
+    return [{"id": f"{2020 + i // 200}-{i % 200:04d}",
+             "firstname": rnd.choice(["Ana", "jose", "Maria"]),
+             "lastname": rnd.choice(["Cruz", "reyes", "Reyes", "Santos"]),
+             "program": rnd.choice(["BSCS", "BSIT", "BSME"]),
+             "year": rnd.choice(["1", "2", "3", "4", "5", "x"]),
+             "gender": rnd.choice(["Male", "Female", "Other"])}
+            for i in range(n)]
+
+
+@pytest.fixture
+def repo(tmp_path):
+    path = str(tmp_path / "students.csv")
+    save_csv(path, STUDENT_FIELDS, rows(600))
+    return Repository(path, STUDENT_FIELDS, "id", indexes=("program",),
+                      categorical=("program", "year", "gender"))
+
+
+def results(engine):
+    found = []
+    for where in WHERE:
+        filters = []
+        for w in where if isinstance(where, list) else [where]:
+            filters += as_filters(w if isinstance(w, dict) else [w])
+        for field in ("id", "lastname", "year"):
+            for descending in (False, True):
+                selection = engine.select(filters)
+                found.append(engine.order(field, descending, selection))
+    return found
+
+
+def test_engines_agree(repo):
+    python, array = PythonEngine(repo), ArrayEngine(repo, STUDENT_FIELDS)
+    assert results(python) == results(array)
+    assert any(results(python))
+
+
+def test_engines_agree_after_changes(repo):
+    python, array = PythonEngine(repo), ArrayEngine(repo, STUDENT_FIELDS)
+    results(python), results(array)  # built, then kept up to date
+    for i, row in enumerate(rows(80, seed=9)):
+        repo.add({**row, "id": f"2030-{i:04d}"})
+    repo.update("2020-0001", {"year": "5", "lastname": "Abad"})
+    for key in repo.codes()[::7]:
+        repo.delete(key)
+    assert results(python) == results(array)
+
+
+def test_within_limits_the_selection(repo):
+    python, array = PythonEngine(repo), ArrayEngine(repo, STUDENT_FIELDS)
+    within = repo.codes()[::3] + ["gone"]
+    filters = as_filters(["year>=2"])
+    assert python.order("id", False, python.select(filters, within)) == \
+        array.order("id", False, array.select(filters, within))
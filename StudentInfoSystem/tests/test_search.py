@@ -0,0 +1,71 @@
+# ranked full-text search over students (fulltext.py) and the type-ahead
+# code lists (references.py), kept up to date from change events
+import pytest
+
+from fields import PROGRAM_FIELDS, STUDENT_FIELDS
+from fulltext import MemoryFullText, is_fulltext
+from references import References
+from storage import Repository, save_csv
+
+
+@pytest.fixture
+def tables(tmp_path):
+    programs = str(tmp_path / "programs.csv")
+    save_csv(programs, PROGRAM_FIELDS, [
+        {"code": "BSCS", "name": "Computer Science", "college": "CCS"},
+        {"code": "BSIT", "name": "Information Technology", "college": "CCS"},
+        {"code": "BSCE", "name": "Civil Engineering", "college": "COE"}])
+    students = str(tmp_path / "students.csv")
+    save_csv(students, STUDENT_FIELDS, [
+        {"id": sid, "firstname": first, "lastname": last, "program": program,
+         "year": "1", "gender": "Female"}
+        for sid, first, last, program in [
+            ("2024-0001", "Maria", "Santos", "BSCS"),
+            ("2024-0002", "Santos", "Reyes", "BSIT"),
+            ("2024-0003", "Maria", "Cruz", "BSCE"),
+            ("2024-0004", "Jose", "Santos", "BSIT")]])
+    return (Repository(students, STUDENT_FIELDS, "id", indexes=("program",)),
+            Repository(programs, PROGRAM_FIELDS, "code"))
+
+
+def test_only_spaced_words_are_fulltext():
+    assert is_fulltext("maria santos")
+    assert not is_fulltext("2024-0001")
+    assert not is_fulltext("santos")
+
+
+def test_ranks_last_names_over_first_names(tables):
+    students, programs = tables
+    fulltext = MemoryFullText(students, programs)
+    assert fulltext.search("santos") == ["2024-0001", "2024-0004",
+                                         "2024-0002"]
+    assert fulltext.search("maria sant") == ["2024-0001"]
+    # program codes and names count too
+    assert set(fulltext.search("santos information")) == {"2024-0002",
+                                                          "2024-0004"}
+    assert fulltext.search("maria nursing") == []
+    assert fulltext.matches("2024-0003", "maria civil")
+
+
+def test_fulltext_follows_changes(tables):
+    students, programs = tables
+    fulltext = MemoryFullText(students, programs)
+    assert fulltext.search("jose santos") == ["2024-0004"]
+    students.update("2024-0004", {"lastname": "Abad"})
+    programs.update("BSCE", {"name": "Civil Nursing"})
+    assert fulltext.search("jose santos") == []
+    assert fulltext.search("jose abad") == ["2024-0004"]
+    assert fulltext.search("maria nursing") == ["2024-0003"]
+
+
+def test_references_match_codes_then_names(tables):
+    _, programs = tables
+    refs = References(programs)
+    assert refs.codes() == ["BSCE", "BSCS", "BSIT"]
+    assert refs.matching("bsc") == ["BSCE", "BSCS"]
+    assert refs.matching("tech") == ["BSIT"]
+    assert refs.matching("", limit=2) == ["BSCE", "BSCS"]
+    programs.add({"code": "BSTM", "name": "Tourism", "college": "CBA"})
+    assert "BSTM" in refs and refs.name("BSTM") == "Tourism"
+    programs.delete("BSCE")
+    assert refs.matching("civil") == []
@@ -0,0 +1,134 @@
+# the journal of a csv Repository as other processes see it: each test
+# opens the same files through several Repository objects, which share
+# them (and <file>.lock) the way separate windows do
+import os
+import threading
+
+import pytest
+
+from fields import STUDENT_FIELDS
+from storage import ConflictError, Repository, save_csv
+
+
+def student(sid, lastname="Cruz", year="1"):
+    return {"id": sid, "firstname": "Ana", "lastname": lastname,
+            "program": "BSIT", "year": year, "gender": "Female"}
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = str(tmp_path / "students.csv")
+    save_csv(path, STUDENT_FIELDS,
+             [student(f"2024-{i:04d}") for i in range(1, 6)])
+    return path
+
+
+def open_repo(path, **options):
+    # check_interval=0: see the other objects' writes on the next read
+    return Repository(path, STUDENT_FIELDS, "id", journal=True,
+                      check_interval=0, **options)
+
+
+def table(repo):
+    return {r["id"]: dict(r) for r in repo.rows()}
+
+
+def test_journal_replay(path):
+    repo = open_repo(path)
+    repo.add(student("2024-0100"))
+    repo.update("2024-0002", {"year": "3"})
+    repo.delete("2024-0003")
+    assert os.path.getsize(path + ".log") > 0
+
+    found = table(open_repo(path))
+    assert found == table(repo)
+    assert "2024-0100" in found and "2024-0003" not in found
+    assert found["2024-0002"]["year"] == "3"
+
+
+def test_torn_last_record_is_truncated(path):
+    repo = open_repo(path)
+    repo.add(student("2024-0100"))
+    size = os.path.getsize(path + ".log")
+    with open(path + ".log", "ab") as f:
+        f.write(b"A,2024-0101,Ana,Cr")  # a crash mid-append
+
+    other = open_repo(path)
+    assert "2024-0101" not in table(other)
+    assert os.path.getsize(path + ".log") == size
+
+    other.add(student("2024-0102"))
+    found = table(open_repo(path))
+    assert "2024-0100" in found and "2024-0102" in found
+    assert "2024-0101" not in found
+
+
+def test_compaction_racing_appends(path):
+    # two writers append while each one's compactions rotate the log
+    # under the other
+    repos = [open_repo(path, compact_at=2048) for _ in range(2)]
+
+    def append(repo, n):
+        for i in range(200):
+            repo.add(student(f"{2030 + n}-{i:04d}"))
+
+    threads = [threading.Thread(target=append, args=(repo, n))
+               for n, repo in enumerate(repos)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    for repo in repos:
+        repo.compact()
+
+    found = open_repo(path)
+    assert len(table(found)) == 5 + 400
+    assert table(found) == table(repos[0]) == table(repos[1])
+
+
+def test_conflicting_update_raises(path):
+    mine, theirs = open_repo(path), open_repo(path)
+    since = mine.snapshot().version
+    theirs.update("2024-0001", {"lastname": "Reyes"})
+
+    with pytest.raises(ConflictError) as e:
+        mine.update("2024-0001", {"lastname": "Santos"}, since)
+    assert e.value.keys == ["2024-0001"]
+    assert mine.get("2024-0001")["lastname"] == "Reyes"
+    # rows nobody else changed are still fine
+    assert mine.update("2024-0002", {"lastname": "Santos"}, since)
+
+
+def test_conflicting_replace_keeps_their_rows(path):
+    mine, theirs = open_repo(path), open_repo(path)
+    rows = mine.snapshot()
+    theirs.update("2024-0001", {"year": "4"})
+    for r in rows:
+        r["year"] = "2"
+
+    with pytest.raises(ConflictError) as e:
+        mine.replace(rows, rows.version)
+    assert e.value.keys == ["2024-0001"]
+    found = table(open_repo(path))
+    assert found["2024-0001"]["year"] == "4"
+    assert all(r["year"] == "2" for k, r in found.items() if k != "2024-0001")
+
+
+def test_lookup_sees_journal_changes(path):
+    writer = open_repo(path)
+    writer.add(student("2024-0100"))
+    writer.update("2024-0002", {"year": "5"})
+    writer.delete("2024-0003")
+
+    reader = open_repo(path)
+    assert reader.lookup("2024-0100")["id"] == "2024-0100"
+    assert reader.lookup("2024-0002")["year"] == "5"
+    assert reader.lookup("2024-0003") is None
+    assert reader.lookup("2024-0004") == student("2024-0004")
+    assert reader.lookup("2024-9999") is None
+    # all of it without loading the table
+    assert reader._rows is None
+
+    writer.compact()
+    assert reader.lookup("2024-0002")["year"] == "5"
+    assert reader.lookup("2024-0003") is None
@@ -0,0 +1,104 @@
+# single-row changes reaching a tab after the table has moved on: the
+# events of one merge are queued for the Tk thread (UiDispatcher) and run
+# one by one, when the later rows are already gone from the repository.
+# the tab runs without a display here: a stand-in Treeview, and the parts
+# of CollegeTab that on_change uses
+from types import SimpleNamespace
+
+import pytest
+
+from fields import COLLEGE_FIELDS
+from gui import college_tab
+from gui.college_tab import CollegeTab
+from gui.virtual_tree import VirtualTree
+from storage import Repository, save_csv
+
+
+class FakeTree:
+    def __init__(self):
+        self.items = {}
+
+    def insert(self, parent, index):
+        item = f"I{len(self.items)}"
+        self.items[item] = ()
+        return item
+
+    def item(self, item, values=(), tags=()):
+        self.items[item] = values
+
+    def delete(self, *items):
+        for item in items:
+            del self.items[item]
+
+    def selection(self):
+        return ()
+
+    def selection_set(self, items):
+        pass
+
+    def configure(self, **options):
+        pass
+
+    def bind(self, event, fn):
+        pass
+
+    def cget(self, option):
+        return ""
+
+
+@pytest.fixture
+def tab(tmp_path, monkeypatch):
+    path = str(tmp_path / "colleges.csv")
+    save_csv(path, COLLEGE_FIELDS, [{"code": c, "name": f"College {c}"}
+                                    for c in "ABCDE"])
+    repo = Repository(path, COLLEGE_FIELDS, "code", check_interval=0)
+    monkeypatch.setattr(college_tab, "colleges", repo)
+    monkeypatch.setattr(VirtualTree, "visible_rows", lambda self: 10)
+    tab = CollegeTab.__new__(CollegeTab)
+    tab.refreshes = 0
+
+    def after_idle(fn):
+        assert fn == tab.refresh
+        tab.refreshes += 1
+
+    tab.parent = SimpleNamespace(after_idle=after_idle)
+    tab.search = SimpleNamespace(pending=False)
+    tab.search_var = SimpleNamespace(get=lambda: "")
+    tab.sort_var = SimpleNamespace(get=lambda: "Name")
+    tab.descending = False
+    tab.view = repo.view(COLLEGE_FIELDS)
+    tab.table = VirtualTree(FakeTree(), SimpleNamespace(configure=dict,
+                                                        set=lambda *a: None),
+                            tab.row_values, tab.sort_key)
+    tab.table.set_keys(list("ABCDE"))
+    tab.repo = repo
+    return tab
+
+
+def queued_merge(repo, change):
+    # `change` made through another Repository, merged here; the events
+    # come back the way ui.wrap queues them
+    events = []
+    repo.subscribe(lambda *event: events.append(event))
+    change(Repository(repo.filepath, repo.fields, repo.key))
+    repo.refresh()
+    return events
+
+
+def test_two_queued_deletes(tab):
+    events = queued_merge(tab.repo, lambda other: (other.delete("B"),
+                                                   other.delete("C")))
+    assert [e[:2] for e in events] == [("delete", "B"), ("delete", "C")]
+    for event in events:
+        tab.on_change(*event)  # no TypeError from a row that is gone
+    assert tab.refreshes >= 1
+    assert all(values for values in tab.table.tree.items.values())
+
+
+def test_single_change_is_patched(tab):
+    events = queued_merge(tab.repo, lambda other: other.update(
+        "B", {"name": "College Z"}))
+    for event in events:
+        tab.on_change(*event)
+    assert tab.refreshes == 0
+    assert tab.table.keys == list("ACDEB")
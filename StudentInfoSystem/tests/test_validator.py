@@ -0,0 +1,67 @@
+# validate_many reports the first thing wrong with each row, in order,
+# the way the one-row validator does, plus keys repeated in the stream
+from validator import EMPTY, college_validator, student_validator
+
+
+def student(sid="2024-0001", **fields):
+    return {"id": sid, "firstname": "Ana", "lastname": "Cruz",
+            "program": "BSIT", "year": "1", "gender": "Female", **fields}
+
+
+def test_errors_in_order():
+    validate = student_validator({"BSIT", "BSCS"})
+    results = validate.validate_many([
+        student("2024-0001"),
+        student("2024-0002", lastname="  "),
+        student("24-2"),
+        student("2024-0003", year="6"),
+        student("2024-0004", program="NONE"),
+        student("2024-0005", program="NONE"),
+        student("2024-0006", gender="?", year="9"),
+    ])
+    errors = [err for _, err in results]
+    assert errors[0] is None
+    assert errors[1] == EMPTY
+    assert errors[2].startswith("Student ID must follow")
+    assert errors[3] == "Year must be from 1 to 5."
+    assert errors[4] == errors[5] == "Program 'NONE' does not exist."
+    # the first failing field in field order wins
+    assert errors[6] == "Year must be from 1 to 5."
+    for row, err in results:
+        assert err == validate(row)
+
+
+def test_rows_come_back_cleaned():
+    validate = student_validator()
+    [(row, err)] = validate.validate_many([
+        {"id": " 2024-0001 ", "firstname": "  maria   clara ",
+         "lastname": "Cruz", "program": "BSIT", "year": 1,
+         "gender": "Female", "extra": "dropped"}])
+    assert err is None
+    assert row == student(firstname="maria clara")
+
+
+def test_duplicates_in_the_stream_and_the_table():
+    validate = college_validator()
+    seen = set()
+    results = validate.validate_many(
+        [{"code": "CCS", "name": "Computing"},
+         {"code": "CCS", "name": "Again"},
+         {"code": "COE", "name": "Engineering"},
+         {"code": "OLD", "name": "Taken"}],
+        existing={"OLD"}, seen=seen)
+    assert [err for _, err in results] == [
+        None, "Code already exists.", None, "Code already exists."]
+    assert seen == {"CCS", "COE"}
+
+    # carried over to the next batch
+    [(_, err)] = validate.validate_many([{"code": "COE", "name": "x"}],
+                                        seen=seen)
+    assert err == "Code already exists."
+
+
+def test_invalid_rows_dont_take_their_key():
+    validate = student_validator()
+    results = validate.validate_many([student("2024-0001", year="0"),
+                                      student("2024-0001")])
+    assert [err for _, err in results] == ["Year must be from 1 to 5.", None]
@@ -1,33 +1,165 @@
-import re
-
-
-def is_empty(data: dict) -> bool:
-    return not all(data.values())
-
-
-def valid_student_id(sid: str) -> bool:
-    return bool(re.match(r"^\d{4}-\d{4}$", sid))
-
-
-def is_duplicate(rows: list, key: str, value: str) -> bool:
-    return any(r[key] == value for r in rows)
-
-
-def validate_college(data: dict) -> str | None:
-    if is_empty(data):
-        return "Please fill in all fields."
-    return None
-
-
-def validate_program(data: dict) -> str | None:
-    if is_empty(data):
-        return "Please fill in all fields."
-    return None
-
-
-def validate_student(data: dict) -> str | None:
-    if is_empty(data):
-        return "Please fill in all fields."
-    if not valid_student_id(data["id"]):
-        return "Student ID must follow the format YYYY-NNNN (e.g. 2024-0001)."
-    return None
\ No newline at end of file
+import re
+from collections.abc import Callable, Iterable
+
+from fields import COLLEGE_FIELDS, PROGRAM_FIELDS, STUDENT_FIELDS
+from gcpause import gc_paused
+
+# validation is compiled once: the patterns at import, the rules of each
+# table into a Validator. a Validator normalizes a row (clean), checks it
+# field by field and, with validate_many, does a whole stream of rows in one
+# pass. program/college codes are looked up in anything supporting `in`,
+# normally the cached References of database.py.
+ID_PATTERN = re.compile(r"\d{4}-\d{4}")
+YEARS = ("1", "2", "3", "4", "5")
+GENDERS = ("Male", "Female", "Other")
+EMPTY = "Please fill in all fields."
+# a rule not yet run on a value, in validate_many's memos
+MISSING = object()
+
+
+def is_empty(data: dict) -> bool:
+    return not all(data.values())
+
+
+def valid_student_id(sid: str) -> bool:
+    return ID_PATTERN.fullmatch(sid) is not None
+
+
+def is_duplicate(rows, key: str, value: str) -> bool:
+    # repositories answer primary-key checks from their index
+    if getattr(rows, "key", None) == key:
+        return value in rows
+    return any(r[key] == value for r in rows)
+
+
+def normalize_name(name: str) -> str:
+    # "  maria   clara " -> "maria clara"
+    return " ".join(name.split())
+
+
+def matches(pattern: re.Pattern, message: str) -> Callable:
+    fullmatch = pattern.fullmatch
+    return lambda v: None if fullmatch(v) else message
+
+
+def one_of(values: Iterable[str], message: str) -> Callable:
+    allowed = frozenset(values)
+    return lambda v: None if v in allowed else message
+
+
+def exists_in(codes, label: str) -> Callable:
+    return lambda v: None if v in codes else f"{label} '{v}' does not exist."
+
+
+class Validator:
+    # rules: {field: rule(value) -> error or None}, checked in field order
+    # after the all-fields-filled check. normalize: {field: fn(value)},
+    # applied by clean(). the rules of the fields in `repeated` depend on
+    # the value alone and see few distinct values (a program, a year), so
+    # validate_many checks each distinct value once.
+    def __init__(self, fields: list[str], rules: dict | None = None,
+                 normalize: dict | None = None, key: str | None = None,
+                 key_label: str = "Code", repeated: Iterable[str] = ()):
+        self.fields = list(fields)
+        self.rules = sorted((rules or {}).items(),
+                            key=lambda fr: self.fields.index(fr[0]))
+        self.normalize = normalize or {}
+        self.key = key
+        self.duplicate = f"{key_label} already exists."
+        self.repeated = frozenset(repeated)
+
+    def clean(self, data: dict) -> dict:
+        # the row's fields as stripped strings, normalized
+        row = {f: str(data.get(f) or "").strip() for f in self.fields}
+        for f, fn in self.normalize.items():
+            row[f] = fn(row[f])
+        return row
+
+    def __call__(self, data: dict) -> str | None:
+        # the first thing wrong with a (cleaned) row, or None
+        if is_empty(data):
+            return EMPTY
+        for f, rule in self.rules:
+            err = rule(data[f])
+            if err:
+                return err
+        return None
+
+    def validate_many(self, rows: Iterable[dict], existing=None,
+                      seen: set | None = None) -> list[tuple[dict, str | None]]:
+        # (cleaned row, error or None) for every row, in order. with a
+        # key, a key already in `existing` (e.g. the table) or earlier in
+        # the stream is an error too; `seen` collects the accepted keys and
+        # may be carried over from an earlier batch. the rules of repeated
+        # fields run once per distinct value
+        if seen is None:
+            seen = set()
+        fields, normalize = self.fields, list(self.normalize.items())
+        checks = [(f, rule, {} if f in self.repeated else None)
+                  for f, rule in self.rules]
+        key, duplicate = self.key, self.duplicate
+        results = []
+        append = results.append
+        with gc_paused():
+            for data in rows:
+                get = data.get
+                row = {f: str(get(f) or "").strip() for f in fields}
+                for f, fn in normalize:
+                    row[f] = fn(row[f])
+                if not all(row.values()):
+                    append((row, EMPTY))
+                    continue
+                err = None
+                for f, rule, memo in checks:
+                    if memo is None:
+                        err = rule(row[f])
+                    else:
+                        value = row[f]
+                        err = memo.get(value, MISSING)
+                        if err is MISSING:
+                            err = memo[value] = rule(value)
+                    if err:
+                        break
+                if err is None and key is not None:
+                    k = row[key]
+                    if k in seen or (existing is not None and k in existing):
+                        err = duplicate
+                    else:
+                        seen.add(k)
+                append((row, err))
+        return results
+
+
+NAMES = {"name": normalize_name}
+STUDENT_NAMES = {"firstname": normalize_name, "lastname": normalize_name}
+
+
+def college_validator() -> Validator:
+    return Validator(COLLEGE_FIELDS, normalize=NAMES, key="code")
+
+
+def program_validator(colleges=None) -> Validator:
+    # with `colleges` (a table or References) the college must exist
+    rules = {}
+    if colleges is not None:
+        rules["college"] = exists_in(colleges, "College")
+    return Validator(PROGRAM_FIELDS, rules, NAMES, "code",
+                     repeated=("college",))
+
+
+def student_validator(programs=None) -> Validator:
+    # with `programs` (a table or References) the program must exist
+    rules = {"id": matches(ID_PATTERN, "Student ID must follow the format "
+                                       "YYYY-NNNN (e.g. 2024-0001)."),
+             "year": one_of(YEARS, "Year must be from 1 to 5."),
+             "gender": one_of(GENDERS, "Gender must be Male, Female or Other.")}
+    if programs is not None:
+        rules["program"] = exists_in(programs, "Program")
+    return Validator(STUDENT_FIELDS, rules, STUDENT_NAMES, "id", "ID",
+                     repeated=("program", "year", "gender"))
+
+
+# the format-only checks, for rows that aren't checked against the tables
+validate_college = college_validator()
+validate_program = program_validator()
+validate_student = student_validator()
@@ -0,0 +1,96 @@
+from bisect import bisect_left, bisect_right
+
+from fulltext import is_fulltext
+from query import as_filters, make_engine, split_query
+from search import SearchIndex, Searcher
+
+
+class MemoryView:
+    # search + filter + sort over an in-memory repository. incremental
+    # means the caller may place single-row changes itself with row_key().
+    # queries of several words go to `fulltext` when there is one; when it
+    # finds nothing, every word is searched as a substring. filters
+    # and the order come from a query engine (see query.py). the indexes
+    # are read with the repository held still (Repository.reading), as
+    # changes from other processes reach them on the io threads
+    incremental = True
+
+    def __init__(self, repo, fields, fulltext=None):
+        self.repo = repo
+        self.fields = fields
+        self.index = SearchIndex(repo, fields)
+        self.searcher = Searcher(self.index)
+        self.engine = make_engine(repo)
+        self.fulltext = fulltext
+
+    def steps(self, query, field, descending=False, where=None):
+        # generator; yields while searching, returns the sorted keys.
+        # `where` maps fields to the values they must equal, or is a list
+        # of filters; filter words in the query ("year>=3") count too.
+        # the repository is held between yields, not across them
+        work = self._steps(query, field, descending, where)
+        while True:
+            with self.repo.reading():
+                try:
+                    next(work)
+                except StopIteration as done:
+                    return done.value
+            yield
+
+    def _steps(self, query, field, descending, where):
+        filters, query = split_query(query, self.fields)
+        filters = as_filters(where) + filters
+        keys = None
+        words = [query]
+        if self.fulltext is not None and is_fulltext(query):
+            yield
+            keys = list(self.fulltext.scores(query))
+            words = query.split()
+        if not keys and query:
+            keys = yield from self.searcher.steps(words[0])
+            if len(words) > 1:
+                keys = [k for k in keys
+                        if all(self.index.matches(k, w) for w in words[1:])]
+        selection = self.engine.select(filters, keys)
+        return self.engine.order(field, descending, selection)
+
+    def prepare(self):
+        with self.repo.reading():
+            self.engine.prepare()
+
+    def matches(self, key, query, where=None):
+        with self.repo.reading():
+            return self._matches(key, query, where)
+
+    def _matches(self, key, query, where):
+        filters, query = split_query(query, self.fields)
+        filters = as_filters(where) + filters
+        if filters:
+            row = self.repo.get(key)
+            if row is None or not all(f.test(row[f.field]) for f in filters):
+                return False
+        if not query:
+            return self.repo.get(key) is not None
+        if self.fulltext is not None and is_fulltext(query):
+            return (self.fulltext.matches(key, query)
+                    or all(self.index.matches(key, w) for w in query.split()))
+        return self.index.matches(key, query)
+
+    def cursor(self, field, key):
+        return (self.repo.get(key)[field], key)
+
+    def position(self, keys, field, descending, cursor, after=False):
+        # how many of `keys`, as sorted by steps(), come before the cursor
+        # (value, key), or with `after` before or at it (see paging.py)
+        value, key = cursor
+        target = self.row_key(field, {field: value, self.repo.key: key},
+                              descending)
+        probe = lambda k: self.row_key(field, self.repo.get(k), descending)
+        with self.repo.reading():
+            if after:
+                return bisect_right(keys, target, key=probe)
+            return bisect_left(keys, target, key=probe)
+
+    def row_key(self, field, row, descending=False):
+        with self.repo.reading():
+            return self.engine.sorter.row_key(field, row, descending)